@@ -0,0 +1,332 @@
+"""
+Benchmarks for the board setup engine on synthetic boards
+- Generates .kicad_pcb fixtures from 10 to 100k items: footprints, tracks, many
+  Edge.Cuts drawings and old mounting hole groups left by earlier runs
+- Times board_setup.setup_board() itself: its Trace stages (footprint load, cleanup,
+  mounting holes, outline, groups, clearance, DRC) plus parse and save, median of
+  --repeat runs, and each stage's memory peak from a separate tracemalloc run so it
+  doesn't skew the timings
+- --scripts also runs complete-board-setup.py (in-editor path) and add-mounting-holes.py
+  on each fixture through pcbnew_stub, so the KiCad console code is timed too; --check
+  counts the stub's calls to make sure an in-editor run is one BOARD_COMMIT
+- Needs no KiCad install, works on a plain CI machine
+
+    python benchmark_board_setup.py --sizes 10 1000 100000 --json results.json
+    python benchmark_board_setup.py --scripts --sizes 10 1000
+    python benchmark_board_setup.py --check --sizes 10 1000   # one undo step per in-editor run
+    python benchmark_board_setup.py --compare results.json   # exit 1 on regressions
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import runpy
+import statistics
+import sys
+import tempfile
+import time
+
+import board_setup
+import kicad_sexpr as sx
+import pcbnew_stub
+from board_trace import Trace
+from footprint_cache import FootprintCache
+from kicad_sexpr import fmt_mm, mm_to_nm, quote
+
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+
+# Top-level stages of run_setup(): parse, the board_setup.setup_board() trace stages, save
+STAGES = ("parse", "footprint load", "cleanup", "mounting holes", "board outline", "groups", "clearance", "drc",
+          "save")
+
+# KiCad console scripts timed through pcbnew_stub (--scripts)
+CONSOLE_SCRIPTS = {"complete-board-setup": "complete-board-setup.py", "add-mounting-holes": "add-mounting-holes.py"}
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Faster stages are left out of --compare
+MIN_COMPARED_SECONDS = 0.01
+
+# Share of the synthetic items per kind
+MIX = {"edge_cuts": 0.1, "mounting_holes": 0.1, "footprints": 0.2, "tracks": 0.6}
+
+BOARD_HEADER = """(kicad_pcb
+\t(version 20241229)
+\t(generator "pcbnew")
+\t(generator_version "9.0")
+\t(general
+\t\t(thickness 1.6)
+\t\t(legacy_teardrops no)
+\t)
+\t(paper "A4")
+\t(layers
+\t\t(0 "F.Cu" signal)
+\t\t(2 "B.Cu" signal)
+\t\t(25 "Edge.Cuts" user)
+\t)
+"""
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+
+def _footprint(name, uuid, x, y, reference, pad_size=2.0):
+    return (
+        f'\t(footprint "{name}"\n'
+        f'\t\t(layer "F.Cu")\n'
+        f'\t\t(uuid "{uuid}")\n'
+        f'\t\t(at {fmt_mm(x)} {fmt_mm(y)})\n'
+        f'\t\t(property "Reference" "{reference}"\n'
+        f'\t\t\t(at 0 -2 0)\n'
+        f'\t\t\t(layer "F.SilkS")\n'
+        f'\t\t\t(uuid "{board_setup.stable_uuid(uuid, "ref")}")\n'
+        f'\t\t\t(effects\n\t\t\t\t(font\n\t\t\t\t\t(size 1 1)\n\t\t\t\t\t(thickness 0.15)\n\t\t\t\t)\n\t\t\t)\n'
+        f'\t\t)\n'
+        f'\t\t(pad "1" smd rect\n'
+        f'\t\t\t(at 0 0)\n'
+        f'\t\t\t(size {pad_size} {pad_size})\n'
+        f'\t\t\t(layers "F.Cu" "F.Mask")\n'
+        f'\t\t\t(uuid "{board_setup.stable_uuid(uuid, "pad")}")\n'
+        f'\t\t)\n'
+        f'\t)\n'
+    )
+
+
+def synthetic_board(items, config, seed=0):
+    """Text of a .kicad_pcb with about items board items spread over the configured outline"""
+    rng = random.Random(seed)
+    left, top, right, bottom = board_setup.board_rect_from_config(config)
+    counts = {kind: int(items * share) for kind, share in MIX.items()}
+    counts["tracks"] += items - sum(counts.values())
+
+    def point():
+        return rng.randrange(left, right), rng.randrange(top, bottom)
+
+    out = [BOARD_HEADER]
+    for i in range(counts["footprints"]):
+        x, y = point()
+        out.append(_footprint("Synthetic:R_0603", board_setup.stable_uuid("bench-fp", i), x, y, f"R{i + 1}", 0.9))
+
+    # Old mounting holes in groups of four, like runs of the original delete-and-rebuild script
+    groups = []
+    for i in range(counts["mounting_holes"]):
+        uid = board_setup.stable_uuid("bench-hole", i)
+        x, y = point()
+        out.append(_footprint(config["ISOLATED_FOOTPRINT"], uid, x, y, "REF**", 2.7))
+        if i % 4 == 0:
+            groups.append([])
+        groups[-1].append(uid)
+
+    for i in range(counts["edge_cuts"]):
+        (x1, y1), (x2, y2) = point(), point()
+        out.append(
+            f'\t(gr_line\n\t\t(start {fmt_mm(x1)} {fmt_mm(y1)})\n\t\t(end {fmt_mm(x2)} {fmt_mm(y2)})\n'
+            f'\t\t(stroke\n\t\t\t(width 0.05)\n\t\t\t(type default)\n\t\t)\n\t\t(layer "Edge.Cuts")\n'
+            f'\t\t(uuid "{board_setup.stable_uuid("bench-edge", i)}")\n\t)\n')
+
+    for i in range(counts["tracks"]):
+        x1, y1 = point()
+        x2, y2 = x1 + rng.randrange(-mm_to_nm(5), mm_to_nm(5)), y1
+        out.append(
+            f'\t(segment\n\t\t(start {fmt_mm(x1)} {fmt_mm(y1)})\n\t\t(end {fmt_mm(x2)} {fmt_mm(y2)})\n'
+            f'\t\t(width 0.2)\n\t\t(layer "F.Cu")\n\t\t(net 0)\n'
+            f'\t\t(uuid "{board_setup.stable_uuid("bench-track", i)}")\n\t)\n')
+
+    for i, members in enumerate(groups):
+        name = board_setup.ISOLATED_GROUP_NAME if i % 2 else f"Old Mounting Holes {i}"
+        out.append(f'\t(group {quote(name)}\n\t\t(uuid "{board_setup.stable_uuid("bench-group", i)}")\n'
+                   f'\t\t(members {" ".join(quote(m) for m in members)})\n\t)\n')
+    out.append("\t(embedded_fonts no)\n)\n")
+    return "".join(out)
+
+
+def write_fixtures(sizes, directory, config):
+    """Write one synthetic board per size; returns {size: path}"""
+    paths = {}
+    for size in sizes:
+        path = os.path.join(directory, f"synthetic-{size}.kicad_pcb")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(synthetic_board(size, config))
+        paths[size] = path
+    return paths
+
+
+# =============================================================================
+# STAGES
+# =============================================================================
+
+
+def run_setup(pcb_path, config, memory=False):
+    """One headless setup run; the Trace holds its stages (board_setup.setup_board() plus parse and save)"""
+    with Trace(memory=memory) as trace:
+        with trace.stage("parse"):
+            with open(pcb_path, "r", encoding="utf-8", newline="") as f:
+                board = sx.parse(f.read())
+        # Cold cache, like the first run of a session
+        board_setup.setup_board(board, config, pcb_path, FootprintCache(index_path=None, pack_path=None),
+                                trace=trace)
+        with trace.stage("save"):
+            board.dumps()
+    return trace
+
+
+def _top_stages(trace, key):
+    return {record["name"]: record[key] for record in trace.stages if record["depth"] == 0 and key in record}
+
+
+# =============================================================================
+# CONSOLE SCRIPTS
+# =============================================================================
+
+
+def load_console_scripts():
+    """
+    Namespaces of complete-board-setup.py and add-mounting-holes.py with pcbnew_stub as their
+    pcbnew, so the KiCad console code paths run headless
+    """
+    sys.modules["pcbnew"] = pcbnew_stub
+    return {name: runpy.run_path(os.path.join(ENGINE_DIR, path), run_name=f"benchmark_{name}")
+            for name, path in CONSOLE_SCRIPTS.items()}
+
+
+def run_console_script(scripts, name, pcb_path):
+    """Run one console script on a stub board loaded from pcb_path; returns (seconds, pcbnew_stub.LOG copy)"""
+    board = pcbnew_stub.reset(pcbnew_stub.load_board(pcb_path))
+    cwd = os.getcwd()
+    # The scripts name their libraries relative to the project folder, like in KiCad
+    os.chdir(ENGINE_DIR)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            if name == "complete-board-setup":
+                scripts[name]["run_board_setup"](board, Trace())
+            else:
+                scripts[name]["add_mounting_holes"]()
+            seconds = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    return seconds, list(pcbnew_stub.LOG)
+
+
+def check_board_commit(scripts, pcb_path):
+    """
+    Problems with how complete-board-setup.py's in-editor run touches the board: with a
+    BOARD_COMMIT exactly one Push() and no board Add/Remove outside it; without one (the
+    fallback) at most one BuildConnectivity(); one Refresh() at most either way
+    """
+    problems = []
+    _, log = run_console_script(scripts, "complete-board-setup", pcb_path)
+    calls = [entry[0] for entry in log]
+    if calls.count("Push") != 1:
+        problems.append(f"{calls.count('Push')} BOARD_COMMIT pushes (expected 1)")
+    outside = [entry for entry in log if entry[0] in ("board.Add", "board.Remove") and not entry[2]]
+    if outside:
+        problems.append(f"{len(outside)} board Add/Remove calls outside the commit")
+    if calls.count("BuildConnectivity") > 1 or calls.count("Refresh") > 1:
+        problems.append(f"{calls.count('BuildConnectivity')} connectivity rebuilds, {calls.count('Refresh')} refreshes")
+
+    # pcbnew builds without a usable BOARD_COMMIT
+    commit = pcbnew_stub.BOARD_COMMIT
+    del pcbnew_stub.BOARD_COMMIT
+    try:
+        _, log = run_console_script(scripts, "complete-board-setup", pcb_path)
+    finally:
+        pcbnew_stub.BOARD_COMMIT = commit
+    calls = [entry[0] for entry in log]
+    if calls.count("BuildConnectivity") > 1 or calls.count("Refresh") > 1:
+        problems.append(f"without BOARD_COMMIT: {calls.count('BuildConnectivity')} connectivity rebuilds, "
+                        f"{calls.count('Refresh')} refreshes")
+    return problems
+
+
+def benchmark(pcb_path, config, repeat=3, scripts=None):
+    """{"seconds": {stage: median}, "peak_bytes": {stage: bytes}, "total_seconds"}; scripts adds console runs"""
+    runs = [_top_stages(run_setup(pcb_path, config), "wall") for _ in range(repeat)]
+    seconds = {stage: statistics.median(run[stage] for run in runs) for stage in runs[0]}
+    peaks = _top_stages(run_setup(pcb_path, config, memory=True), "memory_peak_bytes")
+    result = {"seconds": seconds, "peak_bytes": peaks, "total_seconds": sum(seconds.values())}
+    if scripts:
+        for name in CONSOLE_SCRIPTS:
+            result["seconds"][name] = statistics.median(
+                run_console_script(scripts, name, pcb_path)[0] for _ in range(repeat))
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Stages that got slower than baseline by more than threshold (fraction)"""
+    regressions = []
+    for size, result in results.items():
+        previous = baseline.get(str(size))
+        if previous is None:
+            continue
+        for stage, new in result["seconds"].items():
+            old = previous["seconds"].get(stage)
+            # Stages of a few milliseconds are mostly noise
+            if old and max(old, new) > MIN_COMPARED_SECONDS and new > old * (1 + threshold):
+                regressions.append((size, stage, old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the board setup stages on synthetic boards")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Board item counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size (median is reported)")
+    parser.add_argument("--json", help="Write the results here")
+    parser.add_argument("--compare", help="Earlier --json results; exit 1 when a stage regressed")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown for --compare")
+    parser.add_argument("--keep", help="Write the fixtures to this folder instead of a temporary one")
+    parser.add_argument("--scripts", action="store_true",
+                        help="Also time complete-board-setup.py and add-mounting-holes.py through pcbnew_stub")
+    parser.add_argument("--check", action="store_true",
+                        help="Only check the single BOARD_COMMIT of complete-board-setup.py on every fixture")
+    args = parser.parse_args()
+
+    config = board_setup.load_script_config()
+    # Fixtures live outside the project, so point the library at the real one
+    config["FOOTPRINT_LIB"] = board_setup.resolve_library(config["FOOTPRINT_LIB"], board_setup.SETUP_SCRIPT)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.keep or tmp
+        os.makedirs(directory, exist_ok=True)
+        fixtures = write_fixtures(args.sizes, directory, config)
+        if args.check:
+            scripts = load_console_scripts()
+            failed = False
+            for size, path in fixtures.items():
+                problems = check_board_commit(scripts, path)
+                for problem in problems:
+                    print(f"✗ {size} items: {problem}")
+                failed = failed or bool(problems)
+                if not problems:
+                    print(f"✓ {size} items: one BOARD_COMMIT push, connectivity and view updated once")
+            raise SystemExit(1 if failed else 0)
+        scripts = load_console_scripts() if args.scripts else None
+        columns = STAGES + (tuple(CONSOLE_SCRIPTS) if scripts else ())
+
+        print(f"{'items':>8} " + " ".join(f"{stage[:14]:>14}" for stage in columns) + f" {'total':>9} {'peak':>9}")
+        results = {}
+        for size, path in fixtures.items():
+            result = benchmark(path, config, args.repeat, scripts)
+            results[size] = result
+            print(f"{size:>8} " + " ".join(f"{result['seconds'][stage] * 1000:>12.2f}ms" for stage in columns) +
+                  f" {result['total_seconds'] * 1000:>7.1f}ms {max(result['peak_bytes'].values()) / 1e6:>7.1f}MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({str(size): result for size, result in results.items()}, f, indent=2)
+        print(f"💾 Saved {args.json}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for size, stage, old, new in regressions:
+            print(f"✗ {size} items, {stage}: {old * 1000:.2f}ms -> {new * 1000:.2f}ms")
+        if regressions:
+            raise SystemExit(1)
+        print(f"✓ No stage slower than {args.threshold:.0%} against {args.compare}")
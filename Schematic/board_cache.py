@@ -0,0 +1,239 @@
+"""
+Content-addressed cache of board setup results
+- Keyed by a SHA-256 over the input board, the configuration, the placed footprint
+  files and the engine sources: the same inputs always produce the same output board
+- Output boards are stored once per content hash (variants often share results),
+  entries point at them together with the setup report
+- Least recently used entries are evicted once the cache grows past its size cap
+- Safe for the parallel runners: every file is written to a temporary name and
+  swapped in, and readers treat a file that vanished mid-eviction as a miss
+
+Inspect or trim the cache:
+    python board_cache.py            # size and entry count
+    python board_cache.py --clear
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import board_setup
+import kicad_sexpr as sx
+from board_trace import Trace
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".board-cache")
+DEFAULT_MAX_MB = 256
+
+# Blobs without an entry are only removed once this old, a parallel put may be writing its entry
+ORPHAN_AGE_S = 60
+
+# Changing any of these invalidates every stored result
+ENGINE_FILES = ("board_setup.py", "board_placement.py", "board_geometry.py", "board_index.py", "board_drc.py",
+                "footprint_cache.py", "footprint_pack.py", "kicad_sexpr.py", "mounting_holes.py")
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# =============================================================================
+# INPUT HASHES
+# =============================================================================
+
+
+def hash_file(digest, path):
+    """Feed a file's name and content (or a missing marker) to a hashlib digest"""
+    digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        digest.update(b"missing")
+    digest.update(b"\0")
+
+
+def input_hash(board, config, *extra):
+    """SHA-256 over everything a setup result depends on; extra values (mode, rebuild) are mixed in"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"config": config, "extra": extra}, sort_keys=True).encode("utf-8"))
+    hash_file(digest, board)
+    # Design rules of the DRC stage
+    hash_file(digest, os.path.splitext(board)[0] + ".kicad_pro")
+    for path in board_setup.placement_footprint_files(config, board):
+        hash_file(digest, path)
+    for name in ENGINE_FILES:
+        hash_file(digest, os.path.join(ENGINE_DIR, name))
+    return digest.hexdigest()
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+
+class ResultCache:
+    """On-disk LRU cache: entries/<key>.json -> blobs/<sha256>.kicad_pcb"""
+
+    def __init__(self, path=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries_dir = os.path.join(path, "entries")
+        self.blobs_dir = os.path.join(path, "blobs")
+
+    def _entry_path(self, key):
+        return os.path.join(self.entries_dir, key + ".json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest + ".kicad_pcb")
+
+    def get(self, key):
+        """(output board text, report) for key, or None; a hit marks the entry as recently used"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(self._blob_path(entry["output"]), "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+            os.utime(entry_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return text, entry["report"]
+
+    def put(self, key, text, report):
+        """Store an output board and its report under key, then trim the cache to its cap"""
+        os.makedirs(self.entries_dir, exist_ok=True)
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        try:
+            os.utime(blob_path)
+        except FileNotFoundError:
+            sx.write_atomic(blob_path, data)
+        entry = {"output": digest, "report": report}
+        sx.write_atomic(self._entry_path(key), json.dumps(entry))
+        self.evict()
+
+    def _files(self, folder):
+        """(mtime, size, path) of the files in folder, temporary files left out"""
+        files = []
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            return files
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def size(self):
+        """(total bytes, entry count)"""
+        entries = self._files(self.entries_dir)
+        blobs = self._files(self.blobs_dir)
+        return sum(f[1] for f in entries + blobs), len(entries)
+
+    def evict(self, max_bytes=None):
+        """Drop least recently used entries (and blobs nobody points at) until under max_bytes"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._files(self.entries_dir))
+        blobs = {os.path.basename(path)[:-len(".kicad_pcb")]: (mtime, size, path)
+                 for mtime, size, path in self._files(self.blobs_dir)}
+        total = sum(f[1] for f in entries) + sum(blob[1] for blob in blobs.values())
+        if total <= max_bytes:
+            return 0
+
+        # Blob references of the surviving entries
+        refs = {}
+        outputs = {}
+        for _, _, path in entries:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    output = json.load(f)["output"]
+            except (OSError, ValueError, KeyError):
+                output = None
+            outputs[path] = output
+            refs[output] = refs.get(output, 0) + 1
+
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            output = outputs[path]
+            refs[output] -= 1
+            if not refs[output] and output in blobs:
+                _, blob_size, blob_path = blobs.pop(output)
+                try:
+                    os.remove(blob_path)
+                except FileNotFoundError:
+                    pass
+                total -= blob_size
+        # Blobs left behind by an interrupted put
+        for output, (mtime, _, blob_path) in blobs.items():
+            if not refs.get(output) and (max_bytes == 0 or time.time() - mtime > ORPHAN_AGE_S):
+                try:
+                    os.remove(blob_path)
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def clear(self):
+        return self.evict(0)
+
+
+def cached_board_setup(pcb_path, config, output_path=None, rebuild=False, cache=None, trace=None):
+    """
+    board_setup.complete_board_setup_headless() served from the cache when the inputs were
+    seen before; report["cached"] tells which it was.
+    """
+    cache = cache or ResultCache()
+    trace = trace or Trace()
+    output_path = output_path or pcb_path
+    with trace.stage("cache lookup"):
+        key = input_hash(pcb_path, config, rebuild)
+        hit = cache.get(key)
+    if hit is not None:
+        text, report = hit
+        with trace.stage("save"):
+            report["written"] = sx.save_text(output_path, text)
+        report["cached"] = True
+        trace.count("result cache hits")
+        return report
+
+    report = board_setup.complete_board_setup_headless(pcb_path, config, output_path, rebuild=rebuild, trace=trace)
+    with trace.stage("cache store"):
+        with open(output_path, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+        cache.put(key, text, {name: value for name, value in report.items() if name != "written"})
+    report["cached"] = False
+    trace.count("result cache misses")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show or trim the board setup result cache")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_DIR, help="Cache folder")
+    parser.add_argument("--max-mb", type=float, help="Evict down to this size")
+    parser.add_argument("--clear", action="store_true", help="Remove every entry")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache)
+    if args.clear:
+        print(f"✓ Removed {cache.clear()} entries")
+    elif args.max_mb is not None:
+        print(f"✓ Evicted {cache.evict(int(args.max_mb * (1 << 20)))} entries")
+    total, count = cache.size()
+    print(f"✓ {count} entries, {total / (1 << 20):.1f} MB in {args.cache}")
@@ -0,0 +1,400 @@
+"""
+DRC-lite: fast rule checks for the generated mechanical features of a board
+- Edge clearance: pads and holes closer to Edge.Cuts than the copper edge clearance,
+  or outside the board outline
+- Hole to hole: drilled holes (pads and vias) closer than the minimum hole spacing
+- Hole clearance: holes closer than the minimum hole clearance to the copper of other
+  footprints, tracks and vias
+- Courtyard overlap: courtyards of different footprints overlapping
+- Limits come from the project's design rules (.kicad_pro next to the board), with
+  KiCad's defaults when there is none
+
+Works on the parsed board (kicad_sexpr tree): pad extents and holes of every footprint
+are computed once as NumPy arrays (the pad layout of footprint_pack.py), candidates
+come from the board_index grid and only those get an exact circle/rectangle/segment
+distance. By default only the generated footprints (hidden "Board Setup" field) are
+checked, against everything on the board.
+
+    python board_drc.py "STAR Camera Daughter Board.kicad_pcb" [--all] [--json report.json]
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+import board_geometry as geometry
+import board_index
+import board_setup
+import kicad_sexpr as sx
+from footprint_cache import courtyard_bbox
+from footprint_pack import COPPER_LAYERS, PAD_DTYPE, PAD_SHAPES, layer_mask, pad_rows
+from kicad_sexpr import mm_to_nm
+
+
+# KiCad's defaults, used when the board has no .kicad_pro
+DEFAULT_RULES = {
+    "min_copper_edge_clearance": 0.5,
+    "min_hole_to_hole": 0.25,
+    "min_hole_clearance": 0.25,
+}
+
+COPPER_MASK = layer_mask(COPPER_LAYERS)
+CIRCLE_SHAPE = PAD_SHAPES.index("circle")
+
+RULES = ("edge clearance", "hole to hole", "hole clearance", "courtyard overlap")
+
+OUTSIDE = "outside the board outline"
+
+
+def project_rules(board_path):
+    """Design rule limits (mm) of the .kicad_pro next to the board, KiCad defaults otherwise"""
+    rules = dict(DEFAULT_RULES)
+    try:
+        with open(os.path.splitext(board_path)[0] + ".kicad_pro", "r", encoding="utf-8") as f:
+            project_rules = json.load(f)["board"]["design_settings"]["rules"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return rules
+    for name in rules:
+        if isinstance(project_rules.get(name), (int, float)):
+            rules[name] = project_rules[name]
+    return rules
+
+
+# =============================================================================
+# FEATURES
+# =============================================================================
+# Shapes: ("rect", (l, t, r, b)), ("circle", (cx, cy, radius)), ("segment", (x1, y1, x2, y2, half_width))
+
+
+def _shape_rect(kind, geom):
+    if kind == "rect":
+        return geom
+    if kind == "circle":
+        x, y, r = geom
+        return x - r, y - r, x + r, y + r
+    x1, y1, x2, y2, half = geom
+    return min(x1, x2) - half, min(y1, y2) - half, max(x1, x2) + half, max(y1, y2) + half
+
+
+def footprint_shapes(footprint):
+    """(copper, holes, courtyard) of a board footprint in board coordinates"""
+    at = footprint.find("at")
+    position = (mm_to_nm(at[1]), mm_to_nm(at[2]))
+    angle = float(at[3]) if len(at) > 3 else 0.0
+
+    pads = np.array(pad_rows(footprint), dtype=PAD_DTYPE)
+    copper = []
+    holes = []
+    if len(pads):
+        centres = geometry.rotate(np.stack([pads["x"], pads["y"]], axis=-1), angle) + np.asarray(position)
+        # Pad angles in board files already include the footprint rotation
+        a = np.deg2rad(pads["angle"].astype(np.float64))
+        w, h = pads["width"] / 2, pads["height"] / 2
+        round_pad = pads["shape"] == CIRCLE_SHAPE
+        half_x = np.where(round_pad, w, np.abs(w * np.cos(a)) + np.abs(h * np.sin(a)))
+        half_y = np.where(round_pad, w, np.abs(w * np.sin(a)) + np.abs(h * np.cos(a)))
+        half = np.rint(np.stack([half_x, half_y], axis=-1)).astype(np.int64)
+        on_copper = (pads["layers"] & COPPER_MASK) != 0
+        for (x, y), (hx, hy) in zip(centres[on_copper].tolist(), half[on_copper].tolist()):
+            copper.append(("rect", (x - hx, y - hy, x + hx, y + hy)))
+        drilled = pads["drill_width"] > 0
+        radii = np.maximum(pads["drill_width"], pads["drill_height"]) // 2
+        for (x, y), r in zip(centres[drilled].tolist(), radii[drilled].tolist()):
+            holes.append(("circle", (x, y, r)))
+
+    courtyard = courtyard_bbox(footprint)
+    if courtyard is not None:
+        courtyard = ("rect", board_index.placed_rect(courtyard, position, angle))
+    return copper, holes, courtyard
+
+
+def _edge_segments(item):
+    """Edge.Cuts drawing as (x1, y1, x2, y2) segments; arcs and circles as chords"""
+    head = item.head
+    if head == "gr_rect":
+        (left, top), (right, bottom) = sx.xy(item, "start"), sx.xy(item, "end")
+        points = [(left, top), (right, top), (right, bottom), (left, bottom), (left, top)]
+    elif head == "gr_line":
+        points = [sx.xy(item, "start"), sx.xy(item, "end")]
+    elif head == "gr_arc":
+        points = [sx.xy(item, "start"), sx.xy(item, "mid"), sx.xy(item, "end")]
+    elif head == "gr_circle":
+        (cx, cy), (ex, ey) = sx.xy(item, "center"), sx.xy(item, "end")
+        points = geometry.bolt_circle((cx, cy), int(math.hypot(ex - cx, ey - cy)), 32).tolist()
+        points.append(points[0])
+    elif head == "gr_poly":
+        pts = item.find("pts")
+        points = [(mm_to_nm(xy[1]), mm_to_nm(xy[2])) for xy in pts.children("xy")] if pts is not None else []
+        points = points + points[:1]
+    else:
+        return []
+    return [(*a, *b) for a, b in zip(points, points[1:])]
+
+
+def board_features(board):
+    """
+    Copper, hole and courtyard shapes of every footprint, track and via, and the Edge.Cuts
+    segments. Shapes are (kind, geometry, owner); owners indexes the display names.
+    """
+    features = {"owners": [], "generated": set(), "copper": [], "holes": [], "courtyards": [], "edges": []}
+    owners = features["owners"]
+    for item in board.children():
+        head = item.head
+        if head == "footprint":
+            owner = len(owners)
+            key = board_setup.setup_key(item)
+            owners.append(key or board_index.footprint_reference(item))
+            if key is not None:
+                features["generated"].add(owner)
+            copper, holes, courtyard = footprint_shapes(item)
+            features["copper"] += [(kind, geom, owner) for kind, geom in copper]
+            features["holes"] += [(kind, geom, owner) for kind, geom in holes]
+            if courtyard is not None:
+                features["courtyards"].append((*courtyard, owner))
+        elif head in ("segment", "arc"):
+            owner = len(owners)
+            owners.append(f"track on {item.get('layer')}")
+            points = [sx.xy(item, name) for name in ("start", "mid", "end") if item.find(name) is not None]
+            half = mm_to_nm(item.get("width", default=0)) // 2
+            for a, b in zip(points, points[1:]):
+                features["copper"].append(("segment", (*a, *b, half), owner))
+        elif head == "via":
+            owner = len(owners)
+            owners.append("via")
+            x, y = sx.xy(item, "at")
+            features["copper"].append(("circle", (x, y, mm_to_nm(item.get("size", default=0)) // 2), owner))
+            features["holes"].append(("circle", (x, y, mm_to_nm(item.get("drill", default=0)) // 2), owner))
+        elif head and head.startswith("gr_") and item.get("layer") == "Edge.Cuts":
+            features["edges"] += _edge_segments(item)
+    return features
+
+
+# =============================================================================
+# DISTANCES
+# =============================================================================
+
+
+def _point_segment(px, py, x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    length2 = dx * dx + dy * dy
+    t = 0.0 if not length2 else max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length2))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+def _point_rect(px, py, rect):
+    dx = max(rect[0] - px, 0, px - rect[2])
+    dy = max(rect[1] - py, 0, py - rect[3])
+    return math.hypot(dx, dy)
+
+
+def _segments_cross(x1, y1, x2, y2, x3, y3, x4, y4):
+    d1 = (x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)
+    d2 = (x4 - x3) * (y2 - y3) - (y4 - y3) * (x2 - x3)
+    d3 = (x2 - x1) * (y3 - y1) - (y2 - y1) * (x3 - x1)
+    d4 = (x2 - x1) * (y4 - y1) - (y2 - y1) * (x4 - x1)
+    return d1 * d2 < 0 and d3 * d4 < 0
+
+
+def _rect_segment(rect, x1, y1, x2, y2):
+    """Distance from a rectangle to a segment's centre line, 0 when they touch"""
+    left, top, right, bottom = rect
+    corners = ((left, top), (right, top), (right, bottom), (left, bottom))
+    distance = min(_point_rect(x1, y1, rect), _point_rect(x2, y2, rect))
+    if distance and any(_segments_cross(x1, y1, x2, y2, *a, *b) for a, b in zip(corners, corners[1:] + corners[:1])):
+        return 0.0
+    return min([distance] + [_point_segment(x, y, x1, y1, x2, y2) for x, y in corners])
+
+
+def shape_gap(a, b):
+    """
+    Edge-to-edge distance (nm) between two shapes, 0 when they touch or overlap
+
+    >>> shape_gap(("rect", (0, 0, 10, 10)), ("segment", (100, 0, 200, 0, 1)))
+    89
+    """
+    order = ("circle", "rect", "segment")
+    if order.index(a[0]) > order.index(b[0]):
+        a, b = b, a
+    (kind_a, ga), (kind_b, gb) = a[:2], b[:2]
+    if kind_a == "circle":
+        x, y, r = ga
+        if kind_b == "circle":
+            distance = math.hypot(x - gb[0], y - gb[1]) - r - gb[2]
+        elif kind_b == "rect":
+            distance = _point_rect(x, y, gb) - r
+        else:
+            distance = _point_segment(x, y, *gb[:4]) - r - gb[4]
+    elif kind_b == "rect":
+        distance = board_index.rect_gap(ga, gb)
+    else:
+        distance = _rect_segment(ga, *gb[:4]) - gb[4]
+    return max(int(round(distance)), 0)
+
+
+def _point_segments(points, segments):
+    """(P, S) distances from points (P, 2) to segments (S, 4)"""
+    p = points[:, None, :]
+    start, end = segments[None, :, :2], segments[None, :, 2:]
+    d = end - start
+    length2 = np.sum(d * d, axis=-1)
+    t = np.clip(np.sum((p - start) * d, axis=-1) / np.where(length2 == 0, 1.0, length2), 0.0, 1.0)
+    return np.hypot(*np.moveaxis(p - (start + t[..., None] * d), -1, 0))
+
+
+def _cross(o, a, b):
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+def edge_gaps(shapes, edges):
+    """
+    Distance (nm) from each rect/circle shape to the nearest Edge.Cuts segment, vectorized;
+    -1 for shapes whose centre is outside the outline (notches and cut-outs included).
+
+    >>> notch = [(0, 0, 100, 0), (100, 0, 100, 100), (100, 100, 60, 100), (60, 100, 60, 40),
+    ...          (60, 40, 40, 40), (40, 40, 40, 100), (40, 100, 0, 100), (0, 100, 0, 0)]
+    >>> edge_gaps([("circle", (50, 80, 5)), ("circle", (20, 50, 5))], notch).tolist()
+    [-1, 15]
+    """
+    if not shapes:
+        return np.zeros(0, dtype=np.int64)
+    edges = np.asarray(edges, dtype=np.float64)
+    rects = np.array([_shape_rect(*shape[:2]) for shape in shapes], dtype=np.float64)
+    gaps = np.empty(len(shapes))
+
+    round_shapes = np.array([shape[0] == "circle" for shape in shapes])
+    if round_shapes.any():
+        circles = np.array([shape[1] for shape in shapes if shape[0] == "circle"], dtype=np.float64)
+        gaps[round_shapes] = _point_segments(circles[:, :2], edges).min(axis=1) - circles[:, 2]
+    boxes = rects[~round_shapes]
+    if len(boxes):
+        left, top, right, bottom = boxes.T
+        corners = np.stack([np.stack([left, top], -1), np.stack([right, top], -1),
+                            np.stack([right, bottom], -1), np.stack([left, bottom], -1)], axis=1)
+        distance = _point_segments(corners.reshape(-1, 2), edges).reshape(len(boxes), 4, -1).min(axis=(1, 2))
+        # Segment end points against the rectangles
+        ends = edges.reshape(-1, 2)
+        dx = np.maximum(np.maximum(left[:, None] - ends[None, :, 0], ends[None, :, 0] - right[:, None]), 0)
+        dy = np.maximum(np.maximum(top[:, None] - ends[None, :, 1], ends[None, :, 1] - bottom[:, None]), 0)
+        distance = np.minimum(distance, np.hypot(dx, dy).min(axis=1))
+        # Segments crossing a rectangle side
+        a, b = corners[:, :, None, :], np.roll(corners, -1, axis=1)[:, :, None, :]
+        c, d = edges[None, None, :, :2], edges[None, None, :, 2:]
+        crossing = (((_cross(a, b, c) > 0) != (_cross(a, b, d) > 0)) &
+                    ((_cross(c, d, a) > 0) != (_cross(c, d, b) > 0))).any(axis=(1, 2))
+        gaps[~round_shapes] = np.where(crossing, 0.0, distance)
+
+    gaps = np.maximum(np.rint(gaps), 0).astype(np.int64)
+    # A shape crossing the outline already has gap 0, so its centre decides the rest
+    inside = geometry.points_in_polygon(np.rint((rects[:, :2] + rects[:, 2:]) / 2), edges)
+    return np.where(inside, gaps, -1)
+
+
+def _overlap(a, b):
+    """True when two rectangles share a positive area"""
+    return min(a[2], b[2]) > max(a[0], b[0]) and min(a[3], b[3]) > max(a[1], b[1])
+
+
+# =============================================================================
+# CHECK
+# =============================================================================
+
+
+def check_features(features, rules=None, check_all=False):
+    """
+    Rule violations of the checked footprints (generated ones unless check_all): dicts with
+    rule, item, other, gap_nm and clearance_nm, closest pair per rule and item.
+    """
+    rules = rules or DEFAULT_RULES
+    owners = features["owners"]
+    checked = set(range(len(owners))) if check_all else features["generated"]
+    found = {}
+
+    def report(rule, owner, other, gap, clearance):
+        names = (owners[owner], other if isinstance(other, str) else owners[other])
+        key = (rule, names) if isinstance(other, str) else (rule, tuple(sorted(names)))
+        if key not in found or gap < found[key]["gap_nm"]:
+            found[key] = {"rule": rule, "item": names[0], "other": names[1], "gap_nm": gap, "clearance_nm": clearance}
+
+    # Edge clearance: pads and holes against the outline, all at once
+    edge_clearance = int(mm_to_nm(rules["min_copper_edge_clearance"]))
+    if features["edges"]:
+        shapes = [shape for shape in features["copper"] + features["holes"] if shape[2] in checked]
+        for shape, gap in zip(shapes, edge_gaps(shapes, features["edges"]).tolist()):
+            if gap < 0:
+                report("edge clearance", shape[2], OUTSIDE, 0, edge_clearance)
+            elif gap < edge_clearance:
+                report("edge clearance", shape[2], "Edge.Cuts", gap, edge_clearance)
+
+    # Hole to hole and hole clearance: candidates from the grid, exact distance after
+    for rule, limit, queries, targets in (
+            ("hole to hole", "min_hole_to_hole", features["holes"], features["holes"]),
+            ("hole clearance", "min_hole_clearance", features["holes"], features["copper"]),
+            ("hole clearance", "min_hole_clearance", features["copper"], features["holes"])):
+        clearance = int(mm_to_nm(rules[limit]))
+        index = board_index.build_index((_shape_rect(*shape[:2]), i) for i, shape in enumerate(targets))
+        for shape in queries:
+            if shape[2] not in checked:
+                continue
+            for i, _, _ in index.query(_shape_rect(*shape[:2]), clearance):
+                other = targets[i]
+                if other[2] == shape[2]:
+                    continue
+                gap = shape_gap(shape, other)
+                if gap < clearance:
+                    report(rule, shape[2], other[2], gap, clearance)
+
+    # Courtyard overlap
+    courtyards = features["courtyards"]
+    index = board_index.build_index((shape[1], i) for i, shape in enumerate(courtyards))
+    for kind, rect, owner in courtyards:
+        if owner not in checked:
+            continue
+        for i, other_rect, _ in index.query(rect):
+            if courtyards[i][2] != owner and _overlap(rect, other_rect):
+                report("courtyard overlap", owner, courtyards[i][2], 0, 0)
+
+    return sorted(found.values(), key=lambda v: (RULES.index(v["rule"]), v["item"], v["other"]))
+
+
+def check_board(board, rules=None, check_all=False):
+    """check_features() on a parsed board"""
+    return check_features(board_features(board), rules, check_all)
+
+
+def format_violation(v):
+    if v["rule"] == "courtyard overlap":
+        return f"⚠ {v['rule']}: {v['item']} overlaps {v['other']}"
+    if v["other"] == OUTSIDE:
+        return f"⚠ {v['rule']}: {v['item']} is {OUTSIDE}"
+    return f"⚠ {v['rule']}: {board_index.describe_gap(v)}"
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Fast rule checks for the generated board features")
+    parser.add_argument("board", help=".kicad_pcb file to check")
+    parser.add_argument("--all", action="store_true", help="Check every footprint, not only the generated ones")
+    parser.add_argument("--json", help="Write the violations as JSON")
+    args = parser.parse_args()
+
+    board = sx.load(args.board)
+    if board.head != "kicad_pcb":
+        parser.error(f"{args.board} is not a KiCad board file")
+    start = time.perf_counter()
+    violations = check_board(board, project_rules(args.board), args.all)
+    seconds = time.perf_counter() - start
+
+    for v in violations:
+        print(format_violation(v))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(violations, f, indent=2)
+        print(f"💾 Report: {args.json}")
+    mark = "✗" if violations else "✓"
+    print(f"{mark} {len(violations)} violations in {seconds * 1000:.1f}ms")
+    if violations:
+        raise SystemExit(1)
@@ -0,0 +1,402 @@
+"""
+Headless fabrication outputs: Gerbers, Excellon drill files and a position file
+- Gerbers: one worker process per layer. Each layer runs kicad-cli (KiCad 8+), or uses
+  pcbnew's PLOT_CONTROLLER when the KiCad Python module is importable
+- Plotted layers are the ones ticked in the board's plot settings (pcbplotparams
+  layerselection) that exist in its layer stack. A 4-layer board gets In1.Cu/In2.Cu
+  without any configuration
+- Drill (PTH and NPTH, slots included) and position files are written straight from the
+  parsed board (kicad_sexpr.py), so the mounting holes need no KiCad install at all
+- Every file goes into <board>-fab.zip as soon as it is done, streamed from disk in job
+  order (the zip is never built in memory). Fixed timestamps make the zip reproducible
+- The zip comment records a hash of the inputs; an up-to-date board is skipped
+
+    python board_fab.py "STAR Camera Daughter Board.kicad_pcb" [more boards...] [-o fab/] [-j 8]
+    python board_variants.py variants.yaml -o variants/ --fab fab/
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import board_geometry as geometry
+import board_index
+import kicad_sexpr as sx
+from board_cache import hash_file
+from footprint_pack import COPPER_LAYERS
+from kicad_schematic import natural_key
+from kicad_sexpr import mm_to_nm
+
+
+# Plotted when the board has no plot settings (KiCad's usual fab set)
+DEFAULT_FAB_LAYERS = ("F.Paste", "B.Paste", "F.SilkS", "B.SilkS", "F.Mask", "B.Mask", "Edge.Cuts")
+
+# Files the zip hash depends on besides the board
+ENGINE_FILES = ("board_fab.py", "board_geometry.py", "kicad_schematic.py", "kicad_sexpr.py")
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+HASH_PREFIX = "board-fab "
+
+
+class FabError(RuntimeError):
+    """Raised when an output can't be produced"""
+
+
+# =============================================================================
+# LAYERS
+# =============================================================================
+
+
+def board_layers(board):
+    """{name: KiCad layer id} of the board's layer stack"""
+    layers = board.find("layers")
+    if layers is None:
+        return {}
+    return {sx.unquote(layer[1]): int(layer[0]) for layer in layers.children() if len(layer) > 1}
+
+
+def plot_layers(board):
+    """Layers to plot: the board's plot selection within its stack, copper first"""
+    stack = board_layers(board)
+    selection = None
+    setup = board.find("setup")
+    params = setup.find("pcbplotparams") if setup is not None else None
+    if params is not None and params.get("layerselection"):
+        selection = int(params.get("layerselection").replace("_", ""), 16)
+    if selection is None:
+        chosen = [name for name in stack if name.endswith(".Cu") or name in DEFAULT_FAB_LAYERS]
+    else:
+        chosen = [name for name, layer_id in stack.items() if selection >> layer_id & 1]
+    copper = [name for name in COPPER_LAYERS if name in chosen]
+    return copper + [name for name in chosen if name not in copper]
+
+
+def copper_layer_count(board):
+    return sum(1 for name in board_layers(board) if name.endswith(".Cu"))
+
+
+def layer_file_name(stem, layer):
+    """KiCad's plot file naming: <board>-F_Cu.gbr"""
+    return f"{stem}-{layer.replace('.', '_')}.gbr"
+
+
+# =============================================================================
+# GERBERS (kicad-cli or pcbnew)
+# =============================================================================
+
+
+def gerber_backend():
+    """"kicad-cli", "pcbnew" or None"""
+    if shutil.which("kicad-cli"):
+        return "kicad-cli"
+    try:
+        import pcbnew  # noqa: F401
+    except ImportError:
+        return None
+    return "pcbnew"
+
+
+def plot_gerber(board_path, layer, output_path, backend):
+    """Plot one layer to output_path (runs in a worker process)"""
+    if backend == "kicad-cli":
+        result = subprocess.run(["kicad-cli", "pcb", "export", "gerber", "--layers", layer,
+                                 "--output", output_path, board_path], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise FabError(f"kicad-cli failed on {layer}: {(result.stderr or result.stdout).strip()}")
+    elif backend == "pcbnew":
+        import pcbnew
+        board = pcbnew.LoadBoard(board_path)
+        controller = pcbnew.PLOT_CONTROLLER(board)
+        options = controller.GetPlotOptions()
+        options.SetOutputDirectory(os.path.dirname(os.path.abspath(output_path)))
+        controller.SetLayer(board.GetLayerID(layer))
+        controller.OpenPlotfile(layer.replace(".", "_"), pcbnew.PLOT_FORMAT_GERBER, layer)
+        controller.PlotLayer()
+        plotted = controller.GetPlotFileName()
+        controller.ClosePlot()
+        if os.path.abspath(plotted) != os.path.abspath(output_path):
+            os.replace(plotted, output_path)
+    else:
+        raise FabError("Gerbers need kicad-cli or the pcbnew module (KiCad 8+)")
+    return [output_path]
+
+
+# =============================================================================
+# DRILL FILES (Excellon)
+# =============================================================================
+
+
+def _rotated(x, y, angle):
+    return geometry.rotate([(x, y)], angle)[0].tolist()
+
+
+def board_holes(board):
+    """
+    Every drilled hole: dicts with plated, x, y, diameter and, for slots, the far end
+    (x2, y2). Footprint pads and vias, in board coordinates (nm).
+    """
+    holes = []
+    for item in board.children():
+        if item.head == "via":
+            at = item.find("at")
+            drill = mm_to_nm(item.get("drill", default=0))
+            if drill:
+                holes.append({"plated": True, "x": mm_to_nm(at[1]), "y": mm_to_nm(at[2]), "diameter": drill})
+        if item.head != "footprint":
+            continue
+        at = item.find("at")
+        origin = np.array([mm_to_nm(at[1]), mm_to_nm(at[2])], dtype=np.int64)
+        angle = float(at[3]) if len(at) > 3 else 0.0
+        for pad in item.children("pad"):
+            drill = pad.find("drill")
+            sizes = [atom for atom in drill.atoms() if atom != "oval"] if drill is not None else []
+            if not sizes:
+                continue
+            pad_at = pad.find("at")
+            pad_angle = float(pad_at[3]) if len(pad_at) > 3 else 0.0  # Includes the footprint rotation
+            x, y = (origin + _rotated(mm_to_nm(pad_at[1]), mm_to_nm(pad_at[2]), angle)).tolist()
+            offset = drill.find("offset")
+            if offset is not None:
+                dx, dy = _rotated(mm_to_nm(offset[1]), mm_to_nm(offset[2]), pad_angle)
+                x, y = x + dx, y + dy
+            width = mm_to_nm(sizes[0])
+            height = mm_to_nm(sizes[1]) if len(sizes) > 1 else width
+            hole = {"plated": pad[2] != "np_thru_hole", "x": x, "y": y, "diameter": min(width, height)}
+            if width != height:
+                # Slot along the long axis, drawn between the centres of its round ends
+                half = abs(width - height) // 2
+                (ax, ay), (bx, by) = geometry.rotate(
+                    [(-half, 0), (half, 0)] if width > height else [(0, -half), (0, half)], pad_angle)
+                hole.update(x=x + int(ax), y=y + int(ay), x2=x + int(bx), y2=y + int(by))
+            holes.append(hole)
+    return holes
+
+
+def _mm(value):
+    return f"{value / geometry.NM_PER_MM:.3f}"
+
+
+def excellon(holes, plated, layer_count):
+    """Excellon text in KiCad's metric decimal format (Y up, like KiCad's own drill files)"""
+    holes = [hole for hole in holes if hole["plated"] == plated]
+    tools = sorted({hole["diameter"] for hole in holes})
+    kind = ("Plated", "PTH") if plated else ("NonPlated", "NPTH")
+    lines = [
+        "M48",
+        "; DRILL file {board_fab.py}",
+        "; FORMAT={-:-/ absolute / metric / decimal}",
+        f"; #@! TF.FileFunction,{kind[0]},1,{layer_count},{kind[1]}",
+        "FMAT,2",
+        "METRIC",
+    ]
+    lines += [f"T{i}C{_mm(diameter)}" for i, diameter in enumerate(tools, 1)]
+    lines += ["%", "G90", "G05"]
+    for i, diameter in enumerate(tools, 1):
+        lines.append(f"T{i}")
+        for hole in sorted((h for h in holes if h["diameter"] == diameter), key=lambda h: (h["x"], h["y"])):
+            if "x2" in hole:
+                lines.append(f"X{_mm(hole['x'])}Y{_mm(-hole['y'])}G85X{_mm(hole['x2'])}Y{_mm(-hole['y2'])}")
+            else:
+                lines.append(f"X{_mm(hole['x'])}Y{_mm(-hole['y'])}")
+    lines += ["M30", ""]
+    return "\n".join(lines)
+
+
+def write_drill(board_path, output_dir):
+    """<board>-PTH.drl and <board>-NPTH.drl (runs in a worker process)"""
+    board = sx.load(board_path)
+    stem = os.path.splitext(os.path.basename(board_path))[0]
+    holes = board_holes(board)
+    layer_count = copper_layer_count(board)
+    paths = []
+    for plated, suffix in ((True, "PTH"), (False, "NPTH")):
+        path = os.path.join(output_dir, f"{stem}-{suffix}.drl")
+        sx.save_text(path, excellon(holes, plated, layer_count))
+        paths.append(path)
+    return paths
+
+
+# =============================================================================
+# POSITION FILE
+# =============================================================================
+
+
+def _csv(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def positions(board):
+    """KiCad position file rows (Ref, Val, Package, PosX, PosY, Rot, Side), sorted by reference"""
+    rows = []
+    for footprint in board.children("footprint"):
+        attrs = footprint.find("attr")
+        if attrs is not None and ("exclude_from_pos_files" in attrs.atoms() or "board_only" in attrs.atoms()):
+            continue
+        value = next((sx.unquote(prop[2]) for prop in footprint.children("property")
+                      if len(prop) > 2 and sx.unquote(prop[1]) == "Value"), "")
+        at = footprint.find("at")
+        rows.append((
+            board_index.footprint_reference(footprint),
+            value,
+            sx.unquote(footprint[1]).split(":")[-1],
+            mm_to_nm(at[1]),
+            -mm_to_nm(at[2]),
+            float(at[3]) if len(at) > 3 else 0.0,
+            "bottom" if footprint.get("layer") == "B.Cu" else "top",
+        ))
+    return sorted(rows, key=lambda row: natural_key(row[0]))
+
+
+def write_positions(board_path, output_dir):
+    """<board>-pos.csv in KiCad's CSV layout (runs in a worker process)"""
+    stem = os.path.splitext(os.path.basename(board_path))[0]
+    lines = ["Ref,Val,Package,PosX,PosY,Rot,Side"]
+    for ref, value, package, x, y, rotation, side in positions(sx.load(board_path)):
+        lines.append(f"{_csv(ref)},{_csv(value)},{_csv(package)},"
+                     f"{x / geometry.NM_PER_MM:.4f},{y / geometry.NM_PER_MM:.4f},{rotation:.6f},{side}")
+    path = os.path.join(output_dir, f"{stem}-pos.csv")
+    sx.save_text(path, "\n".join(lines) + "\n")
+    return [path]
+
+
+# =============================================================================
+# JOBS
+# =============================================================================
+
+
+def fab_hash(board_path, backend):
+    """SHA-256 of the board, the engine and the Gerber backend"""
+    digest = hashlib.sha256(str(backend).encode("utf-8"))
+    for path in [board_path] + [os.path.join(ENGINE_DIR, name) for name in ENGINE_FILES]:
+        hash_file(digest, path)
+    return digest.hexdigest()
+
+
+def zip_path(board_path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(board_path))[0] + "-fab.zip")
+
+
+def up_to_date(board_path, output_dir, digest):
+    try:
+        with zipfile.ZipFile(zip_path(board_path, output_dir)) as zf:
+            return zf.comment.decode("utf-8", "replace") == HASH_PREFIX + digest
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def plan_fab(board_path, output_dir, backend, gerbers=True):
+    """Jobs (function, args) for one board; files go to <output_dir>/<board>/"""
+    board = sx.load(board_path)
+    if board.head != "kicad_pcb":
+        raise FabError(f"{board_path} is not a KiCad board file")
+    stem = os.path.splitext(os.path.basename(board_path))[0]
+    files_dir = os.path.join(output_dir, stem)
+    jobs = []
+    if gerbers:
+        jobs += [(plot_gerber, (board_path, layer, os.path.join(files_dir, layer_file_name(stem, layer)), backend))
+                 for layer in plot_layers(board)]
+    jobs += [(write_drill, (board_path, files_dir)), (write_positions, (board_path, files_dir))]
+    return files_dir, jobs
+
+
+def _run(job):
+    function, args = job
+    return function(*args)
+
+
+def _zip_file(zf, path, arcname):
+    """Copy one file into the zip in blocks"""
+    info = zipfile.ZipInfo(arcname, date_time=ZIP_DATE)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    with open(path, "rb") as src, zf.open(info, "w") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def export_boards(board_paths, output_dir="fab", workers=None, gerbers=True, force=False):
+    """
+    Fab outputs of several boards over one process pool.
+    Returns a row per board: board, status, zip, files.
+    """
+    backend = gerber_backend() if gerbers else None
+    if gerbers and backend is None:
+        raise FabError("Gerbers need kicad-cli or the pcbnew module (KiCad 8+) - use --no-gerbers for drill/position only")
+    os.makedirs(output_dir, exist_ok=True)
+
+    rows = []
+    planned = []
+    for board_path in board_paths:
+        row = {"board": board_path, "zip": zip_path(board_path, output_dir), "files": 0}
+        rows.append(row)
+        try:
+            digest = fab_hash(board_path, backend)
+            if not force and up_to_date(board_path, output_dir, digest):
+                row["status"] = "up to date"
+                continue
+            files_dir, jobs = plan_fab(board_path, output_dir, backend, gerbers)
+        except (OSError, sx.SExprError, FabError) as e:
+            row["status"] = f"error: {e}"
+            continue
+        os.makedirs(files_dir, exist_ok=True)
+        planned.append((row, digest, files_dir, jobs))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Everything is submitted up front; zips are filled in board and job order as results arrive
+        futures = [(row, digest, files_dir, [pool.submit(_run, job) for job in jobs])
+                   for row, digest, files_dir, jobs in planned]
+        for row, digest, files_dir, jobs in futures:
+            try:
+                # Streamed to a temporary file next to the zip, swapped in once complete
+                with sx.atomic_file(row["zip"]) as f, zipfile.ZipFile(f, "w") as zf:
+                    for future in jobs:
+                        for path in future.result():
+                            _zip_file(zf, path, os.path.basename(path))
+                            row["files"] += 1
+                    zf.comment = (HASH_PREFIX + digest).encode("utf-8")
+            except Exception as e:  # One bad board must not stop the others
+                for future in jobs:
+                    future.cancel()
+                row["status"] = f"error: {e}"
+                continue
+            row["status"] = "ok"
+    return rows
+
+
+def print_rows(rows):
+    for row in rows:
+        if row["status"] == "ok":
+            print(f"💾 {row['zip']} ({row['files']} files)")
+        elif row["status"] == "up to date":
+            print(f"✓ {row['zip']} already up to date")
+        else:
+            print(f"✗ {row['board']}: {row['status']}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Plot Gerbers, drill and position files into a zip per board")
+    parser.add_argument("boards", nargs="+", help=".kicad_pcb files")
+    parser.add_argument("-o", "--output-dir", default="fab", help="Where the <board>-fab.zip files go")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-gerbers", dest="gerbers", action="store_false",
+                        help="Only the drill and position files (no KiCad install needed)")
+    parser.add_argument("--force", action="store_true", help="Regenerate boards whose zip is up to date")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        rows = export_boards(args.boards, args.output_dir, args.jobs, args.gerbers, args.force)
+    except FabError as e:
+        parser.error(str(e))
+    print_rows(rows)
+    failed = [row for row in rows if row["status"].startswith("error")]
+    print(f"✓ {len(rows) - len(failed)}/{len(rows)} boards in {time.perf_counter() - start:.2f}s")
+    if failed:
+        raise SystemExit(1)
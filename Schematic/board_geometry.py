@@ -0,0 +1,154 @@
+"""
+Vectorized board geometry (NumPy, integer nanometres)
+- Every function works on whole arrays of points/rectangles at once
+- Coordinates are int64 KiCad internal units (1 nm); millimetres are converted
+  once with rounding, so there is no float drift between placements
+- Rectangles are (left, top, right, bottom); KiCad Y grows downward
+
+Shared by complete-board-setup.py, add-mounting-holes.py, board_setup.py and board_placement.py;
+board_drc.py tests shapes against the Edge.Cuts polygon with points_in_polygon().
+Requires numpy (pip install numpy).
+"""
+
+import numpy as np
+
+
+NM_PER_MM = 1000000
+
+# Corner order used by the setup scripts
+BOTTOM_LEFT, TOP_LEFT, TOP_RIGHT, BOTTOM_RIGHT = range(4)
+
+
+def mm_to_nm(values):
+    """Millimetres (scalar or array) to int64 nanometres, rounded once"""
+    return np.rint(np.asarray(values, dtype=np.float64) * NM_PER_MM).astype(np.int64)
+
+
+def as_points(points):
+    """(N, 2) int64 array from any point-like input"""
+    return np.asarray(points, dtype=np.int64).reshape(-1, 2)
+
+
+def as_rects(rects):
+    """(K, 4) int64 array of (left, top, right, bottom)"""
+    return np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+
+
+# =============================================================================
+# RECTANGLES
+# =============================================================================
+
+
+def rect_from_centre(centre_x, centre_y, width, height):
+    """Rectangles from centre and size (all nm, broadcastable)"""
+    centre_x, centre_y, width, height = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.int64) for v in (centre_x, centre_y, width, height)))
+    half_w = width // 2
+    half_h = height // 2
+    return np.stack([centre_x - half_w, centre_y - half_h, centre_x + half_w, centre_y + half_h], axis=-1)
+
+
+def inset_rect(rects, inset):
+    """Shrink rectangles by inset on every side (negative grows them); inset may be per-rect"""
+    rects = as_rects(rects)
+    inset = np.asarray(inset, dtype=np.int64).reshape(-1, 1)
+    return rects + inset * np.array([1, 1, -1, -1], dtype=np.int64)
+
+
+def rect_centres(rects):
+    rects = as_rects(rects)
+    return np.stack([(rects[:, 0] + rects[:, 2]) // 2, (rects[:, 1] + rects[:, 3]) // 2], axis=-1)
+
+
+def rect_corners(rects):
+    """(K, 4, 2) corners per rectangle: bottom-left, top-left, top-right, bottom-right"""
+    rects = as_rects(rects)
+    left, top, right, bottom = rects.T
+    return np.stack([
+        np.stack([left, bottom], axis=-1),
+        np.stack([left, top], axis=-1),
+        np.stack([right, top], axis=-1),
+        np.stack([right, bottom], axis=-1),
+    ], axis=1)
+
+
+def bbox_of(points):
+    """Bounding rectangle of a point set"""
+    points = as_points(points)
+    return np.concatenate([points.min(axis=0), points.max(axis=0)])
+
+
+# =============================================================================
+# PATTERNS
+# =============================================================================
+
+
+def rect_grid(rect, nx, ny):
+    """nx x ny points spread evenly over a rectangle, corners included (exact integer spacing)"""
+    left, top, right, bottom = as_rects(rect)[0]
+    xs = left + (right - left) * np.arange(nx, dtype=np.int64) // max(nx - 1, 1)
+    ys = top + (bottom - top) * np.arange(ny, dtype=np.int64) // max(ny - 1, 1)
+    gx, gy = np.meshgrid(xs, ys)
+    return np.stack([gx.ravel(), gy.ravel()], axis=-1)
+
+
+def bolt_circle(centre, radius, count, start_deg=0.0):
+    """count points evenly spaced on a circle, counter-clockwise on screen like rotate()"""
+    angles = np.deg2rad(start_deg + 360.0 * np.arange(count) / count)
+    offsets = np.rint(np.stack([np.cos(angles), -np.sin(angles)], axis=-1) * radius).astype(np.int64)
+    return np.asarray(centre, dtype=np.int64) + offsets
+
+
+def rotate(points, angle_deg, origin=(0, 0)):
+    """Rotate points about origin (KiCad convention: positive is counter-clockwise on screen)"""
+    points = as_points(points)
+    origin = np.asarray(origin, dtype=np.int64)
+    rel = points - origin
+    quarter = angle_deg / 90.0
+    if quarter == int(quarter):
+        # Multiples of 90 degrees stay exact
+        turns = int(quarter) % 4
+        x, y = rel[:, 0], rel[:, 1]
+        rel = [rel, np.stack([y, -x], axis=-1), -rel, np.stack([-y, x], axis=-1)][turns]
+        return rel + origin
+    a = np.deg2rad(angle_deg)
+    c, s = np.cos(a), np.sin(a)
+    x, y = rel[:, 0].astype(np.float64), rel[:, 1].astype(np.float64)
+    out = np.stack([x * c + y * s, -x * s + y * c], axis=-1)
+    return np.rint(out).astype(np.int64) + origin
+
+
+def rotate_rect(rect, angle_deg):
+    """Bounding rectangle of a rectangle rotated about the origin (footprint bbox at an orientation)"""
+    return bbox_of(rotate(rect_corners(rect)[0], angle_deg))
+
+
+def centre_on(points, bbox, position=(0, 0)):
+    """
+    Footprint positions that put the centre of bbox on each point.
+    bbox is relative to the footprint origin currently at position.
+    """
+    points = as_points(points)
+    left, top, right, bottom = as_rects(bbox)[0]
+    centre = np.array([(left + right) // 2, (top + bottom) // 2], dtype=np.int64)
+    return points - centre + np.asarray(position, dtype=np.int64)
+
+
+# =============================================================================
+# POLYGONS
+# =============================================================================
+
+
+def points_in_polygon(points, edges):
+    """
+    Even-odd point-in-polygon test for many points at once. The polygon is given as its
+    (S, 4) edge segments (x1, y1, x2, y2) in any order, so an Edge.Cuts outline can be
+    passed as drawn; a ring inside another is a cut-out.
+    """
+    pts = as_points(points).astype(np.float64)
+    x, y = pts[:, 0:1], pts[:, 1:2]
+    x1, y1, x2, y2 = np.asarray(edges, dtype=np.float64).reshape(-1, 4).T
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(crosses & (x < x_at), axis=1) % 2 == 1
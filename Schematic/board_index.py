@@ -0,0 +1,191 @@
+"""
+Spatial index for clearance checks of placed items
+- Uniform grid buckets over item bounding boxes (nm), built once per run;
+  a lookup only visits the cells around the queried box
+- Items much larger than a cell (zones, long tracks) sit in a small side list
+  instead of being copied into hundreds of buckets
+- board_items() collects footprints, tracks, vias and rule areas of a headless
+  board (kicad_sexpr tree); pcbnew_items() does the same through pcbnew
+
+Checks use bounding boxes, so they are conservative: a reported gap may be
+smaller than the real copper-to-copper distance, never larger.
+"""
+
+import math
+
+import board_geometry as geometry
+import kicad_sexpr as sx
+from footprint_cache import footprint_bbox
+from kicad_sexpr import mm_to_nm
+
+
+DEFAULT_CELL_NM = mm_to_nm(5)
+
+# Items spanning more cells than this are kept out of the grid
+MAX_ITEM_CELLS = 64
+
+
+def rect_gap(a, b):
+    """Edge-to-edge distance (nm) between two rectangles, 0 when they touch or overlap"""
+    dx = max(a[0] - b[2], b[0] - a[2], 0)
+    dy = max(a[1] - b[3], b[1] - a[3], 0)
+    if not dx or not dy:
+        return dx or dy
+    return int(round(math.hypot(dx, dy)))
+
+
+class GridIndex:
+    """Grid-bucket spatial index of (rect, item) pairs"""
+
+    def __init__(self, cell_size=DEFAULT_CELL_NM):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.large = []
+        self.rects = []
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (range(rect[0] // size, rect[2] // size + 1),
+                range(rect[1] // size, rect[3] // size + 1))
+
+    def insert(self, rect, item):
+        rect = tuple(int(v) for v in rect)
+        index = len(self.items)
+        self.rects.append(rect)
+        self.items.append(item)
+        xs, ys = self._cell_range(rect)
+        if len(xs) * len(ys) > MAX_ITEM_CELLS:
+            self.large.append(index)
+            return index
+        for cx in xs:
+            for cy in ys:
+                self.cells.setdefault((cx, cy), []).append(index)
+        return index
+
+    def query(self, rect, margin=0):
+        """(item, rect, gap) of every item within margin of rect"""
+        grown = (rect[0] - margin, rect[1] - margin, rect[2] + margin, rect[3] + margin)
+        xs, ys = self._cell_range(grown)
+        seen = set()
+        for cx in xs:
+            for cy in ys:
+                seen.update(self.cells.get((cx, cy), ()))
+        seen.update(self.large)
+        for index in sorted(seen):
+            gap = rect_gap(rect, self.rects[index])
+            if gap < margin or (margin == 0 and gap == 0):
+                yield self.items[index], self.rects[index], gap
+
+
+def build_index(entries, cell_size=DEFAULT_CELL_NM):
+    """GridIndex from (rect, item) pairs"""
+    index = GridIndex(cell_size)
+    for rect, item in entries:
+        index.insert(rect, item)
+    return index
+
+
+def check_clearance(index, placed, clearance):
+    """
+    Violations of placed (rect, name) items against the index and each other:
+    dicts with item, other, gap_nm and clearance_nm.
+    """
+    violations = []
+    placed = list(placed)
+    for rect, name in placed:
+        for other, _, gap in index.query(rect, clearance):
+            violations.append({"item": name, "other": other, "gap_nm": gap, "clearance_nm": clearance})
+    # Newly placed items against each other
+    own = build_index(((rect, i) for i, (rect, _) in enumerate(placed)), index.cell_size)
+    for i, (rect, name) in enumerate(placed):
+        for j, _, gap in own.query(rect, clearance):
+            if j > i:
+                violations.append({"item": name, "other": placed[j][1], "gap_nm": gap, "clearance_nm": clearance})
+    return violations
+
+
+def describe_gap(v):
+    """"<item> is 0.123mm from <other> (needs 0.25mm)" for a check_clearance() violation"""
+    return f"{v['item']} is {v['gap_nm'] / 1e6:.3f}mm from {v['other']} (needs {v['clearance_nm'] / 1e6:g}mm)"
+
+
+# =============================================================================
+# BOARD ITEMS
+# =============================================================================
+
+
+def _points_rect(points, grow=0):
+    bbox = geometry.bbox_of(points)
+    return (int(bbox[0]) - grow, int(bbox[1]) - grow, int(bbox[2]) + grow, int(bbox[3]) + grow)
+
+
+def placed_rect(local_bbox, position, angle=0.0):
+    """Board rectangle of a footprint-local bbox placed at position (nm) with rotation (deg)"""
+    corners = geometry.rect_corners(local_bbox)[0]
+    if angle:
+        corners = geometry.rotate(corners, angle)
+    return _points_rect(corners + geometry.as_points(position))
+
+
+def footprint_reference(footprint):
+    for prop in footprint.children("property"):
+        if len(prop) > 2 and sx.unquote(prop[1]) == "Reference":
+            return sx.unquote(prop[2])
+    return footprint.get("uuid", default="footprint")
+
+
+def board_items(board, skip_uuids=()):
+    """(rect, name) of the footprints, tracks, vias and rule areas of a board tree"""
+    skip_uuids = set(skip_uuids)
+    for item in board.children():
+        if item.get("uuid") in skip_uuids:
+            continue
+        head = item.head
+        if head == "footprint":
+            at = item.find("at")
+            if at is None:
+                continue
+            angle = float(at[3]) if len(at) > 3 else 0.0
+            # Pad angles in board files already include the footprint rotation
+            local = footprint_bbox(item, angle)
+            if local is None:
+                continue
+            yield placed_rect(local, sx.xy(item, "at"), angle), footprint_reference(item)
+        elif head in ("segment", "arc"):
+            points = [sx.xy(item, name) for name in ("start", "mid", "end") if item.find(name) is not None]
+            half = mm_to_nm(item.get("width", default=0)) // 2
+            yield _points_rect(points, half), f"track on {item.get('layer')}"
+        elif head == "via":
+            half = mm_to_nm(item.get("size", default=0)) // 2
+            yield _points_rect([sx.xy(item, "at")], half), "via"
+        elif head == "zone" and item.find("keepout") is not None:
+            polygon = item.find("polygon")
+            pts = polygon.find("pts") if polygon is not None else None
+            if pts is not None:
+                points = [(mm_to_nm(xy[1]), mm_to_nm(xy[2])) for xy in pts.children("xy")]
+                yield _points_rect(points), f"rule area {item.get('name') or ''}".strip()
+
+
+def pcbnew_items(board, skip_uuids=()):
+    """(rect, name) of the footprints, tracks, vias and rule areas of a pcbnew BOARD"""
+    skip_uuids = set(skip_uuids)
+    for footprint in board.GetFootprints():
+        if footprint.m_Uuid.AsString() not in skip_uuids:
+            # Pads and graphics without text, like get_footprint_bbox()
+            yield box_rect(footprint.GetBoundingBox(False, False)), footprint.GetReference()
+    for track in board.GetTracks():
+        if track.m_Uuid.AsString() not in skip_uuids:
+            name = "via" if track.GetClass() == "PCB_VIA" else f"track on {track.GetLayerName()}"
+            yield box_rect(track.GetBoundingBox()), name
+    for zone in board.Zones():
+        if zone.GetIsRuleArea() and zone.m_Uuid.AsString() not in skip_uuids:
+            yield box_rect(zone.GetBoundingBox()), f"rule area {zone.GetZoneName()}".strip()
+
+
+def box_rect(box):
+    """pcbnew BOX2I -> (left, top, right, bottom)"""
+    return box.GetLeft(), box.GetTop(), box.GetRight(), box.GetBottom()
@@ -0,0 +1,261 @@
+"""
+Declarative placement engine
+- A placement is a plain dict: a footprint plus a pattern of points (single point,
+  explicit points, rectangle corners, grid, bolt circle)
+- Patterns are anchored on the board or on the points of other placements, offset,
+  aligned and rotated; the dependency graph is resolved in one pass (dependencies first)
+- Every pattern is one vectorized board_geometry call, so a 100-hole stiffener costs
+  about as much as a single hole
+- Points are where the centre of each footprint's bbox goes; items keep the key
+  "<name>/<index>" used by the incremental setup (board_setup.py)
+
+Placement fields (lengths in mm, angles in degrees):
+    name             key prefix of the placed items (required, unique)
+    footprint        library footprint name (required)
+    library          .pretty folder, default FOOTPRINT_LIB
+    group            group the items go in (optional)
+    pattern          "point" (default), "points", "rect", "grid" or "bolt_circle"
+    at               anchor: "board", "board.top-left" (and other corners), "<name>" (centre
+                     of its points), "<name>/<index>", or an [x, y] pair of those and numbers
+    offset_mm        (dx, dy) added to the anchor
+    align            which part of a sized rect/grid sits on the anchor: "centre" (default),
+                     "top", "bottom", "left", "right", "top-left", ...
+    size_mm          (width, height) of a rect or grid; without it they cover the board
+    inset_mm         shrink the rect/grid area on every side
+    edge_clearance_mm  like inset_mm, but measured to the footprint edge instead of its centre
+    count            grid (nx, ny) or number of bolt circle points
+    pitch_mm         grid spacing (number or (px, py)); otherwise the grid spans its area
+    points_mm        [(x, y), ...] relative to the anchor
+    radius_mm, start_deg   bolt circle
+    rotate_deg       rotate the pattern about its anchor (footprints turn with it)
+    orientation_deg  footprint rotation
+
+Examples:
+    {"name": "header", "footprint": "PinHeader_2x20_P2.54mm_Vertical", "library": "./Connector.pretty",
+     "at": "isolated/2", "offset_mm": (30.5, 0), "orientation_deg": 270}
+    {"name": "stiffener", "footprint": "MountingHole_2.7mm_M2.5", "pattern": "grid",
+     "count": (10, 10), "inset_mm": 20}
+    {"name": "fiducial", "footprint": "Fiducial_1mm", "pattern": "points", "at": "board",
+     "points_mm": [(-60, -40), (60, 40)]}
+"""
+
+import numpy as np
+
+import board_geometry as geometry
+
+
+PATTERNS = ("point", "points", "rect", "grid", "bolt_circle")
+
+BOARD_ANCHORS = {
+    "board": None,
+    "board.bottom-left": geometry.BOTTOM_LEFT,
+    "board.top-left": geometry.TOP_LEFT,
+    "board.top-right": geometry.TOP_RIGHT,
+    "board.bottom-right": geometry.BOTTOM_RIGHT,
+}
+
+ALIGNMENTS = ("centre", "center", "top", "bottom", "left", "right",
+              "top-left", "top-right", "bottom-left", "bottom-right")
+
+
+class PlacementError(ValueError):
+    """Raised for a placement list that can't be resolved"""
+
+
+def normalise_angle(angle_deg):
+    """Degrees in [0, 360), rounded so file round trips compare equal"""
+    return round(float(angle_deg) % 360.0, 4) % 360.0
+
+
+def _mm_pair(value, name, placement):
+    """(x, y) nm from a number or a pair of millimetres"""
+    value = np.asarray(value, dtype=np.float64)
+    if value.shape not in ((), (2,)):
+        raise PlacementError(f"{placement['name']}: {name} must be a number or an (x, y) pair")
+    return geometry.mm_to_nm(np.broadcast_to(value, (2,)))
+
+
+# =============================================================================
+# DEPENDENCIES
+# =============================================================================
+
+
+def _anchor_refs(placement):
+    """Names of the placements an anchor refers to"""
+    at = placement.get("at", "board")
+    parts = [at] if isinstance(at, str) else list(at) if isinstance(at, (list, tuple)) else []
+    return [part.split("/")[0] for part in parts if isinstance(part, str) and part not in BOARD_ANCHORS]
+
+
+def resolve_order(placements):
+    """Placements sorted so every anchor is placed before the placements that use it"""
+    by_name = {}
+    for placement in placements:
+        name = placement.get("name")
+        if not name or "/" in str(name):
+            raise PlacementError(f"Placement without a valid name: {placement}")
+        if name in by_name:
+            raise PlacementError(f"Duplicate placement name '{name}'")
+        by_name[name] = placement
+
+    ordered = []
+    state = {}  # name -> "visiting" / "done"
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise PlacementError("Placement cycle: " + " -> ".join(path + [name]))
+        state[name] = "visiting"
+        for ref in _anchor_refs(by_name[name]):
+            if ref not in by_name:
+                raise PlacementError(f"{name}: anchor '{ref}' is not a placement")
+            visit(ref, path + [name])
+        state[name] = "done"
+        ordered.append(by_name[name])
+
+    for placement in placements:
+        visit(placement["name"], [])
+    return ordered
+
+
+# =============================================================================
+# PATTERNS
+# =============================================================================
+
+
+def _ref_point(ref, board_rect, points, placement):
+    """(x, y) in nm of a board anchor, a placement's centre or one of its points"""
+    if ref in BOARD_ANCHORS:
+        corner = BOARD_ANCHORS[ref]
+        if corner is None:
+            return geometry.rect_centres(board_rect)[0]
+        return geometry.rect_corners(board_rect)[0, corner]
+    name, _, index = ref.partition("/")
+    pattern = points[name]
+    if not index:
+        return geometry.rect_centres(geometry.bbox_of(pattern))[0]
+    try:
+        return pattern[int(index)]
+    except (ValueError, IndexError):
+        raise PlacementError(f"{placement['name']}: '{ref}' - {name} has {len(pattern)} points") from None
+
+
+def anchor_point(placement, board_rect, points):
+    """Anchor of a placement (nm), offset applied"""
+    at = placement.get("at", "board")
+    if isinstance(at, str):
+        anchor = np.array(_ref_point(at, board_rect, points, placement), dtype=np.int64)
+    elif isinstance(at, (list, tuple)) and len(at) == 2:
+        anchor = np.empty(2, dtype=np.int64)
+        for axis, part in enumerate(at):
+            if isinstance(part, str):
+                anchor[axis] = _ref_point(part, board_rect, points, placement)[axis]
+            else:
+                anchor[axis] = geometry.mm_to_nm(part)
+    else:
+        raise PlacementError(f"{placement['name']}: 'at' must be an anchor name or an [x, y] pair")
+    return anchor + _mm_pair(placement.get("offset_mm", 0), "offset_mm", placement)
+
+
+def _aligned_rect(anchor, size, align):
+    """Rectangle of size with the align part (e.g. bottom centre) on anchor"""
+    (x, y), (width, height) = anchor.tolist(), size.tolist()
+    if "left" in align:
+        left, right = x, x + width
+    elif "right" in align:
+        left, right = x - width, x
+    else:
+        left, right = x - width // 2, x + width // 2
+    if "top" in align:
+        top, bottom = y, y + height
+    elif "bottom" in align:
+        top, bottom = y - height, y
+    else:
+        top, bottom = y - height // 2, y + height // 2
+    return np.array([left, top, right, bottom], dtype=np.int64)
+
+
+def _area(placement, anchor, board_rect, bbox, size=None):
+    """Rect/grid area: sized around the anchor or the whole board, then inset"""
+    align = placement.get("align", "centre")
+    if align not in ALIGNMENTS:
+        raise PlacementError(f"{placement['name']}: unknown align '{align}'")
+    if size is None and "size_mm" in placement:
+        size = _mm_pair(placement["size_mm"], "size_mm", placement)
+    area = _aligned_rect(anchor, size, align) if size is not None else geometry.as_rects(board_rect)[0]
+    inset = int(geometry.mm_to_nm(placement.get("inset_mm", 0)))
+    if "edge_clearance_mm" in placement:
+        # Footprint edge rather than centre keeps the clearance (same as the STAR corner holes)
+        inset += int(geometry.mm_to_nm(placement["edge_clearance_mm"])) + (int(bbox[2]) - int(bbox[0])) // 2
+    return geometry.inset_rect(area, inset)[0]
+
+
+def _count(placement, dims):
+    count = placement.get("count")
+    if count is None:
+        raise PlacementError(f"{placement['name']}: {placement.get('pattern')} needs a count")
+    count = [int(c) for c in np.broadcast_to(np.asarray(count), (dims,))]
+    if min(count) < 1:
+        raise PlacementError(f"{placement['name']}: count must be at least 1")
+    return count
+
+
+def pattern_points(placement, board_rect, points, bbox):
+    """(N, 2) int64 footprint centre points of one placement"""
+    pattern = placement.get("pattern", "point")
+    anchor = anchor_point(placement, board_rect, points)
+    if pattern == "point":
+        result = anchor.reshape(1, 2)
+    elif pattern == "points":
+        result = geometry.as_points(geometry.mm_to_nm(placement.get("points_mm", ()))) + anchor
+    elif pattern == "rect":
+        result = geometry.rect_corners(_area(placement, anchor, board_rect, bbox))[0]
+    elif pattern == "grid":
+        nx, ny = _count(placement, 2)
+        size = None
+        if "pitch_mm" in placement:
+            size = _mm_pair(placement["pitch_mm"], "pitch_mm", placement) * np.array([nx - 1, ny - 1])
+        result = geometry.rect_grid(_area(placement, anchor, board_rect, bbox, size), nx, ny)
+    elif pattern == "bolt_circle":
+        (count,) = _count(placement, 1)
+        result = geometry.bolt_circle(anchor, int(geometry.mm_to_nm(placement.get("radius_mm", 0))), count,
+                                      placement.get("start_deg", 0.0))
+    else:
+        raise PlacementError(f"{placement['name']}: unknown pattern '{pattern}' (use {', '.join(PATTERNS)})")
+    if placement.get("rotate_deg"):
+        result = geometry.rotate(result, placement["rotate_deg"], anchor)
+    return result
+
+
+# =============================================================================
+# LAYOUT
+# =============================================================================
+
+
+def layout(placements, board_rect, bbox):
+    """
+    Resolve every placement against a board rectangle (nm).
+    bbox(library, footprint) gives the unrotated footprint bbox relative to its origin.
+    Returns (points by placement name, desired items in placement order).
+    """
+    points = {}
+    for placement in resolve_order(placements):
+        footprint_box = bbox(placement["library"], placement["footprint"])
+        points[placement["name"]] = pattern_points(placement, board_rect, points, footprint_box)
+
+    items = []
+    for placement in placements:
+        orientation = normalise_angle(placement.get("orientation_deg", 0) + placement.get("rotate_deg", 0))
+        footprint_box = geometry.rotate_rect(bbox(placement["library"], placement["footprint"]), orientation)
+        positions = geometry.centre_on(points[placement["name"]], footprint_box).tolist()
+        name = placement["name"]
+        items += [{
+            "key": f"{name}/{i}",
+            "group": placement.get("group"),
+            "library": placement["library"],
+            "footprint": placement["footprint"],
+            "position": tuple(position),
+            "orientation": orientation,
+        } for i, position in enumerate(positions)]
+    return points, items
@@ -0,0 +1,247 @@
+"""
+Project-wide board setup runner
+- Finds every .kicad_pcb under a folder (on its own or next to a .kicad_pro)
+- Matches each board against setup profiles: overrides of the CONFIGURATION block in
+  complete-board-setup.py plus a mode, "check" (report only) or "apply" (write the board)
+- Runs the matched boards in parallel worker processes with the headless engine
+- Skips boards whose inputs (board file, effective configuration, hole footprints and
+  engine code) hash the same as on the last successful run, reusing that run's result
+- Prints a consolidated table and writes it as CSV
+
+Profile file (JSON, YAML or CSV, a list like board_variants.py): "board" is a glob
+matched against the board's path relative to the root or its file name; the first
+matching profile wins and boards without a profile are listed but not touched.
+
+    python board_projects.py --profiles board-profiles.json [--apply] [--force]
+"""
+
+import csv
+import fnmatch
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import board_setup
+import kicad_sexpr as sx
+from board_cache import input_hash
+from board_variants import VariantError, load_variants, variant_config
+
+
+DEFAULT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PROFILES = os.path.join(DEFAULT_ROOT, "board-profiles.json")
+STATE_FILE = ".board-runs.json"
+
+# Folders never searched for boards
+EXCLUDE_DIRS = ("Datasheets-and-references",)
+
+PROFILE_FIELDS = ("name", "board", "mode")
+MODES = ("check", "apply")
+
+REPORT_FIELDS = (
+    "name", "board", "mode", "status", "cached", "added", "moved", "removed", "outline",
+    "violations", "drc", "written", "seconds",
+)
+
+
+# =============================================================================
+# DISCOVERY
+# =============================================================================
+
+
+def discover_boards(root, exclude=EXCLUDE_DIRS):
+    """(board path, project path or None) of every board under root; projects without a board included"""
+    found = []
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and not d.endswith("-backups") and d not in exclude)
+        stems = {}
+        for filename in sorted(files):
+            stem, ext = os.path.splitext(filename)
+            if ext in (".kicad_pcb", ".kicad_pro") and not stem.startswith("_autosave-"):
+                stems.setdefault(stem, {})[ext] = os.path.join(folder, filename)
+        for stem, paths in sorted(stems.items()):
+            found.append((paths.get(".kicad_pcb"), paths.get(".kicad_pro")))
+    return found
+
+
+def match_profile(board, root, profiles):
+    """First profile whose board glob matches the board path (relative to root) or file name"""
+    relative = os.path.relpath(board, root).replace(os.sep, "/")
+    for profile in profiles:
+        pattern = str(profile.get("board", ""))
+        if fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(os.path.basename(board), pattern):
+            return profile
+    return None
+
+
+def load_profiles(path):
+    """Profiles from a JSON/YAML/CSV list, each with a valid mode"""
+    profiles = load_variants(path)
+    for profile in profiles:
+        if "board" not in profile:
+            raise VariantError(f"{path}: every profile needs a 'board' glob")
+        mode = profile.get("mode", "check")
+        if mode not in MODES:
+            raise VariantError(f"{path}: unknown mode '{mode}' for {profile['board']} (use {' or '.join(MODES)})")
+    return profiles
+
+
+# =============================================================================
+# STORED RESULTS
+# =============================================================================
+
+
+def load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    sx.write_atomic(path, json.dumps(state, indent=2, sort_keys=True))
+
+
+# =============================================================================
+# RUN
+# =============================================================================
+
+
+def plan_boards(root, profiles, base_config):
+    """(name, board, mode, config) jobs for the matched boards, and rows for the rest"""
+    jobs = []
+    rows = []
+    for board, project in discover_boards(root):
+        shown = os.path.relpath(board or project, root)
+        if board is None:
+            rows.append({"name": shown, "board": "", "status": "no board"})
+            continue
+        profile = match_profile(board, root, profiles)
+        if profile is None:
+            rows.append({"name": shown, "board": board, "status": "no profile"})
+            continue
+        overrides = {key: value for key, value in profile.items() if key.lower() not in PROFILE_FIELDS}
+        jobs.append((str(profile.get("name") or shown), board, profile.get("mode", "check"),
+                     variant_config(overrides, base_config)))
+    return jobs, rows
+
+
+def run_board(job):
+    """Worker: set up one board (written only in apply mode) and return its report row"""
+    name, board, mode, config = job
+    start = time.perf_counter()
+    row = {"name": name, "board": board, "mode": mode, "cached": False}
+    try:
+        if mode == "apply":
+            report = board_setup.complete_board_setup_headless(board, config)
+        else:
+            tree = sx.load(board)
+            if tree.head != "kicad_pcb":
+                raise sx.SExprError(f"{board} is not a KiCad board file")
+            report = board_setup.setup_board(tree, config, board)
+            report["written"] = False
+    except Exception as e:  # One bad board must not stop the others
+        row["status"] = f"error: {e}"
+    else:
+        row.update({
+            "status": ("drc failed" if report["drc"] else
+                       "out of date" if mode == "check" and report["changed"] else "ok"),
+            "added": report["added"] + report["replaced"],
+            "moved": report["moved"],
+            "removed": report["removed"],
+            "outline": report["outline"],
+            "violations": len(report["violations"]),
+            "drc": len(report["drc"]),
+            "written": report["written"],
+            # Hashed after writing, so the next run sees the board as up to date
+            "input_hash": input_hash(board, config, mode),
+        })
+    row["seconds"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def run_boards(jobs, state, force=False, workers=None):
+    """Rows for every job in order; unchanged boards come from state, the rest run in a pool"""
+    rows = [None] * len(jobs)
+    pending = []
+    for i, (name, board, mode, config) in enumerate(jobs):
+        previous = state.get(os.path.abspath(board))
+        if not force and previous and previous["input_hash"] == input_hash(board, config, mode):
+            rows[i] = dict(previous["row"], cached=True, written=False, seconds=0)
+        else:
+            pending.append(i)
+
+    if workers == 1 or len(pending) <= 1:
+        results = [run_board(jobs[i]) for i in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_board, [jobs[i] for i in pending]))
+    for i, row in zip(pending, results):
+        rows[i] = row
+        if row["status"] in ("ok", "out of date"):
+            state[os.path.abspath(row["board"])] = {
+                "input_hash": row.pop("input_hash"),
+                "row": {key: value for key, value in row.items() if key not in ("cached", "seconds")},
+            }
+    return rows
+
+
+def write_report(rows, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_report(rows):
+    for row in rows:
+        if "mode" not in row:
+            print(f"- {row['name']}: {row['status']}")
+            continue
+        mark = "✓" if row["status"] == "ok" else "⚠" if row["status"] == "out of date" else "✗"
+        detail = ""
+        if not row["status"].startswith("error"):
+            detail = (f" - {row['added']} added, {row['moved']} moved, {row['removed']} removed, "
+                      f"{row['violations']} violations, {row.get('drc', 0)} DRC")
+            if row["written"]:
+                detail += ", saved"
+        cached = " (unchanged, skipped)" if row["cached"] else f" ({row['seconds']:.2f}s)"
+        print(f"{mark} {row['name']} [{row['mode']}]: {row['status']}{detail}{cached}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the board setup over every board of the repository")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Folder to search for boards")
+    parser.add_argument("--profiles", default=DEFAULT_PROFILES, help="Setup profiles (JSON, YAML or CSV)")
+    parser.add_argument("--script", default=board_setup.SETUP_SCRIPT, help="Script holding the base CONFIGURATION")
+    parser.add_argument("--apply", action="store_true", help="Run every profile in apply mode")
+    parser.add_argument("--force", action="store_true", help="Ignore stored results and run every board")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("-o", "--report", help="Write the consolidated report as CSV")
+    args = parser.parse_args()
+
+    try:
+        jobs, skipped = plan_boards(args.root, load_profiles(args.profiles), board_setup.load_script_config(args.script))
+    except (OSError, VariantError) as e:
+        parser.error(str(e))
+    if args.apply:
+        jobs = [(name, board, "apply", config) for name, board, _, config in jobs]
+
+    start = time.perf_counter()
+    state_path = os.path.join(args.root, STATE_FILE)
+    state = load_state(state_path)
+    rows = run_boards(jobs, state, args.force, args.jobs)
+    save_state(state_path, state)
+    board_setup.default_cache().save()
+
+    print_report(rows + skipped)
+    if args.report:
+        write_report(rows + skipped, args.report)
+        print(f"💾 Report: {args.report}")
+    ran = sum(1 for row in rows if not row["cached"])
+    print(f"✓ {len(rows)} boards ({ran} run, {len(rows) - ran} unchanged) in {time.perf_counter() - start:.2f}s")
+    if any(row["status"] != "ok" for row in rows):
+        raise SystemExit(1)
@@ -0,0 +1,563 @@
+"""
+Headless board setup engine - edits .kicad_pcb files directly, no pcbnew required
+- Same CLEANUP / BOARD OUTLINE / MOUNTING HOLES result as complete-board-setup.py
+- Mounting holes and the PLACEMENTS entries are laid out by board_placement.py
+- Footprints are read straight from the .pretty library (parsed once, see footprint_cache.py)
+- Incremental: generated footprints carry a hidden "Board Setup" field with a stable
+  key, so a run only adds, moves or removes what differs from the configuration and
+  leaves an up-to-date board untouched
+- Every run ends with the board_drc.py rule checks on the generated footprints
+- Generated items get deterministic UUIDs so repeated runs write identical files
+"""
+
+import os
+import runpy
+import uuid
+
+import board_drc
+import board_geometry as geometry
+import board_index
+import board_placement
+import kicad_sexpr as sx
+import mounting_holes
+from board_trace import Trace
+from footprint_cache import GRAPHIC_ITEMS, default_cache, footprint_path
+from kicad_sexpr import fmt_mm, mm_to_nm, quote
+
+
+# Names of the CONFIGURATION values read from complete-board-setup.py
+CONFIG_KEYS = (
+    "OTHER_BOARD_WIDTH_MM",
+    "OTHER_BOARD_HEIGHT_MM",
+    "OTHER_BOARD_OFFSET_MM",
+    "BOARD_WIDTH_MM",
+    "BOARD_HEIGHT_MM",
+    "BOARD_CENTER_X_MM",
+    "BOARD_CENTER_Y_MM",
+    "STAR_PAD_CLEARANCE_MM",
+    "HOLE_CLEARANCE_MM",
+    "FOOTPRINT_LIB",
+    "GROUNDED_FOOTPRINT",
+    "ISOLATED_FOOTPRINT",
+    "PLACEMENTS",
+)
+
+SETUP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "complete-board-setup.py")
+
+# Hidden footprint field holding the role/index key of generated items
+SETUP_FIELD = "Board Setup"
+
+GROUNDED_GROUP_NAME = "STAR Board Mounting Holes"
+ISOLATED_GROUP_NAME = "Other Board Mounting Holes"
+
+# Namespace for the generated item UUIDs
+UUID_NAMESPACE = uuid.UUID("7c1f6a52-3b0e-4d8e-9a57-5f3c2b9e0d41")
+
+# Library-only footprint fields that KiCad drops when placing on a board
+LIBRARY_ONLY_FIELDS = ("version", "generator", "generator_version")
+
+
+def stable_uuid(*parts):
+    """Deterministic UUID for a generated item"""
+    return str(uuid.uuid5(UUID_NAMESPACE, "/".join(str(part) for part in parts)))
+
+
+def load_script_config(script_path=SETUP_SCRIPT):
+    """CONFIGURATION values of complete-board-setup.py (the script is not run as __main__)"""
+    namespace = runpy.run_path(script_path, run_name="board_setup_config")
+    return {key: namespace[key] for key in CONFIG_KEYS}
+
+
+def is_mounting_group_name(group_name):
+    """Same group-name matching as the pcbnew CLEANUP stage"""
+    return ("Mounting Holes" in group_name or
+            "mounting" in group_name.lower() or
+            "STAR Board" in group_name or
+            "Other Board" in group_name)
+
+
+def resolve_library(lib_path, board_path):
+    """Relative library paths are tried next to the board (like ${KIPRJMOD}), then in the working directory"""
+    if os.path.isabs(lib_path):
+        return lib_path
+    candidate = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(board_path)), lib_path))
+    if os.path.isdir(candidate) or not os.path.isdir(lib_path):
+        return candidate
+    return os.path.abspath(lib_path)
+
+
+# =============================================================================
+# BOARD ITEMS
+# =============================================================================
+
+
+def _insert_after(node, names, child):
+    """Insert child after the last of the named children (or append)"""
+    index = None
+    for i, item in enumerate(node.items):
+        if isinstance(item, sx.SExpr) and item.head in names:
+            index = i + 1
+    if index is None:
+        node.append(child)
+    else:
+        node.insert(index, child, node.gaps[index - 1])
+
+
+def fmt_angle(angle_deg):
+    """Degrees atom without trailing zeros, e.g. 270.0 -> '270'"""
+    return f"{angle_deg:.4f}".rstrip("0").rstrip(".")
+
+
+def _rotate_at(node, orientation):
+    """Add the footprint orientation to a pad or text angle (board files store them absolute)"""
+    at = node.find("at")
+    if at is None:
+        return
+    has_angle = len(at) > 3 and at[3] != "unlocked"
+    angle = float(at[3]) if has_angle else 0.0
+    angle = fmt_angle(board_placement.normalise_angle(angle + orientation))
+    if has_angle:
+        at.items[3] = angle
+    else:
+        at.insert(3, angle, " ")
+
+
+def make_board_footprint(lib_footprint, position, seed, locked=True, hide_reference=True, setup_key=None,
+                         orientation=0):
+    """Turn a library footprint into a board footprint placed at position (nm), optionally tagged"""
+    fp = lib_footprint.copy()
+    for field in LIBRARY_ONLY_FIELDS:
+        child = fp.find(field)
+        if child is not None:
+            fp.remove(child)
+    gap = fp.gaps[2] if len(fp) > 2 else "\n\t"
+    head = 2
+    if locked:
+        fp.insert(head, sx.SExpr(["locked", "yes"]), gap)
+        head += 1
+    layer_index = fp.index(fp.find("layer")) if fp.find("layer") is not None else head - 1
+    fp.insert(layer_index + 1, sx.SExpr(["uuid", quote(stable_uuid(seed))]), gap)
+    at = ["at", fmt_mm(position[0]), fmt_mm(position[1])]
+    fp.insert(layer_index + 2, sx.SExpr(at + [fmt_angle(orientation)] if orientation else at), gap)
+
+    for i, child in enumerate(fp.children()):
+        if child.head not in ("property", "fp_text", "pad") + GRAPHIC_ITEMS:
+            continue
+        if orientation and child.head in ("property", "fp_text", "pad"):
+            _rotate_at(child, orientation)
+        if hide_reference and child.head == "property" and child[1] == '"Reference"':
+            if child.find("hide") is None:
+                _insert_after(child, ("layer",), sx.SExpr(["hide", "yes"]))
+        if child.find("uuid") is None:
+            _insert_after(child, ("layer", "layers", "hide"), sx.SExpr(["uuid", quote(stable_uuid(seed, i))]))
+
+    if setup_key is not None:
+        tag_footprint(fp, setup_key, levels=0)
+
+    fp.lead = fp.tail = ""
+    fp.reindent(1)
+    return fp
+
+
+def make_outline(left, top, right, bottom, seed, width_nm=0):
+    """Locked Edge.Cuts rectangle"""
+    return sx.build([
+        "gr_rect",
+        ["start", fmt_mm(left), fmt_mm(top)],
+        ["end", fmt_mm(right), fmt_mm(bottom)],
+        ["stroke", ["width", fmt_mm(width_nm)], ["type", "default"]],
+        ["fill", "no"],
+        ["locked", "yes"],
+        ["layer", quote("Edge.Cuts")],
+        ["uuid", quote(stable_uuid(seed))],
+    ], depth=1)
+
+
+def make_group(name, member_uuids, seed):
+    return sx.build([
+        "group", quote(name),
+        ["uuid", quote(stable_uuid(seed))],
+        ["members", *[quote(m) for m in member_uuids]],
+    ], depth=1)
+
+
+def item_uuid(item):
+    return item.get("uuid")
+
+
+def add_board_item(board, item):
+    """Insert a top-level item after the last item of the same kind, keeping KiCad's ordering"""
+    last_same = None
+    trailer = None
+    for i, child in enumerate(board.items):
+        if not isinstance(child, sx.SExpr):
+            continue
+        if child.head == item.head:
+            last_same = i
+        elif child.head == "embedded_fonts" and trailer is None:
+            trailer = i
+    if last_same is not None:
+        board.insert(last_same + 1, item)
+    elif trailer is not None:
+        board.insert(trailer, item)
+    else:
+        board.append(item)
+
+
+def edge_cuts_drawings(board):
+    return [item for item in board.children()
+            if item.head and item.head.startswith("gr_") and item.get("layer") == "Edge.Cuts"]
+
+
+def group_name(group):
+    if len(group) > 1 and isinstance(group[1], str):
+        return sx.unquote(group[1])
+    return ""
+
+
+def mounting_groups(board):
+    return [group for group in board.children("group") if is_mounting_group_name(group_name(group))]
+
+
+# =============================================================================
+# SETUP
+# =============================================================================
+
+
+def board_rect_from_config(config):
+    rect = geometry.rect_from_centre(*(mm_to_nm(config[key]) for key in (
+        "BOARD_CENTER_X_MM", "BOARD_CENTER_Y_MM", "BOARD_WIDTH_MM", "BOARD_HEIGHT_MM")))
+    return tuple(rect.tolist())
+
+
+def mounting_hole_placements(config):
+    """The STAR corner holes and the other-board pattern as board_placement entries"""
+    return [
+        # Pad edge STAR_PAD_CLEARANCE_MM from the board edge
+        {"name": "grounded", "group": GROUNDED_GROUP_NAME, "footprint": config["GROUNDED_FOOTPRINT"],
+         "pattern": "rect", "edge_clearance_mm": config["STAR_PAD_CLEARANCE_MM"]},
+        # Centred on the board, bottom holes OTHER_BOARD_OFFSET_MM above the STAR bottom holes
+        {"name": "isolated", "group": ISOLATED_GROUP_NAME, "footprint": config["ISOLATED_FOOTPRINT"],
+         "pattern": "rect", "at": ["board", "grounded/0"], "offset_mm": (0, -config["OTHER_BOARD_OFFSET_MM"]),
+         "align": "bottom", "size_mm": (config["OTHER_BOARD_WIDTH_MM"], config["OTHER_BOARD_HEIGHT_MM"])},
+    ]
+
+
+def placements(config, board_path=None):
+    """
+    Mounting holes plus the PLACEMENTS entries, libraries resolved next to board_path when given.
+    A footprint given as a query dict is picked from the library's mounting hole table.
+    """
+    result = []
+    for placement in mounting_hole_placements(config) + list(config["PLACEMENTS"]):
+        placement = dict(placement)
+        library = placement.get("library", config["FOOTPRINT_LIB"])
+        placement["library"] = resolve_library(library, board_path) if board_path else library
+        placement["footprint"] = mounting_holes.resolve_footprint(placement["footprint"], placement["library"])
+        result.append(placement)
+    return result
+
+
+def placement_footprint_files(config, board_path):
+    """.kicad_mod files the placements use, in placement order without repeats"""
+    paths = []
+    for placement in placements(config, board_path):
+        path = footprint_path(placement["library"], placement["footprint"])
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+def placement_layout(config, board_path, bbox):
+    """(outline rectangle, points by placement, desired items) for bbox(library, footprint) in nm"""
+    board_rect = board_rect_from_config(config)
+    points, items = board_placement.layout(placements(config, board_path), board_rect, bbox)
+    return board_rect, points, items
+
+
+def desired_state(config, board_path, footprints=None):
+    """Outline rectangle and generated footprints the configuration asks for"""
+    footprints = footprints or default_cache()
+    board_rect, points, items = placement_layout(config, board_path, footprints.bbox)
+    groups = []
+    for item in items:
+        if item["group"] is not None and item["group"] not in groups:
+            groups.append(item["group"])
+    return {
+        "outline": board_rect,
+        "items": items,
+        "groups": tuple(groups),
+        "grounded_holes": points["grounded"].tolist(),
+        "isolated_holes": points["isolated"].tolist(),
+    }
+
+
+def plan_changes(desired_items, existing, legacy=(), rebuild=False):
+    """
+    Diff desired footprints against the board.
+    existing maps setup key -> (footprint name, position, handle, orientation); legacy lists
+    the same tuples for untagged items in old mounting hole groups.
+    Returns (action, desired item, handle) tuples: remove, add, move, replace, adopt.
+    """
+    if rebuild:
+        actions = [("remove", None, current[2]) for current in existing.values()]
+        actions += [("remove", None, current[2]) for current in legacy]
+        return actions + [("add", item, None) for item in desired_items]
+
+    actions = []
+    unmatched = []
+    for item in desired_items:
+        current = existing.get(item["key"])
+        if current is None:
+            unmatched.append(item)
+        elif current[0] != item["footprint"] or current[3] != item["orientation"]:
+            actions.append(("replace", item, current[2]))
+        elif tuple(current[1]) != item["position"]:
+            actions.append(("move", item, current[2]))
+
+    # Untagged holes from earlier full rebuilds are kept when they already sit in the right place
+    adoptable = {(name, tuple(position), orientation): handle for name, position, handle, orientation in legacy}
+    for item in unmatched:
+        handle = adoptable.pop((item["footprint"], item["position"], item["orientation"]), None)
+        actions.append(("adopt", item, handle) if handle is not None else ("add", item, None))
+
+    wanted = {item["key"] for item in desired_items}
+    removals = [("remove", None, current[2]) for key, current in existing.items() if key not in wanted]
+    removals += [("remove", None, handle) for handle in adoptable.values()]
+    return removals + actions
+
+
+def footprint_name(footprint):
+    """Footprint name without the library nickname"""
+    return sx.unquote(footprint[1]).split(":")[-1]
+
+
+def footprint_position(footprint):
+    at = footprint.find("at")
+    return mm_to_nm(at[1]), mm_to_nm(at[2])
+
+
+def footprint_orientation(footprint):
+    at = footprint.find("at")
+    return board_placement.normalise_angle(at[3] if len(at) > 3 else 0)
+
+
+def footprint_state(footprint):
+    """(footprint name, position, footprint, orientation) as used by plan_changes()"""
+    return footprint_name(footprint), footprint_position(footprint), footprint, footprint_orientation(footprint)
+
+
+def setup_key(footprint):
+    """Setup key stored in the generated footprint's hidden field, or None"""
+    for prop in footprint.children("property"):
+        if len(prop) > 2 and sx.unquote(prop[1]) == SETUP_FIELD:
+            return sx.unquote(prop[2])
+    return None
+
+
+def make_setup_field(key):
+    """Hidden footprint field tagging a generated item"""
+    return sx.build([
+        "property", quote(SETUP_FIELD), quote(key),
+        ["at", "0", "0", "0"],
+        ["layer", quote("F.Fab")],
+        ["hide", "yes"],
+        ["uuid", quote(stable_uuid(key, "field"))],
+        ["effects", ["font", ["size", "1", "1"], ["thickness", "0.15"]]],
+    ], depth=1)
+
+
+def tag_footprint(footprint, key, levels=1):
+    """Add the setup field to a footprint; levels is the footprint's depth in the file"""
+    field = make_setup_field(key)
+    field.reindent(levels)
+    _insert_after(footprint, ("property",), field)
+
+
+def existing_footprints(board):
+    """Tagged generated footprints by key, and untagged members of mounting hole groups"""
+    existing = {}
+    legacy = []
+    footprints = {}
+    for footprint in board.children("footprint"):
+        key = setup_key(footprint)
+        if key is None:
+            footprints[item_uuid(footprint)] = footprint
+            continue
+        if key in existing:
+            # Copy-pasted generated item: give it a key nothing asks for so it gets removed
+            key = f"{key}#{item_uuid(footprint)}"
+        existing[key] = footprint_state(footprint)
+    for group in mounting_groups(board):
+        members = group.find("members")
+        for member in members.atoms() if members is not None else ():
+            footprint = footprints.pop(sx.unquote(member), None)
+            if footprint is not None:
+                legacy.append(footprint_state(footprint))
+    return existing, legacy
+
+
+def sync_outline(board, board_rect):
+    """Keep a matching Edge.Cuts rectangle, otherwise replace all Edge.Cuts drawings; returns changes"""
+    drawings = edge_cuts_drawings(board)
+    if len(drawings) == 1 and drawings[0].head == "gr_rect":
+        start = drawings[0].find("start")
+        end = drawings[0].find("end")
+        current = (mm_to_nm(start[1]), mm_to_nm(start[2]), mm_to_nm(end[1]), mm_to_nm(end[2]))
+        if current == tuple(board_rect):
+            return 0
+    board.remove_all(drawings)
+    add_board_item(board, make_outline(*board_rect, seed="outline"))
+    return len(drawings) + 1
+
+
+def sync_groups(board, desired, uuids_by_key):
+    """Make each setup group hold exactly its generated footprints; drop emptied mounting groups"""
+    changes = 0
+    groups = {}
+    for group in board.children("group"):
+        name = group_name(group)
+        if name in desired["groups"] or is_mounting_group_name(name):
+            groups.setdefault(name, group)
+    wanted = set(uuids_by_key.values())
+    for name in desired["groups"]:
+        members = [uuids_by_key[item["key"]] for item in desired["items"] if item["group"] == name]
+        group = groups.get(name)
+        if group is None:
+            groups[name] = make_group(name, members, (name, "group"))
+            add_board_item(board, groups[name])
+            changes += 1
+            continue
+        node = group.find("members")
+        current = [sx.unquote(m) for m in node.atoms()] if node is not None else []
+        if current != members:
+            group.set("members", *[quote(m) for m in members])
+            changes += 1
+
+    # Other mounting groups lose generated members and go away once empty; any other
+    # group (e.g. of a removed placement) goes once its generated members are gone
+    board_uuids = {item_uuid(item) for item in board.children() if item.head != "group"}
+    emptied = []
+    for group in board.children("group"):
+        name = group_name(group)
+        if name in desired["groups"] and groups.get(name) is group:
+            continue
+        node = group.find("members")
+        current = [sx.unquote(m) for m in node.atoms()] if node is not None else []
+        if is_mounting_group_name(name):
+            kept = [m for m in current if m not in wanted and m in board_uuids]
+        else:
+            kept = [m for m in current if m not in wanted]
+            if kept == current:
+                continue
+        if not kept:
+            emptied.append(group)
+            changes += 1
+        elif kept != current:
+            group.set("members", *[quote(m) for m in kept])
+            changes += 1
+    board.remove_all(emptied)
+    return changes
+
+
+def clearance_violations(board, desired, generated_uuids, footprints, clearance):
+    """Generated footprints closer than clearance (nm) to the other board items or to each other"""
+    index = board_index.build_index(board_index.board_items(board, skip_uuids=generated_uuids))
+    placed = [(board_index.placed_rect(geometry.rotate_rect(footprints.bbox(item["library"], item["footprint"]),
+                                                            item["orientation"]), item["position"]),
+               item["key"]) for item in desired["items"]]
+    return board_index.check_clearance(index, placed, clearance)
+
+
+def setup_board(board, config, board_path, footprints=None, rebuild=False, trace=None):
+    """
+    Bring outline and mounting holes in line with config, touching only what differs.
+    rebuild=True replaces every generated item like the original delete-and-rebuild.
+    Stages and counters go to trace (a board_trace.Trace) when given.
+    """
+    footprints = footprints or default_cache()
+    trace = trace or Trace()
+    hits, misses = footprints.hits, footprints.misses
+
+    with trace.stage("footprint load"):
+        desired = desired_state(config, board_path, footprints)
+
+    counts = {"added": 0, "moved": 0, "replaced": 0, "adopted": 0, "removed": 0}
+    with trace.stage("cleanup"):
+        existing, legacy = existing_footprints(board)
+        actions = plan_changes(desired["items"], existing, legacy, rebuild)
+        # Removed and replaced footprints go in one pass, a board can hold thousands of old holes
+        board.remove_all(handle for action, _, handle in actions if action in ("remove", "replace"))
+
+    with trace.stage("mounting holes"):
+        uuids_by_key = {key: item_uuid(current[2]) for key, current in existing.items()}
+        for action, item, handle in actions:
+            if action == "remove":
+                counts["removed"] += 1
+                trace.log(f"  ✓ Removed {footprint_name(handle)}")
+            elif action == "move":
+                handle.find("at").items[1:3] = [fmt_mm(item["position"][0]), fmt_mm(item["position"][1])]
+                counts["moved"] += 1
+                trace.log(f"  ✓ Moved {item['key']}")
+            elif action == "adopt":
+                tag_footprint(handle, item["key"])
+                uuids_by_key[item["key"]] = item_uuid(handle)
+                counts["adopted"] += 1
+                trace.log(f"  ✓ Kept {item['key']}")
+            else:
+                lib_footprint = footprints.load(item["library"], item["footprint"])
+                footprint = make_board_footprint(lib_footprint, item["position"], item["key"], setup_key=item["key"],
+                                                 orientation=item["orientation"])
+                if action == "replace":
+                    counts["replaced"] += 1
+                else:
+                    counts["added"] += 1
+                add_board_item(board, footprint)
+                uuids_by_key[item["key"]] = item_uuid(footprint)
+                trace.log(f"  ✓ Added {item['key']}")
+
+    with trace.stage("board outline"):
+        counts["outline"] = sync_outline(board, desired["outline"])
+    with trace.stage("groups"):
+        counts["groups"] = sync_groups(board, desired, uuids_by_key)
+    counts["unchanged"] = len(desired["items"]) - sum(
+        counts[k] for k in ("added", "moved", "replaced", "adopted"))
+
+    report = dict(counts)
+    report["changed"] = any(counts[k] for k in ("added", "moved", "replaced", "adopted", "removed",
+                                                "outline", "groups"))
+    report["outline_nm"] = desired["outline"]
+    report["grounded_holes"] = desired["grounded_holes"]
+    report["isolated_holes"] = desired["isolated_holes"]
+    with trace.stage("clearance"):
+        report["violations"] = clearance_violations(
+            board, desired, uuids_by_key.values(), footprints, mm_to_nm(config["HOLE_CLEARANCE_MM"]))
+    with trace.stage("drc"):
+        report["drc"] = board_drc.check_board(board, board_drc.project_rules(board_path))
+
+    for name, value in counts.items():
+        trace.count(name, value)
+    trace.count("footprints loaded", footprints.misses - misses)
+    trace.count("footprint cache hits", footprints.hits - hits)
+    trace.count("violations", len(report["violations"]))
+    trace.count("drc violations", len(report["drc"]))
+    return report
+
+
+def complete_board_setup_headless(pcb_path, config, output_path=None, footprints=None, rebuild=False, trace=None):
+    """Run the setup on a .kicad_pcb file and write it back (or to output_path) if anything changed"""
+    footprints = footprints or default_cache()
+    trace = trace or Trace()
+    with trace.stage("load board"):
+        board = sx.load(pcb_path)
+    if board.head != "kicad_pcb":
+        raise sx.SExprError(f"{pcb_path} is not a KiCad board file")
+    report = setup_board(board, config, pcb_path, footprints, rebuild, trace)
+    output_path = output_path or pcb_path
+    with trace.stage("save"):
+        if report["changed"] or os.path.abspath(output_path) != os.path.abspath(pcb_path):
+            report["written"] = sx.save(output_path, board)
+        else:
+            report["written"] = False
+        footprints.save()
+    return report
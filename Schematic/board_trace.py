@@ -0,0 +1,169 @@
+"""
+Stage timing and profiling for the board setup scripts
+- trace.stage(name) times a block (wall and CPU seconds); stages may nest
+- trace.count(name, n) keeps counters such as items removed or footprint cache hits
+- trace.log() only prints when verbose, so batch runs don't pay for console output
+- Optional cProfile and tracemalloc capture while the trace is active
+- write_json() for a report, write_chrome_trace() for chrome://tracing or Perfetto
+
+    with Trace(verbose=True, profile=True) as trace:
+        with trace.stage("cleanup"):
+            trace.count("removed", 4)
+    trace.write_chrome_trace("setup.trace.json")
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+PROFILE_LIMIT = 30
+
+
+class Trace:
+    """Per-stage timings, counters and optional profiles of one run"""
+
+    def __init__(self, verbose=False, profile=False, memory=False):
+        self.verbose = verbose
+        self.profile = profile
+        self.memory = memory
+        self.stages = []
+        self.counters = {}
+        self.open = []
+        self.profiler = None
+        self.started_tracemalloc = False
+        self.origin = time.perf_counter()
+        self.cpu_origin = time.process_time()
+        self.wall = None
+        self.cpu = None
+
+    def __enter__(self):
+        self.origin = time.perf_counter()
+        self.cpu_origin = time.process_time()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        self.wall = time.perf_counter() - self.origin
+        self.cpu = time.process_time() - self.cpu_origin
+        return False
+
+    def log(self, *args, **kwargs):
+        """print() that only talks in verbose mode"""
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def _fold_peak(self):
+        """Credit the memory peak so far to every open stage, then start a new peak"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for record in self.open:
+            record["memory_peak_bytes"] = max(record["memory_peak_bytes"], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one stage"""
+        record = {"name": name, "depth": len(self.open), "start": time.perf_counter() - self.origin}
+        tracing_memory = tracemalloc.is_tracing()
+        if tracing_memory:
+            self._fold_peak()
+            record["memory_peak_bytes"] = tracemalloc.get_traced_memory()[0]
+        self.stages.append(record)
+        self.open.append(record)
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["wall"] = time.perf_counter() - wall
+            record["cpu"] = time.process_time() - cpu
+            if tracing_memory and tracemalloc.is_tracing():
+                self._fold_peak()
+            self.open.pop()
+
+    def profile_stats(self, limit=PROFILE_LIMIT):
+        """Top functions by cumulative time as dicts, empty without profile=True"""
+        if self.profiler is None:
+            return []
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append({"function": f"{os.path.basename(filename)}:{line}({function})", "calls": calls,
+                         "own": round(own, 6), "cumulative": round(cumulative, 6)})
+        rows.sort(key=lambda row: -row["cumulative"])
+        return rows[:limit]
+
+    def report(self):
+        """Everything recorded, as a JSON-ready dict"""
+        return {
+            "wall": self.wall if self.wall is not None else time.perf_counter() - self.origin,
+            "cpu": self.cpu if self.cpu is not None else time.process_time() - self.cpu_origin,
+            "stages": self.stages,
+            "counters": self.counters,
+            "profile": self.profile_stats(),
+        }
+
+    def summary(self):
+        """Stage table and counters as text"""
+        lines = [f"{'stage':<28} {'wall':>10} {'cpu':>10}" + ("  memory peak" if self.memory else "")]
+        for record in self.stages:
+            line = (f"{'  ' * record['depth'] + record['name']:<28} "
+                    f"{record.get('wall', 0) * 1000:>8.2f}ms {record.get('cpu', 0) * 1000:>8.2f}ms")
+            if "memory_peak_bytes" in record:
+                line += f"  {record['memory_peak_bytes'] / 1e6:>8.2f}MB"
+            lines.append(line)
+        if self.counters:
+            lines.append(", ".join(f"{name}: {value}" for name, value in sorted(self.counters.items())))
+        for row in self.profile_stats(10):
+            lines.append(f"  {row['cumulative'] * 1000:>9.2f}ms {row['calls']:>8}  {row['function']}")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def chrome_events(self, pid=None):
+        """Trace Event Format events: one complete event per stage, counters at the end"""
+        pid = pid if pid is not None else os.getpid()
+        events = []
+        for record in self.stages:
+            args = {"cpu_ms": round(record.get("cpu", 0) * 1000, 3)}
+            if "memory_peak_bytes" in record:
+                args["memory_peak_bytes"] = record["memory_peak_bytes"]
+            events.append({"name": record["name"], "ph": "X", "pid": pid, "tid": 0,
+                           "ts": round(record["start"] * 1e6, 1), "dur": round(record.get("wall", 0) * 1e6, 1),
+                           "args": args})
+        end = max((e["ts"] + e["dur"] for e in events), default=0)
+        if self.counters:
+            events.append({"name": "counters", "ph": "C", "pid": pid, "tid": 0, "ts": end,
+                           "args": dict(self.counters)})
+        return events
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}, f)
+
+    def write(self, path):
+        """Chrome trace for *.trace.json paths, the JSON report otherwise"""
+        if path.endswith(".trace.json"):
+            self.write_chrome_trace(path)
+        else:
+            self.write_json(path)
@@ -0,0 +1,216 @@
+"""
+Batch board-variant generator
+- Reads a list of variant configurations from YAML, JSON or CSV
+- Each variant overrides values of the CONFIGURATION block in complete-board-setup.py
+- Variants run in parallel worker processes with the headless engine (board_setup.py)
+- Writes one .kicad_pcb per variant plus a summary.csv row for each
+- Variants whose inputs were generated before come from the result cache (board_cache.py)
+- --fab plots the fabrication outputs of every variant that passed (board_fab.py)
+
+Variant fields: name, board (input .kicad_pcb), output, and any CONFIGURATION
+name (case-insensitive), e.g. OTHER_BOARD_OFFSET_MM. Derived values such as
+BOARD_WIDTH_MM are not recomputed - set them explicitly when they should change.
+
+    python board_variants.py variants.yaml --board "STAR Camera Daughter Board.kicad_pcb" -o variants/
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import board_cache
+import board_drc
+import board_fab
+import board_setup
+
+
+SUMMARY_FIELDS = (
+    "name", "status", "output", "board_width_mm", "board_height_mm",
+    "grounded_holes", "isolated_holes", "added", "moved", "removed", "violations", "drc", "written", "cached", "seconds",
+)
+
+VARIANT_FIELDS = ("name", "board", "output")
+
+
+class VariantError(ValueError):
+    """Raised for a variant file that can't be used"""
+
+
+def _parse_scalar(text):
+    """CSV cells: numbers become int/float, everything else stays a string"""
+    text = text.strip()
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def load_variants(path):
+    """Variant dicts from a .yaml/.yml, .json or .csv file"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if ext == ".csv":
+            variants = []
+            for row in csv.DictReader(f):
+                if None in row:
+                    raise VariantError(f"{path}: row {len(variants) + 2} has more cells than the header")
+                variants.append({key: _parse_scalar(value) for key, value in row.items() if value not in (None, "")})
+        elif ext in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise VariantError("PyYAML is required for YAML variant files (pip install pyyaml)") from None
+            variants = yaml.safe_load(f)
+        elif ext == ".json":
+            variants = json.load(f)
+        else:
+            raise VariantError(f"Unsupported variant file type: {path}")
+    if isinstance(variants, dict):
+        variants = variants.get("variants")
+    if not isinstance(variants, list) or not all(isinstance(v, dict) for v in variants):
+        raise VariantError(f"{path} must hold a list of variant mappings")
+    return variants
+
+
+def variant_config(variant, base_config):
+    """Merge a variant's overrides into the base configuration"""
+    config = dict(base_config)
+    for key, value in variant.items():
+        if key.lower() in VARIANT_FIELDS:
+            continue
+        name = key.upper()
+        if name not in board_setup.CONFIG_KEYS:
+            raise VariantError(f"Unknown configuration value '{key}'")
+        config[name] = value
+    return config
+
+
+def plan_jobs(variants, base_config, default_board, output_dir):
+    """(name, board, output, config) for every variant, with unique names"""
+    jobs = []
+    seen = set()
+    for i, variant in enumerate(variants):
+        fields = {key.lower(): value for key, value in variant.items() if key.lower() in VARIANT_FIELDS}
+        name = str(fields.get("name") or f"variant-{i + 1}")
+        if name in seen:
+            raise VariantError(f"Duplicate variant name '{name}'")
+        seen.add(name)
+        board = fields.get("board") or default_board
+        if not board:
+            raise VariantError(f"Variant '{name}' has no input board (set 'board' or pass --board)")
+        output = fields.get("output") or os.path.join(output_dir, f"{name}.kicad_pcb")
+        jobs.append((name, board, output, variant_config(variant, base_config)))
+    return jobs
+
+
+def warm_footprint_index(jobs):
+    """Index every footprint the jobs use once, before the workers start"""
+    cache = board_setup.default_cache()
+    for _, board, _, config in jobs:
+        for placement in board_setup.placements(config, board):
+            try:
+                cache.geometry(placement["library"], placement["footprint"])
+            except FileNotFoundError:
+                pass  # Reported by the variant's own run
+    cache.save()
+
+
+def run_job(job, use_cache=True):
+    """Worker: generate one variant and return its summary row"""
+    name, board, output, config = job
+    start = time.perf_counter()
+    row = {"name": name, "output": output}
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        if use_cache:
+            report = board_cache.cached_board_setup(board, config, output)
+        else:
+            report = board_setup.complete_board_setup_headless(board, config, output)
+    except Exception as e:  # One bad variant must not stop the batch
+        row["status"] = f"error: {e}"
+    else:
+        row.update({
+            # DRC-lite gate: a variant that breaks the design rules fails the batch
+            "status": f"drc failed: {board_drc.format_violation(report['drc'][0])[2:]}" if report["drc"] else "ok",
+            "board_width_mm": config["BOARD_WIDTH_MM"],
+            "board_height_mm": config["BOARD_HEIGHT_MM"],
+            "grounded_holes": len(report["grounded_holes"]),
+            "isolated_holes": len(report["isolated_holes"]),
+            "added": report["added"] + report["replaced"],
+            "moved": report["moved"],
+            "removed": report["removed"],
+            "violations": len(report["violations"]),
+            "drc": len(report["drc"]),
+            "written": report["written"],
+            "cached": report.get("cached", False),
+        })
+    row["seconds"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def run_batch(jobs, workers=None, use_cache=True):
+    """Run jobs over a process pool; rows come back in job order"""
+    run = partial(run_job, use_cache=use_cache)
+    if workers == 1 or len(jobs) <= 1:
+        return [run(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+
+
+def write_summary(rows, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate board variants in parallel")
+    parser.add_argument("variants", help="YAML, JSON or CSV list of variant configurations")
+    parser.add_argument("--board", help="Input .kicad_pcb for variants that don't name one")
+    parser.add_argument("-o", "--output-dir", default="variants", help="Where variant boards and summary.csv go")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Generate every variant even when a stored result exists")
+    parser.add_argument("--fab", help="Also write fabrication outputs of the passing variants to this folder")
+    parser.add_argument("--no-gerbers", dest="gerbers", action="store_false",
+                        help="With --fab: only drill and position files")
+    parser.add_argument("--script", default=board_setup.SETUP_SCRIPT, help="Script holding the base CONFIGURATION")
+    args = parser.parse_args()
+
+    try:
+        jobs = plan_jobs(load_variants(args.variants), board_setup.load_script_config(args.script),
+                         args.board, args.output_dir)
+    except (OSError, VariantError) as e:
+        parser.error(str(e))
+
+    warm_footprint_index(jobs)
+
+    start = time.perf_counter()
+    rows = run_batch(jobs, args.jobs, args.cache)
+    os.makedirs(args.output_dir, exist_ok=True)
+    summary_path = os.path.join(args.output_dir, "summary.csv")
+    write_summary(rows, summary_path)
+
+    failed = [row for row in rows if row["status"] != "ok"]
+    for row in failed:
+        print(f"✗ {row['name']}: {row['status']}")
+    print(f"✓ {len(rows) - len(failed)}/{len(rows)} variants in {time.perf_counter() - start:.2f}s")
+    print(f"💾 Summary: {summary_path}")
+    if args.fab:
+        try:
+            fab_rows = board_fab.export_boards([row["output"] for row in rows if row["status"] == "ok"], args.fab,
+                                               args.jobs, args.gerbers)
+        except board_fab.FabError as e:
+            parser.error(str(e))
+        board_fab.print_rows(fab_rows)
+        failed += [row for row in fab_rows if row["status"].startswith("error")]
+    if failed:
+        raise SystemExit(1)
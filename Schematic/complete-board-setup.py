@@ -3,11 +3,34 @@ Complete KiCad PCB setup script
 - Sets board outline to configurable dimensions
 - Adds 4 grounded mounting holes at STAR board corners (configurable clearance from pad edge)
 - Adds 4 isolated mounting holes for other board (configurable pattern and offset)
+- Places any extra footprints listed in PLACEMENTS (connectors, fiducials, hole grids)
 - Groups holes and hides reference designators
-- Removes existing mounting holes if they exist
+- In KiCad the whole run is staged on one BOARD_COMMIT: a single undo step, with
+  connectivity and the view refreshed once
+- Re-runs only add, move or remove what differs from the configuration
+  (generated holes carry a hidden "Board Setup" field); FULL_REBUILD starts over
+
+Progress messages are off unless VERBOSE (or -v); TRACE_FILE / --trace writes per-stage
+wall and CPU times and counters (see board_trace.py), PROFILE / --profile adds cProfile.
+
+Run inside the KiCad scripting console, or headless on a board file:
+    python complete-board-setup.py "STAR Camera Daughter Board.kicad_pcb" [-o out.kicad_pcb] [-v] [--fab fab/]
 """
 
-import pcbnew
+try:
+    import pcbnew
+except ImportError:  # Headless mode, see board_setup.py
+    pcbnew = None
+
+import board_cache
+import board_drc
+import board_fab
+import board_geometry as geometry
+import board_index
+import board_placement
+import board_setup
+from board_trace import Trace
+from footprint_cache import PcbnewFootprintCache
 
 
 # =============================================================================
@@ -36,12 +59,39 @@ BOARD_CENTER_Y_MM = 200     # Board center Y position in mm
 
 # STAR board mounting holes (grounded, at corners)
 STAR_PAD_CLEARANCE_MM = 2.5 # Distance from pad edge to board edge in mm
+HOLE_CLEARANCE_MM = 1.0     # Minimum gap from mounting holes to other footprints, tracks and each other
 
-# Footprint library and names
+# Footprint library and names. Either can also be a query against the mounting hole table
+# (mounting_holes.py), e.g. {"screw": "M3", "style": "Pad", "max_pad_mm": 6} picks the smallest match
 FOOTPRINT_LIB = './MountingHole.pretty'
 GROUNDED_FOOTPRINT = "MountingHole_2.7mm_M2.5_Pad"  # For mounting to base board
 ISOLATED_FOOTPRINT = "MountingHole_2.7mm_M2.5"      # For mounting other board on top
 
+# Extra footprints placed by pattern - see board_placement.py for the fields.
+# Anchors: "board", "board.top-left", ..., "grounded/<i>" and "isolated/<i>"
+# (hole order: bottom-left, top-left, top-right, bottom-right)
+PLACEMENTS = [
+    # 2x20 pin header right of the top-right other board hole (needs the KiCad connector library)
+    # {"name": "pin-header", "library": PIN_HEADER_LIB, "footprint": PIN_HEADER_FOOTPRINT,
+    #  "at": "isolated/2", "offset_mm": (PIN_HEADER_OFFSET_X_MM, PIN_HEADER_OFFSET_Y_MM),
+    #  "orientation_deg": PIN_HEADER_ROTATION_DEG},
+]
+
+# Delete and re-create every generated item instead of only changing what differs
+FULL_REBUILD = False
+
+# Reuse the stored result when a headless run sees the same inputs again (see board_cache.py)
+RESULT_CACHE = True
+
+# Headless runs: plot Gerbers, drill and position files into <dir>/<board>-fab.zip (see board_fab.py)
+FAB_OUTPUT_DIR = None  # e.g. "fab"
+
+# Console output and instrumentation
+VERBOSE = False    # Step-by-step progress messages (warnings and the result are always printed)
+PROFILE = False    # cProfile the run and list the slowest functions
+MEMORY = False     # tracemalloc peak per stage (slows the run down)
+TRACE_FILE = None  # Stage timings: "*.trace.json" for chrome://tracing, other paths get a JSON report
+
 # =============================================================================
 
 
@@ -64,253 +114,370 @@ def get_footprint_bbox(footprint):
     return bbox
 
 
-def complete_board_setup():
+def template_bbox(footprint):
+    """Pad + graphic bbox of a library footprint relative to its origin"""
+    position = footprint.GetPosition()
+    left, top, right, bottom = board_index.box_rect(get_footprint_bbox(footprint))
+    return left - position.x, top - position.y, right - position.x, bottom - position.y
+
+
+def footprint_key(footprint):
+    """Board Setup key of a generated footprint, or None"""
+    if footprint.HasFieldByName(board_setup.SETUP_FIELD):
+        return footprint.GetFieldText(board_setup.SETUP_FIELD)
+    return None
+
+
+def tag_footprint(footprint, key):
+    """Mark a footprint as generated with a hidden Board Setup field"""
+    footprint.SetField(board_setup.SETUP_FIELD, key)
+    footprint.GetFieldByName(board_setup.SETUP_FIELD).SetVisible(False)
+
+
+def footprint_state(footprint):
+    """(footprint name, position, footprint, orientation) as used by board_setup.plan_changes()"""
+    position = footprint.GetPosition()
+    return (str(footprint.GetFPID().GetLibItemName()), (position.x, position.y), footprint,
+            board_placement.normalise_angle(footprint.GetOrientationDegrees()))
+
+
+def print_violations(violations, trace):
+    """Report clearance violations found by board_index.check_clearance()"""
+    for v in violations:
+        print(f"  ⚠ {board_index.describe_gap(v)}")
+    if not violations:
+        trace.log(f"✓ No clearance violations ({HOLE_CLEARANCE_MM}mm)")
+
+
+def new_trace(verbose=None, profile=None, memory=None):
+    """Trace set up from the CONFIGURATION block, with optional overrides"""
+    return Trace(verbose=VERBOSE if verbose is None else verbose,
+                 profile=PROFILE if profile is None else profile,
+                 memory=MEMORY if memory is None else memory)
+
+
+def finish_trace(trace, trace_file=None):
+    """Print the stage table in verbose/profile runs and write the trace file if asked"""
+    if trace.verbose or trace.profile:
+        print(trace.summary())
+    trace_file = trace_file or TRACE_FILE
+    if trace_file:
+        trace.write(trace_file)
+        print(f"💾 Trace: {trace_file}")
+
+
+class BoardEdits:
+    """
+    Every change of a setup run staged on one BOARD_COMMIT: a single undo step, and
+    connectivity and the view are updated once when it is pushed. pcbnew builds without
+    a usable BOARD_COMMIT get the changes applied directly, with one BuildConnectivity().
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.commit = None
+        if hasattr(pcbnew, "BOARD_COMMIT"):
+            try:
+                self.commit = pcbnew.BOARD_COMMIT(board)
+            except TypeError:  # Constructor needs an editor frame in this build
+                self.commit = None
+        self.added = set()
+        self.modified = set()
+        self.changes = 0
+
+    def add(self, item):
+        if self.commit is not None:
+            self.commit.Add(item)
+        else:
+            self.board.Add(item)
+        self.added.add(item.m_Uuid.AsString())
+        self.changes += 1
+
+    def remove(self, item):
+        group = item.GetParentGroup()
+        if group is not None:
+            self.modify(group)
+            group.RemoveItem(item)
+        if self.commit is not None:
+            self.commit.Remove(item)
+        else:
+            self.board.Remove(item)
+        self.changes += 1
+
+    def modify(self, item):
+        """Call before changing an item that is already on the board (saves it for undo)"""
+        uuid = item.m_Uuid.AsString()
+        if uuid in self.added or uuid in self.modified:
+            return
+        if self.commit is not None:
+            self.commit.Modify(item)
+        self.modified.add(uuid)
+
+    def push(self, message):
+        """Apply everything as one undoable commit; returns whether anything changed"""
+        if not self.changes and not self.modified:
+            return False
+        if self.commit is not None:
+            self.commit.Push(message)
+        else:
+            self.board.BuildConnectivity()
+        return True
+
+
+def complete_board_setup(trace=None):
     """Complete board setup: outline + mounting holes"""
+    trace = trace or new_trace()
+    with trace:
+        run_board_setup(pcbnew.GetBoard(), trace)
+    finish_trace(trace)
+
+
+def run_board_setup(board, trace):
+    """The board setup stages on a pcbnew BOARD; returns the number of changes"""
     
-    board = pcbnew.GetBoard()
-    
-    print("=== COMPLETE BOARD SETUP ===")
-    print(f"Board: {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm at ({BOARD_CENTER_X_MM}mm, {BOARD_CENTER_Y_MM}mm)")
-    print("Mounting holes: 4 grounded + 4 isolated")
+    trace.log("=== COMPLETE BOARD SETUP ===")
+    trace.log(f"Board: {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm at ({BOARD_CENTER_X_MM}mm, {BOARD_CENTER_Y_MM}mm)")
+    trace.log(f"Mounting holes: 4 grounded + 4 isolated, {len(PLACEMENTS)} other placements")
     
     # Board dimensions in KiCad units (nanometers)
-    width = int(BOARD_WIDTH_MM * 1000000)
-    height = int(BOARD_HEIGHT_MM * 1000000)
-    center_x = int(BOARD_CENTER_X_MM * 1000000)
-    center_y = int(BOARD_CENTER_Y_MM * 1000000)
-    
-    half_width = width // 2
-    half_height = height // 2
-    
-    left = center_x - half_width
-    right = center_x + half_width  
-    bottom = center_y + half_height
-    top = center_y - half_height
-    
-    # 1. CLEANUP - Remove existing edge cuts and mounting hole groups
-    print("\n=== CLEANUP ===")
-    
-    # Remove existing edge cuts
-    drawings_to_remove = []
-    for drawing in board.GetDrawings():
-        if drawing.GetLayerName() == "Edge.Cuts":
-            drawings_to_remove.append(drawing)
-    
-    for drawing in drawings_to_remove:
-        board.Remove(drawing)
-    
-    if drawings_to_remove:
-        print(f"Removed {len(drawings_to_remove)} existing edge cuts")
-    
-    # Remove existing mounting hole groups
-    groups_to_remove = []
-    for group in board.Groups():
-        group_name = group.GetName()
-        if ("Mounting Holes" in group_name or 
-            "mounting" in group_name.lower() or
-            "STAR Board" in group_name or
-            "Other Board" in group_name):
-            groups_to_remove.append(group)
-    
-    for group in groups_to_remove:
-        # Remove items from group
-        items_to_remove = []
-        for item in group.GetItems():
-            items_to_remove.append(item)
+    left, top, right, bottom = geometry.rect_from_centre(
+        *geometry.mm_to_nm([BOARD_CENTER_X_MM, BOARD_CENTER_Y_MM, BOARD_WIDTH_MM, BOARD_HEIGHT_MM])).tolist()
+    changes = 0
+    # Nothing reaches the board until the single push at the end of the edits
+    edits = BoardEdits(board)
+    
+    # 1. BOARD OUTLINE - keep a matching outline, otherwise replace all edge cuts
+    trace.log("\n=== BOARD OUTLINE ===")
+    
+    with trace.stage("board outline"):
+        edge_cuts = [drawing for drawing in board.GetDrawings() if drawing.GetLayerName() == "Edge.Cuts"]
+        current = None
+        if len(edge_cuts) == 1 and edge_cuts[0].GetShape() == pcbnew.SHAPE_T_RECT:
+            start, end = edge_cuts[0].GetStart(), edge_cuts[0].GetEnd()
+            current = (start.x, start.y, end.x, end.y)
         
-        for item in items_to_remove:
-            board.Remove(item)
-        
-        board.Remove(group)
-        print(f"Removed group: '{group.GetName()}'")
-    
-    if groups_to_remove:
-        print(f"Cleaned up {len(groups_to_remove)} existing mounting hole groups")
-    
-    # 2. CREATE BOARD OUTLINE
-    print("\n=== BOARD OUTLINE ===")
-    
-    edge_cuts_layer = board.GetLayerID("Edge.Cuts")
-    
-    rectangle = pcbnew.PCB_SHAPE(board)
-    rectangle.SetShape(pcbnew.SHAPE_T_RECT)
-    rectangle.SetStart(pcbnew.VECTOR2I(left, top))
-    rectangle.SetEnd(pcbnew.VECTOR2I(right, bottom))
-    rectangle.SetLayer(edge_cuts_layer)
-    rectangle.SetWidth(0)
-    rectangle.SetFilled(False)
-    board.Add(rectangle)
-    rectangle.SetLocked(True)
-    
-    print(f"✓ Created {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm board outline - LOCKED")
-    
-    # 3. ADD MOUNTING HOLES
-    print("\n=== MOUNTING HOLES ===")
-    
-    # Get board boundary
-    board_rect = rectangle.GetBoundingBox()
-    
-    # Load footprint to get pad size
-    io = pcbnew.PCB_IO_KICAD_SEXPR()
-    temp_footprint = io.FootprintLoad(FOOTPRINT_LIB, GROUNDED_FOOTPRINT)
-    footprint_bbox = get_footprint_bbox(temp_footprint)
-    
-    # Calculate STAR board corner positions (configurable clearance from pad edge to board edge)
-    clearance = int(STAR_PAD_CLEARANCE_MM * 1000000)
-    pad_radius = footprint_bbox.GetWidth() // 2
-    total_inset = clearance + pad_radius
-    
-    star_left = board_rect.GetLeft() + total_inset
-    star_right = board_rect.GetRight() - total_inset
-    star_bottom = board_rect.GetBottom() - total_inset
-    star_top = board_rect.GetTop() + total_inset
-    
-    star_corners = [
-        pcbnew.wxPoint(star_left, star_bottom),   # Bottom-left
-        pcbnew.wxPoint(star_left, star_top),      # Top-left  
-        pcbnew.wxPoint(star_right, star_top),     # Top-right
-        pcbnew.wxPoint(star_right, star_bottom),  # Bottom-right
-    ]
-    
-    # Calculate other board hole positions (configurable rectangle pattern)
-    other_half_width = int((OTHER_BOARD_WIDTH_MM / 2) * 1000000)
-    other_height = int(OTHER_BOARD_HEIGHT_MM * 1000000)
-    
-    board_center_x = board_rect.Centre().x
-    other_left = board_center_x - other_half_width
-    other_right = board_center_x + other_half_width
-    
-    offset = int(OTHER_BOARD_OFFSET_MM * 1000000)
-    other_bottom = star_bottom - offset
-    other_top = other_bottom - other_height
-    
-    other_corners = [
-        pcbnew.wxPoint(other_left, other_bottom),   # Bottom-left
-        pcbnew.wxPoint(other_left, other_top),      # Top-left  
-        pcbnew.wxPoint(other_right, other_top),     # Top-right
-        pcbnew.wxPoint(other_right, other_bottom),  # Bottom-right
-    ]
-    
-    # Add grounded mounting holes (STAR board corners)
-    print("Adding grounded mounting holes...")
-    grounded_group = pcbnew.PCB_GROUP(board)
-    grounded_group.SetName("STAR Board Mounting Holes")
-    
-    for i, corner in enumerate(star_corners):
-        footprint = io.FootprintLoad(FOOTPRINT_LIB, GROUNDED_FOOTPRINT)
-        footprint.Reference().SetVisible(False)
+        if current == (left, top, right, bottom) and not FULL_REBUILD:
+            trace.log(f"✓ {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm board outline already in place")
+        else:
+            for drawing in edge_cuts:
+                edits.remove(drawing)
+            if edge_cuts:
+                trace.log(f"Removed {len(edge_cuts)} existing edge cuts")
+            trace.count("edge cuts removed", len(edge_cuts))
+            
+            rectangle = pcbnew.PCB_SHAPE(board)
+            rectangle.SetShape(pcbnew.SHAPE_T_RECT)
+            rectangle.SetStart(pcbnew.VECTOR2I(left, top))
+            rectangle.SetEnd(pcbnew.VECTOR2I(right, bottom))
+            rectangle.SetLayer(board.GetLayerID("Edge.Cuts"))
+            rectangle.SetWidth(0)
+            rectangle.SetFilled(False)
+            rectangle.SetLocked(True)
+            edits.add(rectangle)
+            changes += 1
+            trace.log(f"✓ Created {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm board outline - LOCKED")
+    
+    # 2. MOUNTING HOLES - diff the wanted holes against the ones on the board
+    trace.log("\n=== MOUNTING HOLES ===")
+    
+    with trace.stage("footprint load"):
+        # Load each footprint once; every placed item gets a copy
+        footprints = PcbnewFootprintCache()
         
-        pos_x = corner.x - footprint_bbox.Centre().x + footprint.GetPosition().x
-        pos_y = corner.y - footprint_bbox.Centre().y + footprint.GetPosition().y
-        position = pcbnew.VECTOR2I(int(pos_x), int(pos_y))
-        footprint.SetPosition(position)
+        # Mounting hole patterns and PLACEMENTS, laid out by board_placement.py
+        config = {key: globals()[key] for key in board_setup.CONFIG_KEYS}
+        _, _, desired = board_setup.placement_layout(
+            config, None, lambda library, name: template_bbox(footprints.load(library, name)))
+        group_names = []
+        for item in desired:
+            if item["group"] is not None and item["group"] not in group_names:
+                group_names.append(item["group"])
+    
+    with trace.stage("cleanup"):
+        # Generated holes by key; untagged holes in mounting groups come from older full rebuilds
+        existing = {}
+        legacy = []
+        for footprint in board.GetFootprints():
+            key = footprint_key(footprint)
+            if key is not None:
+                if key in existing:
+                    key = f"{key}#{footprint.m_Uuid.AsString()}"  # Copy-pasted duplicate, gets removed
+                existing[key] = footprint_state(footprint)
+        for group in board.Groups():
+            if board_setup.is_mounting_group_name(group.GetName()):
+                for item in group.GetItems():
+                    item = item.Cast()
+                    if isinstance(item, pcbnew.FOOTPRINT) and footprint_key(item) is None:
+                        legacy.append(footprint_state(item))
         
-        board.Add(footprint)
-        footprint.SetLocked(True)
-        grounded_group.AddItem(footprint)
-        print(f"  ✓ Added grounded hole {i+1}")
-    
-    board.Add(grounded_group)
-    
-    # Add isolated mounting holes (other board pattern)
-    print("Adding isolated mounting holes...")
-    isolated_group = pcbnew.PCB_GROUP(board)
-    isolated_group.SetName("Other Board Mounting Holes")
-    
-    for i, corner in enumerate(other_corners):
-        footprint = io.FootprintLoad(FOOTPRINT_LIB, ISOLATED_FOOTPRINT)
-        footprint.Reference().SetVisible(False)
-        footprint_bbox = get_footprint_bbox(footprint)
+        # Groups holding generated footprints go once they are empty (e.g. after a placement was dropped)
+        generated_groups = {state[2].GetParentGroup().m_Uuid.AsString() for state in existing.values()
+                            if state[2].GetParentGroup() is not None}
         
-        pos_x = corner.x - footprint_bbox.Centre().x + footprint.GetPosition().x
-        pos_y = corner.y - footprint_bbox.Centre().y + footprint.GetPosition().y
-        position = pcbnew.VECTOR2I(int(pos_x), int(pos_y))
-        footprint.SetPosition(position)
+        actions = board_setup.plan_changes(desired, existing, legacy, FULL_REBUILD)
+        for action, item, footprint in actions:
+            if action in ("remove", "replace"):
+                edits.remove(footprint)
+                if action == "remove":
+                    trace.log(f"  ✓ Removed {footprint_state(footprint)[0]}")
+    
+    with trace.stage("mounting holes"):
+        placed = {key: state[2] for key, state in existing.items()}
+        for action, item, footprint in actions:
+            changes += 1
+            trace.count(f"hole {action}")
+            if action == "remove":
+                continue
+            if action == "move":
+                edits.modify(footprint)
+                footprint.SetPosition(pcbnew.VECTOR2I(*item["position"]))
+                trace.log(f"  ✓ Moved {item['key']}")
+            elif action == "adopt":
+                edits.modify(footprint)
+                tag_footprint(footprint, item["key"])
+                placed[item["key"]] = footprint
+                trace.log(f"  ✓ Kept {item['key']}")
+            else:
+                footprint = footprints.clone(item["library"], item["footprint"])
+                footprint.Reference().SetVisible(False)
+                footprint.SetPosition(pcbnew.VECTOR2I(*item["position"]))
+                if item["orientation"]:
+                    footprint.SetOrientationDegrees(item["orientation"])
+                tag_footprint(footprint, item["key"])
+                footprint.SetLocked(True)
+                edits.add(footprint)
+                placed[item["key"]] = footprint
+                trace.log(f"  ✓ Added {item['key']}")
+    
+    with trace.stage("groups"):
+        # One group per hole role / placement group; other mounting hole groups go once they are empty
+        groups = {}
+        for group in board.Groups():
+            if group.GetName() in group_names or board_setup.is_mounting_group_name(group.GetName()):
+                groups.setdefault(group.GetName(), group)
+        for name in group_names:
+            group = groups.get(name)
+            if group is None:
+                group = pcbnew.PCB_GROUP(board)
+                group.SetName(name)
+                edits.add(group)
+                groups[name] = group
+                changes += 1
+            members = {member.m_Uuid.AsString() for member in group.GetItems()}
+            for item in desired:
+                footprint = placed[item["key"]]
+                if item["group"] == name and footprint.m_Uuid.AsString() not in members:
+                    edits.modify(group)
+                    group.AddItem(footprint)
+                    changes += 1
         
-        board.Add(footprint)
-        footprint.SetLocked(True)
-        isolated_group.AddItem(footprint)
-        print(f"  ✓ Added isolated hole {i+1}")
-    
-    board.Add(isolated_group)
-    
-    # Add pin header connector
-    # print("Adding pin header connector...")
-    # try:
-    #     # Calculate pin header position based on offset from top-right OTHER_BOARD hole
-    #     # Get top-right other board hole position
-    #     top_right_other_hole = other_corners[2]  # Top-right corner from other_corners array
-    #     
-    #     # Pin header center X position (offset from top-right hole)
-    #     pin_header_center_x = top_right_other_hole.x + int(PIN_HEADER_OFFSET_X_MM * 1000000)
-    #     
-    #     # Y position with offset from top-right other board hole
-    #     pin_header_y = top_right_other_hole.y + int(PIN_HEADER_OFFSET_Y_MM * 1000000)
-    #     
-    #     pin_header_x = pin_header_center_x
-    #     
-    #     # Load pin header footprint
-    #     print(f"  Attempting to load: {PIN_HEADER_LIB}/{PIN_HEADER_FOOTPRINT}")
-    #     pin_header = io.FootprintLoad(PIN_HEADER_LIB, PIN_HEADER_FOOTPRINT)
-    #     
-    #     if pin_header is None:
-    #         print(f"  ! FootprintLoad returned None for {PIN_HEADER_LIB}/{PIN_HEADER_FOOTPRINT}")
-    #     else:
-    #         print(f"  ✓ Successfully loaded footprint: {type(pin_header)}")
-    #     
-    #     if pin_header is not None:
-    #         pin_header.Reference().SetVisible(False)
-    #         
-    #         # Set position
-    #         position = pcbnew.VECTOR2I(pin_header_x, pin_header_y)
-    #         pin_header.SetPosition(position)
-    #         
-    #         # Set rotation (KiCad 9.0 approach - try different methods)
-    #         if PIN_HEADER_ROTATION_DEG != 0:
-    #             try:
-    #                 # Method 1: Try with radians 
-    #                 import math
-    #                 rotation_radians = math.radians(PIN_HEADER_ROTATION_DEG)
-    #                 angle = pcbnew.EDA_ANGLE(rotation_radians, pcbnew.RADIANS_T)
-    #                 pin_header.SetOrientation(angle)
-    #                 print(f"  ✓ Rotated {PIN_HEADER_ROTATION_DEG}° using radians")
-    #             except:
-    #                 try:
-    #                     # Method 2: Try with decidegrees (10ths of degrees)
-    #                     rotation_decideg = int(PIN_HEADER_ROTATION_DEG * 10)
-    #                     angle = pcbnew.EDA_ANGLE(rotation_decideg, pcbnew.DECIDEGREES_T)
-    #                     pin_header.SetOrientation(angle)
-    #                     print(f"  ✓ Rotated {PIN_HEADER_ROTATION_DEG}° using decidegrees")
-    #                 except:
-    #                     try:
-    #                         # Method 3: Direct rotation with SetOrientationDegrees if it exists
-    #                         pin_header.SetOrientationDegrees(PIN_HEADER_ROTATION_DEG)
-    #                         print(f"  ✓ Rotated {PIN_HEADER_ROTATION_DEG}° using SetOrientationDegrees")
-    #                     except:
-    #                         print(f"  ! Could not set rotation, using default orientation")
-    #         
-    #         board.Add(pin_header)
-    #         print(f"  ✓ Added pin header at ({pin_header_x/1000000:.1f}, {pin_header_y/1000000:.1f})mm, rotated {PIN_HEADER_ROTATION_DEG}°")
-    #     else:
-    #         print(f"  ✗ Could not load pin header footprint: {PIN_HEADER_LIB}:{PIN_HEADER_FOOTPRINT}")
-    #     
-    # except Exception as e:
-    #     print(f"  ✗ Failed to add pin header: {e}")
-    
-    # 4. FINALIZE
-    print("\n=== FINALIZE ===")
-    
-    board.BuildConnectivity()
-    pcbnew.Refresh()
-    
-    print("✅ COMPLETE!")
-    print(f"✓ {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm board outline")
-    print(f"✓ 4 grounded mounting holes ({STAR_PAD_CLEARANCE_MM}mm clearance) - LOCKED")
-    print(f"✓ 4 isolated mounting holes ({OTHER_BOARD_WIDTH_MM}x{OTHER_BOARD_HEIGHT_MM}mm pattern) - LOCKED")
-    # print(f"✓ 2x20 pin header connector ({PIN_HEADER_OFFSET_X_MM}mm from top-right hole, {PIN_HEADER_WIDTH_MM}mm width)")
-    print("✓ All components with hidden references")
-    print("\n💾 Don't forget to save your PCB file!")
+        kept_groups = {groups[name].m_Uuid.AsString() for name in group_names}
+        for group in board.Groups():
+            uuid = group.m_Uuid.AsString()
+            if ((board_setup.is_mounting_group_name(group.GetName()) or uuid in generated_groups) and
+                    uuid not in kept_groups and not group.GetItems()):
+                edits.remove(group)
+                changes += 1
+                trace.count("groups removed")
+                trace.log(f"Removed group: '{group.GetName()}'")
+    
+    with trace.stage("commit"):
+        # One undo step; connectivity is rebuilt once here
+        edits.push("Complete board setup")
+    
+    with trace.stage("clearance"):
+        # Clearance check against the rest of the board (spatial index built once)
+        generated = {footprint.m_Uuid.AsString() for footprint in placed.values()}
+        index = board_index.build_index(board_index.pcbnew_items(board, skip_uuids=generated))
+        placed_rects = [(board_index.box_rect(placed[item["key"]].GetBoundingBox(False, False)), item["key"])
+                        for item in desired]
+        violations = board_index.check_clearance(index, placed_rects, int(geometry.mm_to_nm(HOLE_CLEARANCE_MM)))
+        trace.count("board items indexed", len(index))
+        trace.count("violations", len(violations))
+    print_violations(violations, trace)
+    trace.count("footprints loaded", footprints.misses)
+    trace.count("footprint cache hits", footprints.hits)
+    
+    # 3. FINALIZE
+    trace.log("\n=== FINALIZE ===")
+    
+    if not changes:
+        print("✓ Board already up to date - nothing changed")
+        return changes
+    
+    with trace.stage("Refresh"):
+        pcbnew.Refresh()
+    
+    print(f"✅ COMPLETE! ({changes} changes)")
+    trace.log(f"✓ {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm board outline")
+    trace.log(f"✓ 4 grounded mounting holes ({STAR_PAD_CLEARANCE_MM}mm clearance) - LOCKED")
+    trace.log(f"✓ 4 isolated mounting holes ({OTHER_BOARD_WIDTH_MM}x{OTHER_BOARD_HEIGHT_MM}mm pattern) - LOCKED")
+    if PLACEMENTS:
+        trace.log(f"✓ {len(desired) - 8} footprints from PLACEMENTS - LOCKED")
+    trace.log("✓ All components with hidden references")
+    print("💾 Don't forget to save your PCB file!")
+    return changes
+
+
+def complete_board_setup_file(pcb_path, output_path=None, rebuild=FULL_REBUILD, trace=None, use_cache=RESULT_CACHE,
+                              fab_dir=FAB_OUTPUT_DIR):
+    """Headless board setup: edits the .kicad_pcb file directly without pcbnew"""
+    config = {key: globals()[key] for key in board_setup.CONFIG_KEYS}
+    trace = trace or new_trace()
+    with trace:
+        if use_cache:
+            report = board_cache.cached_board_setup(pcb_path, config, output_path, rebuild, trace=trace)
+        else:
+            report = board_setup.complete_board_setup_headless(pcb_path, config, output_path, rebuild=rebuild,
+                                                               trace=trace)
+    if report.get("cached"):
+        trace.log("✓ Same inputs as an earlier run - result taken from the cache")
+
+    trace.log(f"✓ Holes: {report['added']} added, {report['moved']} moved, {report['replaced']} replaced, "
+              f"{report['adopted']} kept, {report['removed']} removed, {report['unchanged']} unchanged")
+    if report["outline"]:
+        trace.log(f"✓ {BOARD_WIDTH_MM}mm x {BOARD_HEIGHT_MM}mm board outline - LOCKED")
+    print_violations(report["violations"], trace)
+    for v in report["drc"]:
+        print(f"  {board_drc.format_violation(v)}")
+    if not report["drc"]:
+        trace.log("✓ DRC-lite: no rule violations")
+    print(f"💾 Saved {output_path or pcb_path}" if report["written"] else "✓ Board already up to date")
+    if fab_dir:
+        with trace.stage("fab outputs"):
+            rows = board_fab.export_boards([output_path or pcb_path], fab_dir)
+        board_fab.print_rows(rows)
+    finish_trace(trace)
+    return report
 
 
 if __name__ == "__main__":
-    complete_board_setup()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Board outline + mounting hole setup")
+    parser.add_argument("board", nargs="?", help=".kicad_pcb file to edit headless (omit inside KiCad)")
+    parser.add_argument("-o", "--output", help="Write the result here instead of editing the board in place")
+    parser.add_argument("--rebuild", action="store_true", default=FULL_REBUILD,
+                        help="Re-create every generated item (same as FULL_REBUILD)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", default=RESULT_CACHE,
+                        help="Always run the setup instead of reusing a stored result")
+    parser.add_argument("--fab", default=FAB_OUTPUT_DIR, help="Also write fabrication outputs to this folder")
+    parser.add_argument("-v", "--verbose", action="store_true", default=VERBOSE, help="Print every step")
+    parser.add_argument("--profile", action="store_true", default=PROFILE, help="cProfile the run")
+    parser.add_argument("--memory", action="store_true", default=MEMORY, help="Record memory peaks per stage")
+    parser.add_argument("--trace", default=TRACE_FILE,
+                        help="Write stage timings (*.trace.json: Chrome trace, otherwise a JSON report)")
+    args = parser.parse_args()
+
+    trace = new_trace(args.verbose, args.profile, args.memory)
+    if args.trace:
+        TRACE_FILE = args.trace
+    if args.board:
+        try:
+            complete_board_setup_file(args.board, args.output, args.rebuild, trace, args.cache, args.fab)
+        except board_fab.FabError as e:
+            parser.error(str(e))
+    elif pcbnew is None:
+        parser.error("pcbnew is not available - pass a .kicad_pcb file to run headless")
+    else:
+        complete_board_setup(trace)
@@ -0,0 +1,449 @@
+"""
+Persistent schematic / PCB / footprint library index (SQLite) with consistency checks
+- Indexes the sheets of a schematic hierarchy (child sheets, placed symbols with their
+  per-instance references), the footprints of a board and the .kicad_mod files of the
+  footprint libraries, in one .design-index.sqlite file next to the project
+- Incremental: a file is only re-read when its mtime or size changed and its SHA-256
+  differs, so after editing one sheet only that sheet is parsed again; libraries are
+  re-listed with os.scandir (names only, nothing is parsed)
+- Checks: every symbol's Footprint field resolves to an existing .kicad_mod, and the
+  board's footprints match the schematic by reference (missing, extra, other footprint,
+  other value). Items generated by the board setup (board_setup.py) are ignored
+
+Footprint libraries: fp-lib-table next to the project, *.pretty folders next to it,
+each vendor folder of Symbols_and_Footprints (nickname = folder name, also without
+Ultra Librarian's "ul_" prefix) and KiCad's stock libraries when KICAD9_FOOTPRINT_DIR
+(or KICAD8_/KICAD_FOOTPRINT_DIR) points at them.
+
+    python design_index.py "STAR Camera Daughter Board.kicad_pro" [--json issues.json]
+    python design_index.py STAR.kicad_sch --stats
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+
+import board_setup
+import kicad_sexpr as sx
+from board_index import footprint_reference
+from footprint_cache import iter_footprint_files
+from kicad_schematic import child_sheet, flag, natural_key, properties, symbol_instances
+
+
+INDEX_FILE = ".design-index.sqlite"
+VENDOR_DIR = "Symbols_and_Footprints"
+STOCK_FOOTPRINT_VARS = ("KICAD9_FOOTPRINT_DIR", "KICAD8_FOOTPRINT_DIR", "KICAD_FOOTPRINT_DIR")
+
+# Bumped whenever the tables or what goes in them change; older indexes are rebuilt
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, kind TEXT NOT NULL, mtime_ns INTEGER, size INTEGER, sha256 TEXT, uuid TEXT);
+CREATE TABLE IF NOT EXISTS child_sheets (
+    file TEXT NOT NULL, position INTEGER, uuid TEXT, name TEXT, child_file TEXT);
+CREATE TABLE IF NOT EXISTS symbols (
+    file TEXT NOT NULL, uuid TEXT, lib_id TEXT, reference TEXT, unit INTEGER, value TEXT, footprint TEXT,
+    power INTEGER, in_bom INTEGER, on_board INTEGER, dnp INTEGER);
+CREATE TABLE IF NOT EXISTS symbol_instances (
+    file TEXT NOT NULL, symbol_uuid TEXT, path TEXT, reference TEXT, unit INTEGER);
+CREATE TABLE IF NOT EXISTS board_footprints (
+    file TEXT NOT NULL, reference TEXT, lib_id TEXT, value TEXT, path TEXT, board_only INTEGER, generated INTEGER);
+CREATE TABLE IF NOT EXISTS library_footprints (
+    library TEXT NOT NULL, name TEXT NOT NULL, path TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS child_sheets_file ON child_sheets (file);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file);
+CREATE INDEX IF NOT EXISTS symbol_instances_file ON symbol_instances (file);
+CREATE INDEX IF NOT EXISTS board_footprints_file ON board_footprints (file);
+CREATE INDEX IF NOT EXISTS library_footprints_name ON library_footprints (library, name);
+"""
+
+FILE_TABLES = ("child_sheets", "symbols", "symbol_instances", "board_footprints")
+
+SEVERITIES = ("error", "warning")
+
+
+def open_index(path):
+    """SQLite connection with the schema in place (a stale schema is dropped and rebuilt)"""
+    db = sqlite3.connect(path)
+    if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        for (table,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+            db.execute(f"DROP TABLE {table}")
+        db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    db.executescript(SCHEMA)
+    return db
+
+
+def project_files(path):
+    """(root schematic, board) of a .kicad_pro, .kicad_sch or .kicad_pcb; either may be None"""
+    stem = os.path.splitext(os.path.abspath(path))[0]
+    schematic, board = stem + ".kicad_sch", stem + ".kicad_pcb"
+    return (schematic if os.path.isfile(schematic) else None), (board if os.path.isfile(board) else None)
+
+
+# =============================================================================
+# FILE SCANNING
+# =============================================================================
+
+
+def scan_sheet(path):
+    """Rows of one .kicad_sch in a single streaming pass: (uuid, child sheets, symbols, instances)"""
+    sheet_uuid = None
+    children, symbols, instances = [], [], []
+    power_libs = set()
+    select = {("uuid",), ("sheet",), ("lib_symbols", "symbol"), ("symbol",)}
+    for heads, node in sx.iter_items(path, select):
+        if heads == ("uuid",):
+            sheet_uuid = sx.unquote(node[1])
+        elif heads == ("sheet",):
+            child = child_sheet(node)
+            children.append((len(children), child["uuid"], child["name"], child["file"]))
+        elif heads == ("lib_symbols", "symbol"):
+            if node.find("power") is not None:
+                power_libs.add(sx.unquote(node[1]))
+        else:
+            fields = properties(node)
+            symbol_uuid = node.get("uuid")
+            reference = fields.get("Reference", "?")
+            lib_name = node.get("lib_name") or node.get("lib_id")
+            symbols.append((symbol_uuid, node.get("lib_id"), reference, int(node.get("unit", default=1)),
+                            fields.get("Value", ""), fields.get("Footprint", ""),
+                            lib_name in power_libs or reference.startswith("#"),
+                            flag(node, "in_bom", True), flag(node, "on_board", True), flag(node, "dnp")))
+            instances += [(symbol_uuid, *instance) for instance in symbol_instances(node)]
+    return sheet_uuid, children, symbols, instances
+
+
+def scan_board(path):
+    """Footprint rows of one .kicad_pcb: (reference, lib_id, value, path, board_only, generated)"""
+    rows = []
+    for _, footprint in sx.iter_items(path, {("footprint",)}):
+        attrs = footprint.find("attr")
+        rows.append((footprint_reference(footprint), sx.unquote(footprint[1]), properties(footprint).get("Value", ""),
+                     footprint.get("path"), attrs is not None and "board_only" in attrs.atoms(),
+                     board_setup.setup_key(footprint) is not None))
+    return rows
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def refresh_file(db, path, kind, stats):
+    """Re-read one file if it changed since it was indexed; returns whether it was parsed"""
+    st = os.stat(path)
+    row = db.execute("SELECT mtime_ns, size, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+    if row is not None and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+        return False
+    digest = _sha256(path)
+    if row is not None and row[2] == digest:
+        # Touched but not changed
+        db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (st.st_mtime_ns, st.st_size, path))
+        stats["hashed"] += 1
+        return False
+
+    for table in FILE_TABLES:
+        db.execute(f"DELETE FROM {table} WHERE file = ?", (path,))
+    sheet_uuid = None
+    if kind == "sheet":
+        sheet_uuid, children, symbols, instances = scan_sheet(path)
+        db.executemany("INSERT INTO child_sheets VALUES (?, ?, ?, ?, ?)", [(path, *row) for row in children])
+        db.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(path, *row) for row in symbols])
+        db.executemany("INSERT INTO symbol_instances VALUES (?, ?, ?, ?, ?)", [(path, *row) for row in instances])
+    else:
+        db.executemany("INSERT INTO board_footprints VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       [(path, *row) for row in scan_board(path)])
+    db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+               (path, kind, st.st_mtime_ns, st.st_size, digest, sheet_uuid))
+    stats["parsed"] += 1
+    return True
+
+
+# =============================================================================
+# LIBRARIES
+# =============================================================================
+
+
+def _lib_table(path):
+    """{nickname: folder} of an fp-lib-table, ${KIPRJMOD} and environment variables expanded"""
+    libraries = {}
+    try:
+        table = sx.load(path)
+    except (OSError, sx.SExprError):
+        return libraries
+    project_dir = os.path.dirname(os.path.abspath(path))
+    for lib in table.children("lib"):
+        name, uri = lib.get("name"), lib.get("uri")
+        if name and uri:
+            uri = re.sub(r"\$\{(\w+)\}", lambda m: project_dir if m.group(1) == "KIPRJMOD"
+                         else os.environ.get(m.group(1), m.group(0)), uri)
+            libraries[name] = os.path.normpath(os.path.join(project_dir, uri))
+    return libraries
+
+
+def library_folders(project_dir):
+    """{nickname: folder} of every footprint library the project can see"""
+    libraries = {}
+    for var in STOCK_FOOTPRINT_VARS:
+        stock = os.environ.get(var)
+        if stock and os.path.isdir(stock):
+            for entry in sorted(os.scandir(stock), key=lambda e: e.name):
+                if entry.is_dir() and entry.name.endswith(".pretty"):
+                    libraries[entry.name[:-len(".pretty")]] = entry.path
+            break
+    vendor = os.path.join(project_dir, VENDOR_DIR)
+    if os.path.isdir(vendor):
+        for entry in sorted(os.scandir(vendor), key=lambda e: e.name):
+            if entry.is_dir():
+                libraries[entry.name] = entry.path
+                if entry.name.startswith("ul_"):
+                    libraries.setdefault(entry.name[3:], entry.path)
+    for entry in sorted(os.scandir(project_dir), key=lambda e: e.name):
+        if entry.is_dir() and entry.name.endswith(".pretty"):
+            libraries[entry.name[:-len(".pretty")]] = entry.path
+    libraries.update(_lib_table(os.path.join(project_dir, "fp-lib-table")))
+    return libraries
+
+
+def refresh_libraries(db, libraries, stats):
+    """Re-list the .kicad_mod names of every library folder"""
+    rows = []
+    for nickname, folder in libraries.items():
+        rows += [(nickname, os.path.basename(path)[:-len(".kicad_mod")], path)
+                 for path in iter_footprint_files(folder)]
+    existing = db.execute("SELECT library, name, path FROM library_footprints ORDER BY rowid").fetchall()
+    if existing != rows:
+        db.execute("DELETE FROM library_footprints")
+        db.executemany("INSERT INTO library_footprints VALUES (?, ?, ?)", rows)
+        stats["libraries"] = True
+    stats["footprints"] = len(rows)
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+
+def refresh(db, schematic=None, board=None, stats=None):
+    """
+    Bring the index up to date for a root schematic and/or board: the hierarchy is
+    followed through the (possibly just re-read) child sheet rows, so only changed
+    files are parsed. Returns the stats dict (parsed, hashed, files).
+    """
+    stats = stats if stats is not None else {"parsed": 0, "hashed": 0, "files": 0, "libraries": False}
+    project_dir = os.path.dirname(os.path.abspath(schematic or board))
+    seen = []
+    if schematic:
+        stack = [os.path.abspath(schematic)]
+        while stack:
+            path = stack.pop()
+            if path in seen:
+                continue
+            seen.append(path)
+            refresh_file(db, path, "sheet", stats)
+            for (child_file,) in db.execute("SELECT child_file FROM child_sheets WHERE file = ? ORDER BY position DESC",
+                                            (path,)):
+                child = os.path.join(os.path.dirname(path), child_file)
+                if not os.path.isfile(child):
+                    raise FileNotFoundError(f"Sub-sheet not found: {child}")
+                stack.append(child)
+    if board:
+        seen.append(os.path.abspath(board))
+        refresh_file(db, seen[-1], "board", stats)
+    refresh_libraries(db, library_folders(project_dir), stats)
+
+    # Files that no longer exist
+    for (path,) in db.execute("SELECT path FROM files").fetchall():
+        if not os.path.exists(path):
+            for table in FILE_TABLES:
+                db.execute(f"DELETE FROM {table} WHERE file = ?", (path,))
+            db.execute("DELETE FROM files WHERE path = ?", (path,))
+    db.commit()
+    stats["files"] = len(seen)
+    return stats
+
+
+def iter_sheet_instances(db, root):
+    """(sheet path, sheet name, file) depth first, from the index"""
+    root = os.path.abspath(root)
+    (root_uuid,) = db.execute("SELECT uuid FROM files WHERE path = ?", (root,)).fetchone()
+    stack = [(f"/{root_uuid}", "/", root)]
+    while stack:
+        path, name, file_path = stack.pop()
+        yield path, name, file_path
+        children = db.execute("SELECT uuid, name, child_file FROM child_sheets WHERE file = ? ORDER BY position DESC",
+                              (file_path,)).fetchall()
+        for uuid, child_name, child_file in children:
+            stack.append((f"{path}/{uuid}", f"{name}{child_name}/", os.path.join(os.path.dirname(file_path), child_file)))
+
+
+def placed_symbols(db, root):
+    """Placed symbols of the hierarchy with their reference in each sheet instance (same rules as kicad_schematic.py)"""
+    for sheet_path, sheet_name, file_path in iter_sheet_instances(db, root):
+        instances = {}
+        for symbol_uuid, path, reference, unit in db.execute(
+                "SELECT symbol_uuid, path, reference, unit FROM symbol_instances WHERE file = ? ORDER BY rowid",
+                (file_path,)):
+            entries = instances.setdefault(symbol_uuid, {})
+            entries.setdefault(path, (reference, unit))
+            entries.setdefault(None, (reference, unit))
+        for row in db.execute("SELECT uuid, lib_id, reference, unit, value, footprint, power, in_bom, on_board, dnp "
+                              "FROM symbols WHERE file = ? ORDER BY rowid", (file_path,)):
+            symbol_uuid, lib_id, reference, unit, value, footprint, power, in_bom, on_board, dnp = row
+            entries = instances.get(symbol_uuid, {})
+            reference, unit = entries.get(sheet_path) or entries.get(None) or (reference, unit)
+            yield {
+                "reference": reference, "unit": unit, "value": value, "footprint": footprint, "lib_id": lib_id,
+                "uuid": symbol_uuid, "sheet": sheet_name, "sheet_path": sheet_path, "power": bool(power),
+                "in_bom": bool(in_bom), "on_board": bool(on_board), "dnp": bool(dnp),
+            }
+
+
+# =============================================================================
+# CHECKS
+# =============================================================================
+
+
+def _issue(severity, kind, reference, detail, sheet=""):
+    return {"severity": severity, "kind": kind, "reference": reference, "sheet": sheet, "detail": detail}
+
+
+def check_footprints(db, symbols):
+    """Footprint fields that don't resolve to a .kicad_mod in the indexed libraries"""
+    libraries = {library for (library,) in db.execute("SELECT DISTINCT library FROM library_footprints")}
+    issues = []
+    not_installed = {}
+    for symbol in symbols:
+        footprint = symbol["footprint"]
+        if not footprint:
+            issues.append(_issue("warning", "no footprint", symbol["reference"], "Footprint field is empty",
+                                 symbol["sheet"]))
+            continue
+        nickname, _, name = footprint.rpartition(":")
+        if not nickname:
+            found = db.execute("SELECT library FROM library_footprints WHERE name = ? ORDER BY rowid",
+                               (name,)).fetchall()
+            where = f" (found in {', '.join(sorted({row[0] for row in found}))})" if found else " and no library has it"
+            issues.append(_issue("warning" if found else "error", "no library", symbol["reference"],
+                                 f"'{footprint}' has no library nickname{where}", symbol["sheet"]))
+        elif nickname not in libraries:
+            not_installed.setdefault(nickname, []).append(symbol["reference"])
+        elif db.execute("SELECT 1 FROM library_footprints WHERE library = ? AND name = ?",
+                        (nickname, name)).fetchone() is None:
+            issues.append(_issue("error", "missing footprint", symbol["reference"],
+                                 f"'{footprint}': {nickname} has no {name}.kicad_mod", symbol["sheet"]))
+    for nickname, references in sorted(not_installed.items()):
+        references = sorted(set(references), key=natural_key)
+        shown = ", ".join(references[:5]) + (f" (+{len(references) - 5})" if len(references) > 5 else "")
+        issues.append(_issue("warning", "library not found", nickname,
+                             f"library '{nickname}' is not installed or not in the lib tables - used by {shown}"))
+    return issues
+
+
+def _footprint_name(lib_id):
+    return lib_id.rpartition(":")[2]
+
+
+def check_board(db, symbols, board):
+    """Board footprints against the schematic, matched by reference like KiCad's board update"""
+    schematic = {}
+    for symbol in symbols:
+        schematic.setdefault(symbol["reference"], symbol)
+    placed = {}
+    for reference, lib_id, value, _, board_only, generated in db.execute(
+            "SELECT reference, lib_id, value, path, board_only, generated FROM board_footprints WHERE file = ? "
+            "ORDER BY rowid", (os.path.abspath(board),)):
+        if generated or board_only or reference.startswith("REF**"):
+            continue
+        placed.setdefault(reference, (lib_id, value))
+
+    issues = []
+    for reference, symbol in schematic.items():
+        if reference not in placed:
+            issues.append(_issue("error", "not on board", reference, f"{symbol['value']} is not on the board",
+                                 symbol["sheet"]))
+            continue
+        lib_id, value = placed[reference]
+        footprint = symbol["footprint"]
+        # A field without a nickname only has to match the footprint name
+        same = lib_id == footprint if ":" in footprint else _footprint_name(lib_id) == footprint
+        if footprint and not same:
+            issues.append(_issue("error", "footprint mismatch", reference,
+                                 f"board has '{lib_id}', schematic '{footprint}'", symbol["sheet"]))
+        if value != symbol["value"]:
+            issues.append(_issue("warning", "value mismatch", reference,
+                                 f"board has '{value}', schematic '{symbol['value']}'", symbol["sheet"]))
+    for reference, (lib_id, _) in placed.items():
+        if reference not in schematic:
+            issues.append(_issue("error", "not in schematic", reference, f"board footprint '{lib_id}' has no symbol"))
+    return issues
+
+
+def check_project(db, schematic=None, board=None):
+    """Consistency issues: dicts with severity, kind, reference, sheet and detail"""
+    symbols = []
+    if schematic:
+        symbols = [s for s in placed_symbols(db, schematic) if not s["power"] and s["on_board"]]
+    issues = check_footprints(db, symbols)
+    if schematic and board:
+        issues += check_board(db, symbols, board)
+    # Multi-unit symbols show up once per unit
+    unique = {(i["severity"], i["kind"], i["reference"], i["detail"]): i for i in issues}
+    return sorted(unique.values(), key=lambda i: (SEVERITIES.index(i["severity"]), i["kind"],
+                                                  natural_key(i["reference"])))
+
+
+def format_issue(issue):
+    mark = "✗" if issue["severity"] == "error" else "⚠"
+    sheet = f" [{issue['sheet']}]" if issue["sheet"] and issue["sheet"] != "/" else ""
+    return f"{mark} {issue['kind']}: {issue['reference']}{sheet} - {issue['detail']}"
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Index a KiCad project and check schematic/board/library consistency")
+    parser.add_argument("project", help=".kicad_pro, root .kicad_sch or .kicad_pcb")
+    parser.add_argument("--db", help=f"Index file (default: {INDEX_FILE} next to the project)")
+    parser.add_argument("--json", help="Write the issues as JSON")
+    parser.add_argument("--stats", action="store_true", help="Print index counts")
+    parser.add_argument("--rebuild", action="store_true", help="Start from an empty index")
+    args = parser.parse_args()
+
+    schematic, board = project_files(args.project)
+    if schematic is None and board is None:
+        parser.error(f"No .kicad_sch or .kicad_pcb found for {args.project}")
+    db_path = args.db or os.path.join(os.path.dirname(os.path.abspath(args.project)), INDEX_FILE)
+    if args.rebuild and os.path.exists(db_path):
+        os.remove(db_path)
+
+    start = time.perf_counter()
+    db = open_index(db_path)
+    stats = refresh(db, schematic, board)
+    indexed = time.perf_counter()
+    issues = check_project(db, schematic, board)
+    seconds = time.perf_counter() - start
+
+    print(f"✓ Index: {stats['parsed']} of {stats['files']} files re-read, {stats['footprints']} library footprints "
+          f"in {(indexed - start) * 1000:.0f}ms")
+    if args.stats:
+        for table in ("files", "symbols", "symbol_instances", "board_footprints", "library_footprints"):
+            print(f"  {table}: {db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]}")
+    for issue in issues:
+        print(format_issue(issue))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(issues, f, indent=2)
+        print(f"💾 Report: {args.json}")
+    errors = sum(1 for issue in issues if issue["severity"] == "error")
+    print(f"{'✗' if errors else '✓'} {errors} errors, {len(issues) - errors} warnings in {seconds * 1000:.0f}ms")
+    db.close()
+    if errors:
+        raise SystemExit(1)
@@ -0,0 +1,318 @@
+"""
+Footprint library cache
+- Parses each .kicad_mod once per process and hands out copies for placement
+- Keeps a persistent index (path + mtime -> pad/graphic bounding boxes) so
+  footprint geometry lookups don't need to parse the file again
+- Falls back to a compiled geometry pack (footprint_pack.py) before parsing, when one exists
+- PcbnewFootprintCache does the same load-once/clone for the KiCad console scripts
+
+Refresh the index for one or more libraries:
+    python footprint_cache.py MountingHole.pretty Symbols_and_Footprints
+"""
+
+import json
+import math
+import os
+
+import kicad_sexpr as sx
+from kicad_sexpr import mm_to_nm
+
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".footprint-index.json")
+DEFAULT_PACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".footprint-pack.bin")
+INDEX_VERSION = 1
+
+GRAPHIC_ITEMS = ("fp_line", "fp_rect", "fp_circle", "fp_arc", "fp_poly", "fp_curve")
+
+
+# =============================================================================
+# GEOMETRY
+# =============================================================================
+
+
+def _stroke_width(node):
+    stroke = node.find("stroke")
+    if stroke is not None:
+        return float(stroke.get("width", default=0))
+    return float(node.get("width", default=0))
+
+
+def _pad_points(pad, rotation=0.0):
+    """Extreme points of a pad outline in footprint coordinates (mm)"""
+    at = pad.find("at")
+    size = pad.find("size")
+    if at is None or size is None:
+        return []
+    x, y = float(at[1]), float(at[2])
+    angle = math.radians((float(at[3]) if len(at) > 3 else 0.0) - rotation)
+    w, h = float(size[1]), float(size[2])
+    if len(pad) > 3 and pad[3] == "circle":
+        r = w / 2
+        return [(x - r, y - r), (x + r, y + r)]
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    points = []
+    for dx, dy in ((-w / 2, -h / 2), (w / 2, -h / 2), (w / 2, h / 2), (-w / 2, h / 2)):
+        points.append((x + dx * cos_a + dy * sin_a, y - dx * sin_a + dy * cos_a))
+    return points
+
+
+def _graphic_points(item):
+    """Extreme points of a footprint graphic (mm), stroke width included"""
+    half = _stroke_width(item) / 2
+    kind = item.head
+    if kind == "fp_circle":
+        cx, cy = sx.xy(item, "center", float)
+        ex, ey = sx.xy(item, "end", float)
+        r = math.hypot(ex - cx, ey - cy) + half
+        return [(cx - r, cy - r), (cx + r, cy + r)]
+    if kind in ("fp_poly", "fp_curve"):
+        pts_node = item.find("pts")
+        pts = [(float(p[1]), float(p[2])) for p in pts_node.children("xy")] if pts_node is not None else []
+    else:
+        pts = [p for p in (sx.xy(item, name, float) for name in ("start", "mid", "end")) if p is not None]
+    return [(px + dx, py + dy) for px, py in pts for dx, dy in ((-half, -half), (half, half))]
+
+
+def _points_bbox(points):
+    if not points:
+        return None
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return mm_to_nm(min(xs)), mm_to_nm(min(ys)), mm_to_nm(max(xs)), mm_to_nm(max(ys))
+
+
+def merge_bbox(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def pad_bbox(footprint, rotation=0.0):
+    """
+    Bounding box (left, top, right, bottom) in nm of all pads. rotation is the footprint
+    angle already included in the pad angles, as in board files.
+    """
+    points = []
+    for pad in footprint.children("pad"):
+        points.extend(_pad_points(pad, rotation))
+    return _points_bbox(points)
+
+
+def graphic_bbox(footprint):
+    """Bounding box in nm of the footprint graphics, excluding text"""
+    points = []
+    for item in footprint.children():
+        if item.head in GRAPHIC_ITEMS:
+            points.extend(_graphic_points(item))
+    return _points_bbox(points)
+
+
+def courtyard_bbox(footprint):
+    """Bounding box in nm of the F.CrtYd/B.CrtYd graphics, None without a courtyard"""
+    points = []
+    for item in footprint.children():
+        if item.head in GRAPHIC_ITEMS and (item.get("layer") or "").endswith(".CrtYd"):
+            points.extend(_graphic_points(item))
+    return _points_bbox(points)
+
+
+def footprint_bbox(footprint, rotation=0.0):
+    """Bounding box in nm of pads and graphics, excluding text (like get_footprint_bbox())"""
+    return merge_bbox(pad_bbox(footprint, rotation), graphic_bbox(footprint))
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+
+def footprint_path(lib_path, name):
+    return os.path.join(lib_path, name + ".kicad_mod")
+
+
+def iter_footprint_files(lib_path):
+    """All .kicad_mod files of a .pretty library or a vendor folder tree"""
+    for root, dirs, files in os.walk(lib_path):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith(".kicad_mod"):
+                yield os.path.join(root, filename)
+
+
+class FootprintCache:
+    """Parse-once footprint loader backed by a persistent geometry index"""
+
+    def __init__(self, index_path=DEFAULT_INDEX_PATH, pack_path=DEFAULT_PACK_PATH):
+        self.index_path = index_path
+        self.entries = {}
+        self.parsed = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.pack = None
+        if pack_path and os.path.isfile(pack_path):
+            import footprint_pack  # Imports this module, so not at the top
+
+            try:
+                self.pack = footprint_pack.FootprintPack(pack_path)
+            except (OSError, footprint_pack.PackError):
+                self.pack = None
+        if index_path and os.path.isfile(index_path):
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    self.entries = data["footprints"]
+            except (OSError, ValueError, KeyError):
+                self.entries = {}
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Footprint file not found: {path}") from None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self, lib_path, name):
+        """Parsed library footprint (shared - copy it before editing)"""
+        return self._load_file(footprint_path(lib_path, name))
+
+    def clone(self, lib_path, name):
+        """Private copy of a library footprint, ready to be placed"""
+        return self.load(lib_path, name).copy()
+
+    def _load_file(self, path):
+        path = os.path.abspath(path)
+        stamp = self._stat(path)
+        cached = self.parsed.get(path)
+        if cached is not None and cached[0] == stamp:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        footprint = sx.load(path)
+        self.parsed[path] = (stamp, footprint)
+        self._update_entry(path, stamp, footprint)
+        return footprint
+
+    def _update_entry(self, path, stamp, footprint):
+        entry = self.entries.get(path)
+        if entry is not None and (entry["mtime_ns"], entry["size"]) == stamp:
+            return entry
+        pads = pad_bbox(footprint)
+        graphics = graphic_bbox(footprint)
+        entry = {
+            "name": sx.unquote(footprint[1]) if len(footprint) > 1 else "",
+            "mtime_ns": stamp[0],
+            "size": stamp[1],
+            "pad_count": sum(1 for _ in footprint.children("pad")),
+            "pad_bbox": pads,
+            "graphic_bbox": graphics,
+            "bbox": merge_bbox(pads, graphics),
+        }
+        self.entries[path] = entry
+        self.dirty = True
+        return entry
+
+    def geometry(self, lib_path, name):
+        """Index entry for a footprint; only parses the file when it changed on disk"""
+        path = os.path.abspath(footprint_path(lib_path, name))
+        stamp = self._stat(path)
+        entry = self.entries.get(path)
+        if entry is not None and (entry["mtime_ns"], entry["size"]) == stamp:
+            self.hits += 1
+            return entry
+        i = self.pack.lookup(path) if self.pack is not None else None
+        if i is not None and self.pack.is_current(i, stamp):
+            self.hits += 1
+            entry = self.entries[path] = self.pack.entry(i)
+            return entry
+        return self._update_entry(path, stamp, self._load_file(path))
+
+    def bbox(self, lib_path, name):
+        """Pad + graphic bounding box (left, top, right, bottom) in nm"""
+        bbox = self.geometry(lib_path, name)["bbox"]
+        return tuple(bbox) if bbox is not None else None
+
+    def index_library(self, lib_path):
+        """Bring the index up to date for every footprint under lib_path; returns (total, reparsed)"""
+        total = reparsed = 0
+        for path in iter_footprint_files(lib_path):
+            path = os.path.abspath(path)
+            total += 1
+            stamp = self._stat(path)
+            entry = self.entries.get(path)
+            if entry is None or (entry["mtime_ns"], entry["size"]) != stamp:
+                self._update_entry(path, stamp, sx.load(path))
+                reparsed += 1
+        return total, reparsed
+
+    def find(self, name):
+        """Index entries (path, entry) for every footprint called name"""
+        return [(path, entry) for path, entry in self.entries.items() if entry["name"] == name]
+
+    def save(self):
+        """Write the index back if anything changed (atomic replace)"""
+        if not self.dirty or not self.index_path:
+            return False
+        sx.write_atomic(self.index_path, json.dumps({"version": INDEX_VERSION, "footprints": self.entries},
+                                                    separators=(",", ":")))
+        self.dirty = False
+        return True
+
+
+class PcbnewFootprintCache:
+    """Load each footprint once through pcbnew and hand out copies for placement"""
+
+    def __init__(self):
+        import pcbnew
+
+        self.pcbnew = pcbnew
+        self.io = pcbnew.PCB_IO_KICAD_SEXPR()
+        self.templates = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, lib_path, name):
+        key = (lib_path, name)
+        template = self.templates.get(key)
+        if template is None:
+            self.misses += 1
+            template = self.io.FootprintLoad(lib_path, name)
+            if template is None:
+                raise FileNotFoundError(f"Footprint {name} not found in {lib_path}")
+            self.templates[key] = template
+        else:
+            self.hits += 1
+        return template
+
+    def clone(self, lib_path, name):
+        return self.pcbnew.FOOTPRINT(self.load(lib_path, name))
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide FootprintCache using the default index file"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FootprintCache()
+    return _default_cache
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or refresh the footprint geometry index")
+    parser.add_argument("libraries", nargs="+", help=".pretty libraries or folders holding .kicad_mod files")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index file to update")
+    args = parser.parse_args()
+
+    cache = FootprintCache(args.index)
+    for library in args.libraries:
+        total, reparsed = cache.index_library(library)
+        print(f"✓ {library}: {total} footprints ({reparsed} parsed, {total - reparsed} up to date)")
+    if cache.save():
+        print(f"💾 Saved {args.index}")
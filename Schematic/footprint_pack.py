@@ -0,0 +1,367 @@
+"""
+Compiled footprint geometry pack
+- Compiles whole .pretty libraries (or vendor folders) into one binary file, offline
+- Fixed-layout little-endian tables: one row per footprint (bounding boxes, courtyard,
+  file stamp) and one row per pad (type, shape, position, size, rotation, drill, layer mask)
+- Readers memory-map the file and get NumPy views straight onto it: no parsing, no copy
+- FootprintCache uses a pack next to its index when present (see footprint_cache.py)
+
+Units are integer nanometres like the rest of the scripts; rotations are degrees.
+
+    python footprint_pack.py MountingHole.pretty Symbols_and_Footprints
+    python footprint_pack.py --show MountingHole_2.7mm_M2.5_Pad
+"""
+
+import mmap
+import os
+import struct
+
+import numpy as np
+
+import kicad_sexpr as sx
+from footprint_cache import (DEFAULT_PACK_PATH, courtyard_bbox, graphic_bbox, iter_footprint_files,
+                             merge_bbox, pad_bbox)
+from kicad_sexpr import mm_to_nm
+
+
+MAGIC = b"KFPK"
+PACK_VERSION = 1
+
+# magic, version, footprint count, pad count, string bytes, then the three section offsets
+HEADER = struct.Struct("<4sIIIIQQQ")
+
+# Sections start on 8 byte boundaries
+ALIGN = 8
+
+# No value for an extent (e.g. a footprint without courtyard)
+NO_BBOX = (0, 0, -1, -1)
+
+FOOTPRINT_DTYPE = np.dtype([
+    ("path", "<u4", 2),          # (offset, length) in the string table
+    ("name", "<u4", 2),
+    ("mtime_ns", "<i8"),
+    ("size", "<i8"),
+    ("pad_start", "<u4"),
+    ("pad_count", "<u4"),
+    ("bbox", "<i8", 4),          # Pads + graphics, like get_footprint_bbox()
+    ("pad_bbox", "<i8", 4),
+    ("graphic_bbox", "<i8", 4),
+    ("courtyard", "<i8", 4),
+])
+
+PAD_DTYPE = np.dtype([
+    ("number", "<u4", 2),        # (offset, length) in the string table
+    ("type", "u1"),
+    ("shape", "u1"),
+    ("x", "<i8"),
+    ("y", "<i8"),
+    ("width", "<i8"),
+    ("height", "<i8"),
+    ("angle", "<f4"),
+    ("drill_width", "<i8"),      # 0 for SMD pads
+    ("drill_height", "<i8"),
+    ("layers", "<u8"),           # LAYER_BITS mask
+])
+
+PAD_TYPES = ("thru_hole", "smd", "connect", "np_thru_hole")
+PAD_SHAPES = ("circle", "rect", "oval", "trapezoid", "roundrect", "custom", "chamfered_rect")
+
+COPPER_LAYERS = ["F.Cu"] + [f"In{i}.Cu" for i in range(1, 31)] + ["B.Cu"]
+LAYER_BITS = {name: bit for bit, name in enumerate(COPPER_LAYERS + [
+    "F.Adhes", "B.Adhes", "F.Paste", "B.Paste", "F.SilkS", "B.SilkS", "F.Mask", "B.Mask",
+    "F.CrtYd", "B.CrtYd", "F.Fab", "B.Fab", "Edge.Cuts", "Margin", "Dwgs.User", "Cmts.User",
+])}
+
+# Wildcards KiCad writes in pad layer lists
+LAYER_WILDCARDS = {
+    "*.Cu": COPPER_LAYERS,
+    "F&B.Cu": ["F.Cu", "B.Cu"],
+}
+
+
+class PackError(ValueError):
+    """Raised for a file that isn't a readable footprint pack"""
+
+
+def layer_mask(names):
+    """Bit mask of layer names, expanding *.Cu, *.Mask and the like"""
+    mask = 0
+    for name in names:
+        if name in LAYER_WILDCARDS:
+            layers = LAYER_WILDCARDS[name]
+        elif name.startswith("*."):
+            layers = [f"F.{name[2:]}", f"B.{name[2:]}"]
+        else:
+            layers = [name]
+        for layer in layers:
+            bit = LAYER_BITS.get(layer)
+            if bit is not None:
+                mask |= 1 << bit
+    return mask
+
+
+def mask_layers(mask):
+    """Layer names of a bit mask, all copper layers written as *.Cu"""
+    names = [name for name, bit in LAYER_BITS.items() if mask >> bit & 1]
+    if all(name in names for name in COPPER_LAYERS):
+        names = ["*.Cu"] + [name for name in names if name not in COPPER_LAYERS]
+    return names
+
+
+# =============================================================================
+# COMPILE
+# =============================================================================
+
+
+class _Strings:
+    """UTF-8 string table with (offset, length) references"""
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.refs = {}
+
+    def add(self, text):
+        ref = self.refs.get(text)
+        if ref is None:
+            data = text.encode("utf-8")
+            ref = (len(self.blob), len(data))
+            self.blob += data
+            self.refs[text] = ref
+        return ref
+
+
+def _drill(pad):
+    """(width, height) of a pad's drill in nm, (0, 0) without one"""
+    drill = pad.find("drill")
+    if drill is None:
+        return 0, 0
+    sizes = [atom for atom in drill.atoms() if atom != "oval"]
+    if not sizes:
+        return 0, 0
+    width = mm_to_nm(sizes[0])
+    return width, mm_to_nm(sizes[1]) if len(sizes) > 1 else width
+
+
+def pad_rows(footprint, strings=None):
+    """PAD_DTYPE rows of a parsed footprint (pad numbers left empty without a string table)"""
+    rows = []
+    for pad in footprint.children("pad"):
+        at = pad.find("at")
+        size = pad.find("size")
+        layers = pad.find("layers")
+        kind = pad[2] if len(pad) > 2 else ""
+        shape = pad[3] if len(pad) > 3 else ""
+        rows.append((
+            strings.add(sx.unquote(pad[1]) if len(pad) > 1 else "") if strings is not None else (0, 0),
+            PAD_TYPES.index(kind) if kind in PAD_TYPES else 255,
+            PAD_SHAPES.index(shape) if shape in PAD_SHAPES else 255,
+            mm_to_nm(at[1]) if at is not None else 0,
+            mm_to_nm(at[2]) if at is not None else 0,
+            mm_to_nm(size[1]) if size is not None else 0,
+            mm_to_nm(size[2]) if size is not None and len(size) > 2 else 0,
+            float(at[3]) if at is not None and len(at) > 3 else 0.0,
+            *_drill(pad),
+            layer_mask(sx.unquote(name) for name in layers.atoms()) if layers is not None else 0,
+        ))
+    return rows
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def compile_pack(lib_paths, pack_path=DEFAULT_PACK_PATH):
+    """Compile every footprint under lib_paths into pack_path; returns the footprint count"""
+    strings = _Strings()
+    footprint_rows = []
+    pad_table = []
+    seen = set()
+    for lib_path in lib_paths:
+        for path in iter_footprint_files(lib_path):
+            path = os.path.abspath(path)
+            if path in seen:
+                continue
+            seen.add(path)
+            st = os.stat(path)
+            footprint = sx.load(path)
+            pads = pad_rows(footprint, strings)
+            pads_box = pad_bbox(footprint)
+            graphics_box = graphic_bbox(footprint)
+            footprint_rows.append((
+                strings.add(path),
+                strings.add(sx.unquote(footprint[1]) if len(footprint) > 1 else ""),
+                st.st_mtime_ns, st.st_size,
+                len(pad_table), len(pads),
+                merge_bbox(pads_box, graphics_box) or NO_BBOX,
+                pads_box or NO_BBOX,
+                graphics_box or NO_BBOX,
+                courtyard_bbox(footprint) or NO_BBOX,
+            ))
+            pad_table.extend(pads)
+
+    footprints = np.array(footprint_rows, dtype=FOOTPRINT_DTYPE)
+    pads = np.array(pad_table, dtype=PAD_DTYPE)
+    footprint_offset = _aligned(HEADER.size)
+    pad_offset = _aligned(footprint_offset + footprints.nbytes)
+    string_offset = _aligned(pad_offset + pads.nbytes)
+
+    # Written next to the target and swapped in, so readers never map a half-written pack
+    blob = bytearray(HEADER.pack(MAGIC, PACK_VERSION, len(footprints), len(pads), len(strings.blob),
+                                 footprint_offset, pad_offset, string_offset))
+    for offset, data in ((footprint_offset, footprints.tobytes()), (pad_offset, pads.tobytes()),
+                         (string_offset, bytes(strings.blob))):
+        blob += b"\0" * (offset - len(blob))
+        blob += data
+    sx.write_atomic(pack_path, blob)
+    return len(footprints)
+
+
+# =============================================================================
+# READ
+# =============================================================================
+
+
+def _bbox_or_none(row):
+    bbox = tuple(int(v) for v in row)
+    return None if bbox == NO_BBOX else bbox
+
+
+class FootprintPack:
+    """Read-only, memory-mapped view of a compiled pack"""
+
+    def __init__(self, path=DEFAULT_PACK_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise PackError(f"{path} is empty") from None
+        try:
+            header = HEADER.unpack_from(self.map, 0)
+        except struct.error:
+            raise PackError(f"{path} is too short for a footprint pack") from None
+        magic, version, footprint_count, pad_count, string_bytes, footprint_offset, pad_offset, string_offset = header
+        if magic != MAGIC or version != PACK_VERSION:
+            raise PackError(f"{path} is not a version {PACK_VERSION} footprint pack")
+        self.footprints = np.frombuffer(self.map, FOOTPRINT_DTYPE, footprint_count, footprint_offset)
+        self.pads = np.frombuffer(self.map, PAD_DTYPE, pad_count, pad_offset)
+        self.strings = memoryview(self.map)[string_offset:string_offset + string_bytes]
+        self._by_path = None
+        self._by_name = None
+
+    def __len__(self):
+        return len(self.footprints)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Unmap the file; arrays still held by callers keep the mapping alive until they go"""
+        self.footprints = self.pads = None
+        self.strings.release()
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def text(self, ref):
+        """String of an (offset, length) reference"""
+        offset, length = int(ref[0]), int(ref[1])
+        return str(self.strings[offset:offset + length], "utf-8")
+
+    def _index(self):
+        if self._by_path is None:
+            self._by_path = {}
+            self._by_name = {}
+            # Plain lists: per-row NumPy scalar access is the slow part here
+            refs = zip(self.footprints["path"].tolist(), self.footprints["name"].tolist())
+            for i, (path, name) in enumerate(refs):
+                self._by_path[self.text(path)] = i
+                self._by_name.setdefault(self.text(name), []).append(i)
+
+    def lookup(self, path):
+        """Row index of the footprint file at path, or None"""
+        self._index()
+        return self._by_path.get(os.path.abspath(path))
+
+    def find(self, name):
+        """Row indices of every footprint called name"""
+        self._index()
+        return list(self._by_name.get(name, ()))
+
+    def is_current(self, i, stamp=None):
+        """True when the compiled row still matches its file's (mtime_ns, size)"""
+        row = self.footprints[i]
+        if stamp is None:
+            try:
+                st = os.stat(self.text(row["path"]))
+            except FileNotFoundError:
+                return False
+            stamp = st.st_mtime_ns, st.st_size
+        return (int(row["mtime_ns"]), int(row["size"])) == tuple(stamp)
+
+    def pads_of(self, i):
+        """PAD_DTYPE rows of footprint i (a view into the mapped file)"""
+        row = self.footprints[i]
+        start = int(row["pad_start"])
+        return self.pads[start:start + int(row["pad_count"])]
+
+    def entry(self, i):
+        """Footprint i in the same form as a FootprintCache index entry, plus courtyard"""
+        row = self.footprints[i]
+        return {
+            "name": self.text(row["name"]),
+            "mtime_ns": int(row["mtime_ns"]),
+            "size": int(row["size"]),
+            "pad_count": int(row["pad_count"]),
+            "pad_bbox": _bbox_or_none(row["pad_bbox"]),
+            "graphic_bbox": _bbox_or_none(row["graphic_bbox"]),
+            "bbox": _bbox_or_none(row["bbox"]),
+            "courtyard": _bbox_or_none(row["courtyard"]),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Compile footprint libraries into a binary geometry pack")
+    parser.add_argument("libraries", nargs="*", help=".pretty libraries or folders holding .kicad_mod files")
+    parser.add_argument("-o", "--output", default=DEFAULT_PACK_PATH, help="Pack file to write or read")
+    parser.add_argument("--show", action="append", default=[], help="Print a footprint from the pack (repeatable)")
+    args = parser.parse_args()
+    if not args.libraries and not args.show:
+        parser.error("give libraries to compile or --show NAME")
+
+    if args.libraries:
+        start = time.perf_counter()
+        count = compile_pack(args.libraries, args.output)
+        print(f"✓ {count} footprints compiled in {time.perf_counter() - start:.2f}s")
+        print(f"💾 Saved {args.output} ({os.path.getsize(args.output) / 1024:.1f} kB)")
+
+    if args.show:
+        try:
+            pack = FootprintPack(args.output)
+        except (OSError, PackError) as e:
+            parser.error(str(e))
+        with pack:
+            for name in args.show:
+                rows = pack.find(name)
+                if not rows:
+                    print(f"✗ {name} is not in {args.output}")
+                for i in rows:
+                    entry = pack.entry(i)
+                    state = "" if pack.is_current(i) else " ⚠ changed since compiled"
+                    print(f"{entry['name']}: {pack.text(pack.footprints[i]['path'])}{state}")
+                    print(f"  bbox {entry['bbox']}, courtyard {entry['courtyard']}")
+                    for pad in pack.pads_of(i):
+                        kind = PAD_TYPES[pad["type"]] if pad["type"] < len(PAD_TYPES) else "?"
+                        shape = PAD_SHAPES[pad["shape"]] if pad["shape"] < len(PAD_SHAPES) else "?"
+                        drill = f", drill {pad['drill_width'] / 1e6:g}mm" if pad["drill_width"] else ""
+                        print(f"  pad {pack.text(pad['number']) or '-'}: {kind} {shape} "
+                              f"{pad['width'] / 1e6:g}x{pad['height'] / 1e6:g}mm at "
+                              f"({pad['x'] / 1e6:g}, {pad['y'] / 1e6:g}){drill} "
+                              f"on {' '.join(mask_layers(int(pad['layers'])))}")
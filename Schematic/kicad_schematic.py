@@ -0,0 +1,413 @@
+"""
+Streaming KiCad schematic reader (.kicad_sch) - no eeschema required
+- Walks a root sheet and its sub-sheets lazily; every file is streamed one
+  top-level item at a time (kicad_sexpr.iter_items), never held as a whole tree
+- Yields sheet instances, placed symbols with their fields, and nets
+- Nets come from the wire / junction / label / pin geometry of each sheet, joined
+  across the hierarchy through sheet pins, global labels and power symbols
+
+    python kicad_schematic.py STAR.kicad_sch --symbols
+    python kicad_schematic.py STAR.kicad_sch --nets
+"""
+
+import os
+
+import board_geometry as geometry
+import kicad_sexpr as sx
+from kicad_sexpr import mm_to_nm
+
+
+LABEL_ITEMS = ("label", "global_label", "hierarchical_label")
+
+# Symbol fields that are drawing details rather than part data
+INTERNAL_FIELDS = ("ki_keywords", "ki_fp_filters", "ki_description")
+
+
+# =============================================================================
+# ITEMS
+# =============================================================================
+
+
+def flag(node, name, default=False):
+    """Value of a (name yes/no) child, default when it's missing"""
+    value = node.get(name)
+    if value is None:
+        return default
+    return value == "yes"
+
+
+def properties(node):
+    """Field name -> text of a symbol or sheet"""
+    fields = {}
+    for prop in node.children("property"):
+        if len(prop) > 2:
+            fields[sx.unquote(prop[1])] = sx.unquote(prop[2])
+    return fields
+
+
+def lib_symbol_info(lib_symbol):
+    """Power flag and pins (unit, body style, number, name, type, hidden, (x, y) nm) of a lib symbol"""
+    pins = []
+    for unit_symbol in lib_symbol.children("symbol"):
+        # Sub-symbols are named <name>_<unit>_<body style>; unit 0 is common to all units
+        unit, style = (int(part) for part in sx.unquote(unit_symbol[1]).rsplit("_", 2)[1:])
+        for pin in unit_symbol.children("pin"):
+            x, y = sx.xy(pin)
+            hidden = "hide" in pin.atoms() or flag(pin, "hide")
+            # Library Y grows upward, schematic Y downward
+            pins.append((unit, style, pin.get("number", default=""), pin.get("name", default=""),
+                         pin[1], hidden, (x, -y)))
+    return {"power": lib_symbol.find("power") is not None, "pins": pins}
+
+
+def symbol_pins(symbol, lib):
+    """(number, name, type, hidden, (x, y) nm) of a placed symbol's pins in sheet coordinates"""
+    unit = int(symbol.get("unit", default=1))
+    style = int(symbol.get("body_style", default=symbol.get("convert", default=1)))
+    at = symbol.find("at")
+    origin = (mm_to_nm(at[1]), mm_to_nm(at[2]))
+    angle = float(at[3]) if len(at) > 3 else 0.0
+    mirror = symbol.get("mirror")
+
+    pins = [pin for pin in lib["pins"] if pin[0] in (0, unit) and pin[1] in (0, style)]
+    if not pins:
+        return []
+    offsets = geometry.as_points([pin[6] for pin in pins])
+    # KiCad applies the rotation first, then the mirror
+    offsets = geometry.rotate(offsets, angle)
+    if mirror == "x":
+        offsets[:, 1] = -offsets[:, 1]
+    elif mirror == "y":
+        offsets[:, 0] = -offsets[:, 0]
+    positions = (offsets + geometry.as_points(origin)).tolist()
+    return [(pin[2], pin[3], pin[4], pin[5], tuple(position)) for pin, position in zip(pins, positions)]
+
+
+def symbol_instances(symbol):
+    """(sheet path, reference, unit) of every instance recorded in a placed symbol"""
+    instances = symbol.find("instances")
+    for project in instances.children("project") if instances is not None else ():
+        for path in project.children("path"):
+            yield sx.unquote(path[1]), path.get("reference"), int(path.get("unit", default=1))
+
+
+def symbol_instance(symbol, sheet_path):
+    """(reference, unit) of a placed symbol in one sheet instance"""
+    fallback = None
+    for path, reference, unit in symbol_instances(symbol):
+        if path == sheet_path:
+            return reference, unit
+        fallback = fallback or (reference, unit)
+    if fallback is not None:
+        return fallback
+    return properties(symbol).get("Reference", "?"), int(symbol.get("unit", default=1))
+
+
+# =============================================================================
+# HIERARCHY
+# =============================================================================
+
+
+def child_sheet(node):
+    """Child sheet (uuid, name, file, pins) of a (sheet ...) item"""
+    fields = properties(node)
+    return {
+        "uuid": node.get("uuid"),
+        "name": fields.get("Sheetname", fields.get("Sheet name", "")),
+        "file": fields.get("Sheetfile", fields.get("Sheet file", "")),
+        "pins": [(sx.unquote(pin[1]), sx.xy(pin)) for pin in node.children("pin")],
+    }
+
+
+def read_sheet_header(path):
+    """Sheet UUID and child sheets (uuid, name, file, pins) of one schematic file"""
+    sheet_uuid = None
+    children = []
+    for (head,), node in sx.iter_items(path, {("uuid",), ("sheet",)}):
+        if head == "uuid":
+            sheet_uuid = sx.unquote(node[1])
+            continue
+        children.append(child_sheet(node))
+    return sheet_uuid, children
+
+
+def iter_sheets(root_path):
+    """
+    Sheet instances depth first, root included:
+    {"path": "/<uuid>/<uuid>", "name": "/Sub Sheet/", "file", "parent", "sheet_pins"}
+    """
+    root_path = os.path.abspath(root_path)
+    root_uuid, children = read_sheet_header(root_path)
+    stack = [(f"/{root_uuid}", "/", root_path, None, children, [], (root_path,))]
+    while stack:
+        path, name, file_path, parent, children, sheet_pins, ancestors = stack.pop()
+        yield {"path": path, "name": name, "file": file_path, "parent": parent, "sheet_pins": sheet_pins}
+        for child in reversed(children):
+            child_file = os.path.join(os.path.dirname(file_path), child["file"])
+            if not os.path.isfile(child_file):
+                raise FileNotFoundError(f"Sub-sheet not found: {child_file}")
+            if child_file in ancestors:
+                raise sx.SExprError(f"Recursive sheet reference to {child_file}")
+            _, grandchildren = read_sheet_header(child_file)
+            stack.append((f"{path}/{child['uuid']}", f"{name}{child['name']}/", child_file,
+                          path, grandchildren, child["pins"], ancestors + (child_file,)))
+
+
+# =============================================================================
+# SYMBOLS
+# =============================================================================
+
+
+def symbol_record(node, libs, sheet):
+    """Placed symbol as a dict, resolved for one sheet instance"""
+    lib_name = node.get("lib_name") or node.get("lib_id")
+    lib = libs.get(lib_name, {"power": False, "pins": []})
+    reference, unit = symbol_instance(node, sheet["path"])
+    fields = {key: value for key, value in properties(node).items() if key not in INTERNAL_FIELDS}
+    fields["Reference"] = reference
+    return {
+        "reference": reference,
+        "unit": unit,
+        "value": fields.get("Value", ""),
+        "footprint": fields.get("Footprint", ""),
+        "lib_id": node.get("lib_id"),
+        "uuid": node.get("uuid"),
+        "sheet": sheet["name"],
+        "sheet_path": sheet["path"],
+        "fields": fields,
+        "power": lib["power"] or reference.startswith("#"),
+        "in_bom": flag(node, "in_bom", True),
+        "on_board": flag(node, "on_board", True),
+        "dnp": flag(node, "dnp"),
+        "exclude_from_sim": flag(node, "exclude_from_sim"),
+    }
+
+
+def iter_sheet_symbols(file_path, sheet):
+    """Placed symbols of one sheet instance, streamed from its file"""
+    libs = {}
+    for heads, node in sx.iter_items(file_path, {("lib_symbols", "symbol"), ("symbol",)}):
+        if heads == ("lib_symbols", "symbol"):
+            libs[sx.unquote(node[1])] = lib_symbol_info(node)
+        else:
+            yield symbol_record(node, libs, sheet)
+
+
+def iter_symbols(root_path):
+    """Every placed symbol of the hierarchy, one sheet instance at a time"""
+    for sheet in iter_sheets(root_path):
+        yield from iter_sheet_symbols(sheet["file"], sheet)
+
+
+# =============================================================================
+# NETS
+# =============================================================================
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, key):
+        parent = self.parent
+        root = parent.setdefault(key, key)
+        while root != parent[root]:
+            root = parent[root]
+        while key != root:
+            parent[key], key = root, parent[key]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+def _on_segment(point, start, end):
+    """True if point lies on the segment start-end (endpoints included)"""
+    (px, py), (ax, ay), (bx, by) = point, start, end
+    if (bx - ax) * (py - ay) != (by - ay) * (px - ax):
+        return False
+    return min(ax, bx) <= px <= max(ax, bx) and min(ay, by) <= py <= max(ay, by)
+
+
+def sheet_connectivity(file_path, sheet):
+    """
+    Connected groups of one sheet instance: lists of (kind, data) entries - pins
+    (reference, number), labels, sheet pins and power net names - that touch
+    each other through wires, junctions or shared points.
+    """
+    uf = _UnionFind()
+    attached = {}   # point -> list of (kind, data)
+    wires = []
+
+    def attach(point, kind, data):
+        uf.find(point)
+        attached.setdefault(point, []).append((kind, data))
+
+    libs = {}
+    items = {("lib_symbols", "symbol"), ("symbol",), ("wire",), ("junction",)} | {(kind,) for kind in LABEL_ITEMS}
+    for heads, node in sx.iter_items(file_path, items):
+        head = heads[-1]
+        if heads == ("lib_symbols", "symbol"):
+            libs[sx.unquote(node[1])] = lib_symbol_info(node)
+        elif head == "symbol":
+            symbol = symbol_record(node, libs, sheet)
+            lib = libs.get(node.get("lib_name") or node.get("lib_id"), {"power": False, "pins": []})
+            for number, name, pin_type, hidden, point in symbol_pins(node, lib):
+                if symbol["power"]:
+                    attach(point, "power", symbol["value"])
+                    continue
+                attach(point, "pin", (symbol["reference"], number))
+                if hidden and pin_type == "power_in":
+                    # Hidden power input pins join the global net named after the pin
+                    attach(point, "power", name)
+        elif head == "wire":
+            points = [(mm_to_nm(xy[1]), mm_to_nm(xy[2])) for xy in node.find("pts").children("xy")]
+            for a, b in zip(points, points[1:]):
+                uf.union(a, b)
+                wires.append((a, b))
+        elif head == "junction":
+            uf.find(sx.xy(node))
+        else:
+            attach(sx.xy(node), head, sx.unquote(node[1]))
+    for name, point in sheet.get("child_pins", ()):
+        attach(point, "sheet_pin", name)
+
+    # Points lying on a wire join it; axis-aligned wires are indexed by their fixed coordinate
+    horizontal, vertical, other = {}, {}, []
+    for a, b in wires:
+        if a[1] == b[1]:
+            horizontal.setdefault(a[1], []).append((min(a[0], b[0]), max(a[0], b[0]), a))
+        elif a[0] == b[0]:
+            vertical.setdefault(a[0], []).append((min(a[1], b[1]), max(a[1], b[1]), a))
+        else:
+            other.append((a, b))
+    for point in list(uf.parent):
+        x, y = point
+        for low, high, anchor in horizontal.get(y, ()):
+            if low <= x <= high:
+                uf.union(anchor, point)
+        for low, high, anchor in vertical.get(x, ()):
+            if low <= y <= high:
+                uf.union(anchor, point)
+        for a, b in other:
+            if _on_segment(point, a, b):
+                uf.union(a, point)
+
+    groups = {}
+    for point, entries in attached.items():
+        groups.setdefault(uf.find(point), []).extend(entries)
+    return list(groups.values())
+
+
+def iter_nets(root_path):
+    """
+    Nets of the whole hierarchy: {"name", "nodes": [(reference, pin)], "sheet"}.
+    Every sheet is read before the first net is known, but only the compact
+    per-sheet groups are kept, never the parsed files.
+    """
+    uf = _UnionFind()
+    names = {}      # group key -> candidate names (priority, sheet depth, name)
+    nodes = {}      # group key -> pins
+    sheet_names = {}
+
+    sheets = list(iter_sheets(root_path))
+    child_pins = {}
+    for sheet in sheets:
+        if sheet["parent"] is not None:
+            child_pins.setdefault(sheet["parent"], []).extend(
+                ((sheet["path"], name), point) for name, point in sheet["sheet_pins"])
+
+    for sheet in sheets:
+        sheet_names[sheet["path"]] = sheet["name"]
+        depth = sheet["path"].count("/")
+        groups = sheet_connectivity(sheet["file"], dict(sheet, child_pins=child_pins.get(sheet["path"], ())))
+        for i, entries in enumerate(groups):
+            key = (sheet["path"], i)
+            uf.find(key)
+            for kind, data in entries:
+                if kind == "pin":
+                    nodes.setdefault(key, []).append(data)
+                elif kind in ("power", "global_label"):
+                    uf.union(key, ("global", data))
+                    names.setdefault(key, []).append((0, 0, data))
+                elif kind == "label":
+                    uf.union(key, ("label", sheet["path"], data))
+                    names.setdefault(key, []).append((1, depth, sheet["name"] + data))
+                elif kind == "hierarchical_label":
+                    uf.union(key, ("sheet", sheet["path"], data))
+                    names.setdefault(key, []).append((2, depth, sheet["name"] + data))
+                elif kind == "sheet_pin":
+                    uf.union(key, ("sheet", *data))
+
+    nets = {}
+    for key in list(uf.parent):
+        if key[0] in ("global", "label", "sheet"):
+            continue
+        net = nets.setdefault(uf.find(key), {"names": [], "nodes": set(), "sheets": []})
+        net["names"].extend(names.get(key, ()))
+        net["nodes"].update(nodes.get(key, ()))
+        net["sheets"].append(sheet_names[key[0]])
+
+    for net in nets.values():
+        pins = sorted(net["nodes"], key=lambda pin: (natural_key(pin[0]), natural_key(pin[1])))
+        if net["names"]:
+            name = min(net["names"])[2]
+        elif len(pins) == 1:
+            name = f"unconnected-({pins[0][0]}-Pad{pins[0][1]})"
+        elif pins:
+            name = f"Net-({pins[0][0]}-Pad{pins[0][1]})"
+        else:
+            continue
+        yield {"name": name, "nodes": pins, "sheet": min(net["sheets"], key=lambda n: (n.count("/"), n))}
+
+
+def natural_key(text):
+    """Sort key that orders R2 before R10"""
+    key = []
+    number = ""
+    word = ""
+    for ch in str(text):
+        if ch.isdigit():
+            if word:
+                key.append((1, word))
+                word = ""
+            number += ch
+        else:
+            if number:
+                key.append((0, int(number)))
+                number = ""
+            word += ch
+    if number:
+        key.append((0, int(number)))
+    if word:
+        key.append((1, word))
+    return key
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import sys
+
+    parser = argparse.ArgumentParser(description="Read a KiCad schematic hierarchy without eeschema")
+    parser.add_argument("schematic", help="Root .kicad_sch")
+    parser.add_argument("--sheets", action="store_true", help="List sheet instances")
+    parser.add_argument("--symbols", action="store_true", help="List placed symbols (CSV)")
+    parser.add_argument("--nets", action="store_true", help="List nets and their pins")
+    args = parser.parse_args()
+
+    if args.sheets or not (args.symbols or args.nets):
+        for sheet in iter_sheets(args.schematic):
+            print(f"{sheet['name']}\t{os.path.basename(sheet['file'])}\t{sheet['path']}")
+    if args.symbols:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(("Reference", "Unit", "Value", "Footprint", "Sheet", "DNP", "In BOM", "On board"))
+        for symbol in iter_symbols(args.schematic):
+            if not symbol["power"]:
+                writer.writerow((symbol["reference"], symbol["unit"], symbol["value"], symbol["footprint"],
+                                 symbol["sheet"], symbol["dnp"], symbol["in_bom"], symbol["on_board"]))
+    if args.nets:
+        for net in sorted(iter_nets(args.schematic), key=lambda n: natural_key(n["name"])):
+            print(f"{net['name']}: {' '.join(f'{ref}.{pin}' for ref, pin in net['nodes'])}")
@@ -0,0 +1,399 @@
+"""
+Lossless S-expression reader/writer for KiCad files (.kicad_pcb, .kicad_mod, .kicad_sch)
+- Keeps the whitespace between tokens so an unmodified tree is written back byte for byte
+- New nodes are laid out the way KiCad 8/9 writes them (tab indentation)
+- Atoms are kept as raw token text; quoted strings keep their quotes
+"""
+
+import gc
+import os
+import re
+from contextlib import contextmanager
+
+
+# Whitespace, parens, quoted strings (with escapes) and bare atoms
+TOKEN_RE = re.compile(r'(\s*)(?:(\()|(\))|("(?:[^"\\]|\\.)*")|([^\s()"]+))', re.S)
+
+# Same tokens as TOKEN_RE with the token in one group, for streaming
+STREAM_TOKEN_RE = re.compile(r'(\s*)(\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+)', re.S)
+
+NM_PER_MM = 1000000
+
+
+class SExprError(ValueError):
+    """Raised for malformed S-expression input"""
+
+
+class SExpr:
+    """
+    A parenthesised list; gaps[i] is the whitespace before items[i], gaps[-1] precedes ')'.
+    lead/tail hold the text around the top-level expression of a file.
+    """
+
+    __slots__ = ("items", "gaps", "lead", "tail")
+
+    def __init__(self, items=None, gaps=None):
+        self.items = items if items is not None else []
+        self.gaps = gaps if gaps is not None else [""] + [" "] * len(self.items)
+        if len(self.items) and self.gaps[-1] == " ":
+            self.gaps[-1] = ""
+        self.lead = ""
+        self.tail = ""
+
+    def __repr__(self):
+        return f"SExpr({self.head!r}, {len(self.items)} items)"
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    @property
+    def head(self):
+        """Node keyword, e.g. 'footprint' or 'gr_rect'"""
+        if self.items and isinstance(self.items[0], str):
+            return self.items[0]
+        return None
+
+    def children(self, name=None):
+        """Child lists, optionally only those whose head is name"""
+        for item in self.items:
+            if isinstance(item, SExpr) and (name is None or item.head == name):
+                yield item
+
+    def find(self, name):
+        """First child list with the given head, or None"""
+        for item in self.items:
+            if isinstance(item, SExpr) and item.head == name:
+                return item
+        return None
+
+    def find_all(self, name):
+        return list(self.children(name))
+
+    def atoms(self):
+        """Atom arguments after the head"""
+        return [item for item in self.items[1:] if isinstance(item, str)]
+
+    def get(self, name, index=1, default=None):
+        """Unquoted atom at index of the first child named name"""
+        child = self.find(name)
+        if child is None or len(child.items) <= index or not isinstance(child.items[index], str):
+            return default
+        return unquote(child.items[index])
+
+    def index(self, child):
+        for i, item in enumerate(self.items):
+            if item is child:
+                return i
+        raise ValueError("child not in list")
+
+    def remove(self, child):
+        """Remove child together with the whitespace in front of it"""
+        i = self.index(child)
+        del self.items[i]
+        del self.gaps[i]
+
+    def remove_all(self, children):
+        """Remove several children in one pass (remove() is a linear search per child)"""
+        drop = {id(child) for child in children}
+        if not drop:
+            return
+        kept = [i for i, item in enumerate(self.items) if id(item) not in drop]
+        self.gaps = [self.gaps[i] for i in kept] + [self.gaps[-1]]
+        self.items = [self.items[i] for i in kept]
+
+    def insert(self, index, child, gap=None):
+        """Insert child before items[index], reusing a sibling's indentation by default"""
+        if index < 0:
+            index += len(self.items) + 1
+        if gap is None:
+            gap = self._sibling_gap(index)
+        self.items.insert(index, child)
+        self.gaps.insert(index, gap)
+
+    def append(self, child, gap=None):
+        self.insert(len(self.items), child, gap)
+
+    def set(self, name, *values):
+        """Replace the atoms of child name, creating the child if missing"""
+        child = self.find(name)
+        if child is None:
+            child = SExpr([name, *values])
+            self.append(child)
+        else:
+            child.items[1:] = list(values)
+            child.gaps[1:] = [" "] * len(values) + [""]
+        return child
+
+    def reindent(self, levels):
+        """Shift every line break inside this node by levels tabs"""
+        pad = "\t" * levels
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            node.gaps = [gap.replace("\n", "\n" + pad) if "\n" in gap else gap for gap in node.gaps]
+            stack.extend(node.children())
+
+    def copy(self):
+        """Deep copy of the node"""
+        return SExpr([item.copy() if isinstance(item, SExpr) else item for item in self.items], list(self.gaps))
+
+    def dumps(self):
+        out = [self.lead]
+        _write(self, out)
+        out.append(self.tail)
+        return "".join(out)
+
+    def _sibling_gap(self, index):
+        for i in range(min(index, len(self.items) - 1), 0, -1):
+            if isinstance(self.items[i], SExpr):
+                return self.gaps[i]
+        for i in range(index, len(self.items)):
+            if isinstance(self.items[i], SExpr):
+                return self.gaps[i]
+        return " "
+
+
+def _write(node, out):
+    """Append the text of node to out"""
+    gaps = node.gaps
+    out.append("(")
+    for i, item in enumerate(node.items):
+        out.append(gaps[i])
+        if isinstance(item, SExpr):
+            _write(item, out)
+        else:
+            out.append(item)
+    out.append(gaps[-1])
+    out.append(")")
+
+
+def parse(text):
+    """Parse text holding one top-level S-expression into an SExpr"""
+    # A board is millions of small objects and the tree holds no cycles, so the cyclic
+    # collector would only rescan it while it's built. Build with the collector off
+    # (the previous state is restored; the process-wide GC setup is left alone).
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _parse(text)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _parse(text):
+    stack = []
+    root = None
+    pos = 0
+    for match in TOKEN_RE.finditer(text):
+        if match.start() != pos:
+            break
+        pos = match.end()
+        ws, lparen, rparen, string, atom = match.groups()
+        if lparen:
+            node = SExpr([], [])
+            if stack:
+                parent = stack[-1]
+                parent.gaps.append(ws)
+                parent.items.append(node)
+            elif root is not None:
+                raise SExprError("More than one top-level expression")
+            else:
+                root = node
+                root.lead = ws
+            stack.append(node)
+        elif rparen:
+            if not stack:
+                raise SExprError(f"Unbalanced ')' at offset {match.start(3)}")
+            stack.pop().gaps.append(ws)
+        else:
+            if not stack:
+                raise SExprError(f"Atom outside of an expression at offset {match.start()}")
+            parent = stack[-1]
+            parent.gaps.append(ws)
+            parent.items.append(string or atom)
+    if text[pos:].strip():
+        raise SExprError(f"Unexpected input at offset {pos}")
+    if stack:
+        raise SExprError("Unexpected end of input, missing ')'")
+    if root is None:
+        raise SExprError("No expression found")
+    root.tail = text[pos:]
+    return root
+
+
+def iter_tokens(f, chunk_size=1 << 16):
+    """(whitespace, token) pairs read from a text file in chunks"""
+    buffer = ""
+    eof = False
+    while not eof:
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        pos = 0
+        end = len(buffer)
+        for match in STREAM_TOKEN_RE.finditer(buffer):
+            # A token touching the end of the buffer may continue in the next chunk
+            if match.start() != pos or (match.end() == end and not eof):
+                break
+            pos = match.end()
+            yield match.groups()
+        buffer = buffer[pos:]
+    if buffer.strip():
+        raise SExprError(f"Unexpected input near {buffer[:40]!r}")
+
+
+def iter_items(path, select):
+    """
+    Stream the children of a file's top-level expression without building the whole tree.
+    select holds head paths such as ("symbol",) or ("lib_symbols", "symbol"); every
+    matching node is built on its own and yielded as (head path, SExpr).
+    """
+    select = {tuple(s) for s in select}
+    heads = []       # Heads of the open expressions above the cursor (None until known)
+    building = []    # Stack of nodes being built for a selected item
+    pending = None   # Whitespace of a '(' whose head hasn't been read yet
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for ws, token in iter_tokens(f):
+            if building:
+                if token == "(":
+                    node = SExpr([], [])
+                    building[-1].gaps.append(ws)
+                    building[-1].items.append(node)
+                    building.append(node)
+                elif token == ")":
+                    node = building.pop()
+                    node.gaps.append(ws)
+                    if not building:
+                        yield tuple(heads[1:]), node
+                        heads.pop()
+                else:
+                    building[-1].gaps.append(ws)
+                    building[-1].items.append(token)
+            elif token == "(":
+                if pending is not None:
+                    heads.append(None)
+                pending = ws
+            elif token == ")":
+                if pending is not None:
+                    pending = None
+                elif not heads:
+                    raise SExprError(f"Unbalanced ')' in {path}")
+                else:
+                    heads.pop()
+            elif pending is not None:
+                heads.append(token)
+                if tuple(heads[1:]) in select:
+                    building.append(SExpr([token], [ws]))
+                pending = None
+    if heads or building:
+        raise SExprError(f"Unexpected end of {path}, missing ')'")
+
+
+def load(path):
+    """Read and parse a KiCad file"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return parse(f.read())
+
+
+def save(path, tree):
+    """Write tree back to path, only touching the disk if the content changed"""
+    return save_text(path, tree.dumps())
+
+
+def save_text(path, text):
+    """Write file text to path unless it already holds exactly that; returns whether it wrote"""
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    return True
+
+
+@contextmanager
+def atomic_file(path, mode="wb"):
+    """
+    File object on a temporary name next to path, swapped in when the block ends, so readers
+    never see half a file; on an exception the temporary file is removed and path is left as is
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode, **({} if "b" in mode else {"encoding": "utf-8", "newline": ""})) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(path, data):
+    """Write text or bytes through atomic_file()"""
+    with atomic_file(path, "w" if isinstance(data, str) else "wb") as f:
+        f.write(data)
+
+
+def build(spec, depth=0):
+    """
+    Build a KiCad-formatted SExpr from nested lists/tuples of atoms.
+    Lists made only of atoms stay on one line, nested lists go on their own
+    indented line, matching the layout KiCad writes.
+    """
+    node = SExpr([], [])
+    for item in spec:
+        if isinstance(item, (list, tuple)):
+            node.gaps.append("\n" + "\t" * (depth + 1))
+            node.items.append(build(item, depth + 1))
+        else:
+            node.gaps.append(" " if node.items else "")
+            node.items.append(item if isinstance(item, str) else str(item))
+    has_children = any(isinstance(item, SExpr) for item in node.items)
+    node.gaps.append("\n" + "\t" * depth if has_children else "")
+    return node
+
+
+def quote(text):
+    """Quote a Python string as a KiCad string atom"""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def unquote(atom):
+    """Return the text of an atom, unquoting string atoms"""
+    if len(atom) >= 2 and atom[0] == '"' and atom[-1] == '"':
+        body = atom[1:-1]
+        if "\\" in body:
+            body = re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), body)
+        return body
+    return atom
+
+
+def mm_to_nm(mm):
+    """Millimetres (number or atom text) to integer KiCad internal units"""
+    return int(round(float(mm) * NM_PER_MM))
+
+
+def xy(node, name="at", convert=mm_to_nm):
+    """(x, y) of a child like (at x y ...), in nm unless another convert is given; None when it's missing"""
+    child = node.find(name)
+    if child is None:
+        return None
+    return convert(child[1]), convert(child[2])
+
+
+def fmt_mm(nm):
+    """Integer nanometres to the shortest exact millimetre atom, e.g. 153250000 -> '153.25'"""
+    sign = "-" if nm < 0 else ""
+    whole, frac = divmod(abs(int(nm)), NM_PER_MM)
+    if not frac:
+        return f"{sign}{whole}"
+    return f"{sign}{whole}.{frac:06d}".rstrip("0")
@@ -0,0 +1,246 @@
+"""
+Mounting hole selection table
+- Every footprint of MountingHole.pretty as one row: screw size, drill, copper pad
+  diameter, footprint size (pads + graphics, what the placement engine keeps clear),
+  plating, head standard (ISO7380 / ISO14580 / DIN965) and layer style
+- Screw, standard and style come from KiCad's naming scheme; drill, pad and size are
+  measured from the files themselves
+- Built once and kept in .mounting-hole-table.json; only footprints whose file changed
+  are parsed again
+- Rows are sorted by (screw, pad, size); each (screw, standard, style) group is a
+  slice found with one dict lookup, then narrowed by pad/size with a binary search
+
+Styles: "none" (bare NPTH hole), "Pad" (plated, pad on every copper layer), "TopBottom",
+"TopOnly" and "Via" (plated ring stitched with vias).
+
+Pick a footprint in the configuration instead of naming it:
+    GROUNDED_FOOTPRINT = {"screw": "M3", "style": "Pad", "max_pad_mm": 6}
+
+    python mounting_holes.py --screw M3 --style Pad --max-pad 6
+    python mounting_holes.py --screw M3 --centre-to-edge 5.5 --edge-clearance 2.5
+"""
+
+import bisect
+import inspect
+import json
+import os
+import re
+
+import numpy as np
+
+import kicad_sexpr as sx
+from footprint_cache import footprint_bbox, footprint_path, iter_footprint_files
+from footprint_pack import PAD_DTYPE, PAD_TYPES, pad_rows
+from kicad_sexpr import mm_to_nm
+
+
+DEFAULT_LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MountingHole.pretty")
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".mounting-hole-table.json")
+TABLE_VERSION = 2
+
+STANDARDS = ("", "ISO7380", "ISO14580", "DIN965")
+STYLES = ("none", "Pad", "TopBottom", "TopOnly", "Via")
+
+NAME_RE = re.compile(r"^MountingHole_[\d.]+(?:x[\d.]+)?mm(?:_M(?P<screw>[\d.]+))?"
+                     r"(?:_(?P<standard>ISO7380|ISO14580|DIN965))?(?P<pad>_Pad)?(?:_(?P<style>TopBottom|TopOnly|Via))?$")
+
+NPTH = PAD_TYPES.index("np_thru_hole")
+PLATED = PAD_TYPES.index("thru_hole")
+
+
+class MountingHoleError(LookupError):
+    """Raised when no footprint meets a query"""
+
+
+def _screw_size(text):
+    """"M2.5", "2.5" or 2.5 -> 2.5"""
+    return float(str(text).upper().lstrip("M"))
+
+
+def footprint_row(path):
+    """Table row of one mounting hole .kicad_mod, None for other footprints (tooling holes)"""
+    name = os.path.basename(path)[:-len(".kicad_mod")]
+    match = NAME_RE.match(name)
+    if match is None:
+        return None
+    footprint = sx.load(path)
+    pads = np.array(pad_rows(footprint), dtype=PAD_DTYPE)
+    left, top, right, bottom = footprint_bbox(footprint)
+    style = match.group("style") or ("Pad" if match.group("pad") else "none")
+    return {
+        "name": name,
+        "screw": float(match.group("screw") or 0),  # 0: the name gives only the hole size
+        "standard": match.group("standard") or "",
+        "style": style,
+        "drill_nm": int(pads["drill_width"].max(initial=0)),
+        "pad_nm": int(pads["width"][pads["type"] != NPTH].max(initial=0)),
+        "size_nm": max(right - left, bottom - top),
+        "plated": bool((pads["type"] == PLATED).any()),
+    }
+
+
+def _sort_key(row):
+    return row["screw"], row["pad_nm"], row["size_nm"], row["name"]
+
+
+class MountingHoleTable:
+    """Sorted mounting hole rows with a (screw, standard, style) group index"""
+
+    def __init__(self, rows, library=DEFAULT_LIBRARY):
+        self.library = library
+        self.rows = sorted(rows, key=_sort_key)
+        self.groups = {}
+        for i, row in enumerate(self.rows):
+            key = (row["screw"], row["standard"], row["style"])
+            self.groups.setdefault(key, []).append(i)
+        # Pad diameters per group, for bisect
+        self.group_pads = {key: [self.rows[i]["pad_nm"] for i in indexes] for key, indexes in self.groups.items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def select(self, screw=None, standard=None, style=None, plated=None, drill_mm=None, max_pad_mm=None,
+               max_size_mm=None):
+        """Rows meeting every given constraint, smallest pad (then footprint size) first"""
+        screw = _screw_size(screw) if screw is not None else None
+        keys = [key for key in self.groups if (screw is None or key[0] == screw)
+                and (standard is None or key[1] == standard) and (style is None or key[2] == style)]
+        max_pad = int(mm_to_nm(max_pad_mm)) if max_pad_mm is not None else None
+        max_size = int(mm_to_nm(max_size_mm)) if max_size_mm is not None else None
+        drill = int(mm_to_nm(drill_mm)) if drill_mm is not None else None
+        found = []
+        for key in keys:
+            indexes = self.groups[key]
+            end = len(indexes) if max_pad is None else bisect.bisect_right(self.group_pads[key], max_pad)
+            for i in indexes[:end]:
+                row = self.rows[i]
+                if ((plated is None or row["plated"] == plated) and (drill is None or row["drill_nm"] == drill)
+                        and (max_size is None or row["size_nm"] <= max_size)):
+                    found.append(row)
+        return sorted(found, key=lambda row: (row["pad_nm"], row["size_nm"], row["screw"], row["name"]))
+
+    def pick(self, **query):
+        """Smallest footprint meeting the query (select() arguments, plus centre_to_edge_mm / edge_clearance_mm)"""
+        query = select_arguments(query)
+        rows = self.select(**query)
+        if not rows:
+            described = ", ".join(f"{key}={value}" for key, value in sorted(query.items()))
+            raise MountingHoleError(f"No footprint in {os.path.basename(self.library)} meets {described}")
+        return rows[0]
+
+
+QUERY_KEYS = tuple(inspect.signature(MountingHoleTable.select).parameters)[1:] + ("centre_to_edge_mm",
+                                                                                "edge_clearance_mm")
+
+
+def select_arguments(query):
+    """select() arguments of a query, centre_to_edge_mm / edge_clearance_mm turned into max_size_mm"""
+    for key in query:
+        if key not in QUERY_KEYS:
+            raise MountingHoleError(f"Unknown mounting hole query key {key!r} (expected one of {', '.join(QUERY_KEYS)})")
+    query = dict(query)
+    centre_to_edge = query.pop("centre_to_edge_mm", None)
+    clearance = query.pop("edge_clearance_mm", None) or 0
+    if centre_to_edge is not None:
+        # Footprint edge at least edge_clearance_mm inside the board edge
+        size = 2 * (centre_to_edge - clearance)
+        if query.get("max_size_mm") is None or size < query["max_size_mm"]:
+            query["max_size_mm"] = size
+    return query
+
+
+# =============================================================================
+# PERSISTENT TABLE
+# =============================================================================
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_table(library=DEFAULT_LIBRARY, table_path=DEFAULT_TABLE_PATH):
+    """Table of a library, re-measuring only the footprints whose file changed"""
+    library = os.path.abspath(library)
+    cached = {}
+    if table_path and os.path.isfile(table_path):
+        try:
+            with open(table_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == TABLE_VERSION and data.get("library") == library:
+                cached = data["footprints"]
+        except (OSError, ValueError, KeyError):
+            cached = {}
+
+    footprints = {}
+    for path in iter_footprint_files(library):
+        name = os.path.basename(path)[:-len(".kicad_mod")]
+        stamp = _stamp(path)
+        entry = cached.get(name)
+        if entry is None or entry["stamp"] != stamp:
+            entry = {"stamp": stamp, "row": footprint_row(path)}
+        footprints[name] = entry
+
+    if footprints != cached and table_path:
+        sx.write_atomic(table_path, json.dumps({"version": TABLE_VERSION, "library": library,
+                                                "footprints": footprints}, separators=(",", ":")))
+    return MountingHoleTable([entry["row"] for entry in footprints.values() if entry["row"]], library)
+
+
+_tables = {}
+
+
+def table_for(library=DEFAULT_LIBRARY):
+    """Process-wide table per library folder"""
+    library = os.path.abspath(library)
+    if library not in _tables:
+        _tables[library] = load_table(library, DEFAULT_TABLE_PATH if library == DEFAULT_LIBRARY else None)
+    return _tables[library]
+
+
+def resolve_footprint(footprint, library=DEFAULT_LIBRARY):
+    """Footprint name as is, or the pick() of a query dict against the library's table"""
+    if not isinstance(footprint, dict):
+        return footprint
+    name = table_for(library).pick(**footprint)["name"]
+    if not os.path.isfile(footprint_path(library, name)):
+        raise MountingHoleError(f"{name} is in the table but not in {library}")
+    return name
+
+
+def format_row(row):
+    screw = f"M{row['screw']:g}" if row["screw"] else "-"
+    return (f"{row['name']:<48} {screw:>5} {row['drill_nm'] / 1e6:6.2f} {row['pad_nm'] / 1e6:6.2f} "
+            f"{row['size_nm'] / 1e6:6.2f} {row['standard'] or '-':>8} {row['style']:>9} "
+            f"{'yes' if row['plated'] else 'no':>6}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the mounting hole footprints by constraint")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY, help="Mounting hole .pretty folder")
+    parser.add_argument("--screw", help="Screw size, e.g. M3")
+    parser.add_argument("--standard", choices=STANDARDS[1:] + ("none",), help="Screw head standard")
+    parser.add_argument("--style", choices=STYLES, help="Pad layer style")
+    parser.add_argument("--plated", action="store_true", default=None, help="Plated holes only")
+    parser.add_argument("--drill", type=float, help="Exact drill diameter in mm")
+    parser.add_argument("--max-pad", type=float, help="Largest copper pad diameter in mm")
+    parser.add_argument("--max-size", type=float, help="Largest footprint size (pads + graphics) in mm")
+    parser.add_argument("--centre-to-edge", type=float, help="Hole centre to board edge in mm")
+    parser.add_argument("--edge-clearance", type=float, default=0.0, help="Footprint edge to board edge in mm")
+    parser.add_argument("--all", action="store_true", help="List every match, not only the smallest")
+    args = parser.parse_args()
+
+    table = table_for(args.library)
+    query = {"screw": args.screw, "standard": "" if args.standard == "none" else args.standard,
+             "style": args.style, "plated": args.plated, "drill_mm": args.drill,
+             "max_pad_mm": args.max_pad, "max_size_mm": args.max_size,
+             "centre_to_edge_mm": args.centre_to_edge, "edge_clearance_mm": args.edge_clearance}
+    rows = table.select(**select_arguments(query))
+    print(f"{'footprint':<48} {'screw':>5} {'drill':>6} {'pad':>6} {'size':>6} {'standard':>8} {'style':>9} plated")
+    for row in rows if args.all else rows[:1]:
+        print(format_row(row))
+    print(f"✓ {len(rows)} of {len(table)} footprints match" if rows else f"✗ None of {len(table)} footprints match")
+    if not rows:
+        raise SystemExit(1)
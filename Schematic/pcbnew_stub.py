@@ -0,0 +1,466 @@
+"""
+Minimal stand-in for KiCad's pcbnew module, for running the console scripts headless
+- Covers what complete-board-setup.py, add-mounting-holes.py and footprint_cache.py call:
+  boards, footprints, Edge.Cuts shapes, groups, tracks, BOARD_COMMIT and Refresh()
+- Footprints are read with kicad_sexpr; their pads and graphics come back as one item
+  each, sized from footprint_cache's bounding boxes
+- Every board change, commit push, connectivity rebuild and view refresh is appended to
+  LOG, so runs can be checked for how often they touch the board
+- load_board() builds a BOARD from a .kicad_pcb (footprints, Edge.Cuts, tracks, groups)
+
+    import sys, pcbnew_stub
+    sys.modules["pcbnew"] = pcbnew_stub
+    pcbnew_stub.reset(pcbnew_stub.load_board("STAR Camera Daughter Board.kicad_pcb"))
+"""
+
+import itertools
+import os
+
+import board_index
+import kicad_sexpr as sx
+from footprint_cache import footprint_path, graphic_bbox, pad_bbox
+
+SHAPE_T_SEGMENT = 0
+SHAPE_T_RECT = 1
+
+LAYERS = {0: "F.Cu", 2: "B.Cu", 25: "Edge.Cuts"}
+
+# (call, detail...) in call order; "board.Add"/"board.Remove" entries end with whether a commit was being pushed
+LOG = []
+
+_uuids = itertools.count(1)
+_pushing = False
+
+
+class KIID:
+    def __init__(self, text=None):
+        self.text = text or f"00000000-0000-0000-0000-{next(_uuids):012d}"
+
+    def AsString(self):
+        return self.text
+
+
+class VECTOR2I:
+    def __init__(self, x, y):
+        self.x, self.y = int(x), int(y)
+
+    def __repr__(self):
+        return f"VECTOR2I({self.x}, {self.y})"
+
+
+class BOX2I:
+    def __init__(self, left, top, right, bottom):
+        self.rect = [left, top, right, bottom]
+
+    def GetLeft(self):
+        return self.rect[0]
+
+    def GetTop(self):
+        return self.rect[1]
+
+    def GetRight(self):
+        return self.rect[2]
+
+    def GetBottom(self):
+        return self.rect[3]
+
+    def GetWidth(self):
+        return self.rect[2] - self.rect[0]
+
+    def GetHeight(self):
+        return self.rect[3] - self.rect[1]
+
+    def Centre(self):
+        return VECTOR2I((self.rect[0] + self.rect[2]) // 2, (self.rect[1] + self.rect[3]) // 2)
+
+    def Merge(self, other):
+        self.rect = [min(self.rect[0], other.rect[0]), min(self.rect[1], other.rect[1]),
+                     max(self.rect[2], other.rect[2]), max(self.rect[3], other.rect[3])]
+
+
+# =============================================================================
+# ITEMS
+# =============================================================================
+
+
+class BOARD_ITEM:
+    def __init__(self, uuid=None):
+        self.m_Uuid = KIID(uuid)
+        self.locked = False
+        self.group = None
+
+    def SetLocked(self, locked):
+        self.locked = locked
+
+    def IsLocked(self):
+        return self.locked
+
+    def GetParentGroup(self):
+        return self.group
+
+    def Cast(self):
+        return self
+
+
+class _Box:
+    """Pad or graphic stand-in: only its bounding box"""
+
+    def __init__(self, box):
+        self.box = box
+
+    def GetBoundingBox(self):
+        return BOX2I(*self.box)
+
+
+class PCB_FIELD:
+    def __init__(self, text):
+        self.text = text
+        self.visible = True
+
+    def SetVisible(self, visible):
+        self.visible = visible
+
+    def GetText(self):
+        return self.text
+
+
+class FOOTPRINT(BOARD_ITEM):
+    """Library footprint (an SExpr) or a copy of another FOOTPRINT"""
+
+    def __init__(self, source, uuid=None):
+        super().__init__(uuid)
+        if isinstance(source, FOOTPRINT):
+            self.node, self.pads, self.graphics = source.node, source.pads, source.graphics
+            self.position = VECTOR2I(source.position.x, source.position.y)
+            self.orientation = source.orientation
+            self.fields = {name: PCB_FIELD(field.text) for name, field in source.fields.items()}
+        else:
+            self.node = source
+            self.pads, self.graphics = pad_bbox(source), graphic_bbox(source)
+            self.position = VECTOR2I(0, 0)
+            self.orientation = 0.0
+            self.fields = {}
+            for prop in source.children("property"):
+                if len(prop) > 2:
+                    self.fields[sx.unquote(prop[1])] = PCB_FIELD(sx.unquote(prop[2]))
+            self.fields.setdefault("Reference", PCB_FIELD("REF**"))
+
+    def _placed(self, local):
+        return board_index.placed_rect(local, (self.position.x, self.position.y), self.orientation)
+
+    def Pads(self):
+        return [_Box(self._placed(self.pads))] if self.pads else []
+
+    def GraphicalItems(self):
+        return [_Box(self._placed(self.graphics))] if self.graphics else []
+
+    def GetBoundingBox(self, include_text=True, include_invisible=True):
+        box = None
+        for item in self.Pads() + self.GraphicalItems():
+            if box is None:
+                box = item.GetBoundingBox()
+            else:
+                box.Merge(item.GetBoundingBox())
+        return box or BOX2I(self.position.x, self.position.y, self.position.x, self.position.y)
+
+    def GetPosition(self):
+        return VECTOR2I(self.position.x, self.position.y)
+
+    def SetPosition(self, position):
+        self.position = VECTOR2I(position.x, position.y)
+
+    def GetOrientationDegrees(self):
+        return self.orientation
+
+    def SetOrientationDegrees(self, degrees):
+        self.orientation = float(degrees)
+
+    def GetFPID(self):
+        return LIB_ID(sx.unquote(self.node[1]))
+
+    def Reference(self):
+        return self.fields["Reference"]
+
+    def GetReference(self):
+        return self.fields["Reference"].text
+
+    def HasFieldByName(self, name):
+        return name in self.fields
+
+    def GetFieldText(self, name):
+        return self.fields[name].text
+
+    def GetFieldByName(self, name):
+        return self.fields.get(name)
+
+    def SetField(self, name, text):
+        self.fields[name] = PCB_FIELD(text)
+
+
+class LIB_ID:
+    def __init__(self, text):
+        self.text = text
+
+    def GetLibItemName(self):
+        return self.text.split(":")[-1]
+
+
+class PCB_SHAPE(BOARD_ITEM):
+    def __init__(self, board=None, uuid=None):
+        super().__init__(uuid)
+        self.shape = SHAPE_T_SEGMENT
+        self.start = self.end = VECTOR2I(0, 0)
+        self.layer = 0
+        self.width = 0
+        self.filled = False
+
+    def SetShape(self, shape):
+        self.shape = shape
+
+    def GetShape(self):
+        return self.shape
+
+    def SetStart(self, point):
+        self.start = point
+
+    def GetStart(self):
+        return self.start
+
+    def SetEnd(self, point):
+        self.end = point
+
+    def GetEnd(self):
+        return self.end
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def GetLayerName(self):
+        return LAYERS.get(self.layer, "")
+
+    def SetWidth(self, width):
+        self.width = width
+
+    def SetFilled(self, filled):
+        self.filled = filled
+
+    def GetBoundingBox(self):
+        half = self.width // 2
+        return BOX2I(min(self.start.x, self.end.x) - half, min(self.start.y, self.end.y) - half,
+                     max(self.start.x, self.end.x) + half, max(self.start.y, self.end.y) + half)
+
+
+class PCB_TRACK(PCB_SHAPE):
+    def __init__(self, board=None, uuid=None, via=False):
+        super().__init__(board, uuid)
+        self.via = via
+
+    def GetClass(self):
+        return "PCB_VIA" if self.via else "PCB_TRACK"
+
+    def GetLayerName(self):
+        return "F.Cu"
+
+
+class PCB_GROUP(BOARD_ITEM):
+    def __init__(self, board=None, uuid=None):
+        super().__init__(uuid)
+        self.name = ""
+        self.items = []
+
+    def SetName(self, name):
+        self.name = name
+
+    def GetName(self):
+        return self.name
+
+    def AddItem(self, item):
+        self.items.append(item)
+        item.group = self
+
+    def RemoveItem(self, item):
+        self.items.remove(item)
+        item.group = None
+
+    def GetItems(self):
+        return list(self.items)
+
+
+# =============================================================================
+# BOARD
+# =============================================================================
+
+
+class BOARD:
+    def __init__(self):
+        self.footprints = []
+        self.drawings = []
+        self.tracks = []
+        self.groups = []
+
+    def _list(self, item):
+        if isinstance(item, FOOTPRINT):
+            return self.footprints
+        if isinstance(item, PCB_GROUP):
+            return self.groups
+        return self.tracks if isinstance(item, PCB_TRACK) else self.drawings
+
+    def Add(self, item):
+        LOG.append(("board.Add", type(item).__name__, _pushing))
+        self._list(item).append(item)
+
+    def Remove(self, item):
+        LOG.append(("board.Remove", type(item).__name__, _pushing))
+        self._list(item).remove(item)
+
+    def GetFootprints(self):
+        return list(self.footprints)
+
+    def GetDrawings(self):
+        return list(self.drawings)
+
+    def GetTracks(self):
+        return list(self.tracks)
+
+    def Zones(self):
+        return []
+
+    def Groups(self):
+        return list(self.groups)
+
+    def GetLayerID(self, name):
+        return next(layer for layer, layer_name in LAYERS.items() if layer_name == name)
+
+    def BuildConnectivity(self):
+        LOG.append(("BuildConnectivity",))
+
+
+class BOARD_COMMIT:
+    """Stages changes and applies them in Push(), rebuilding connectivity once like KiCad's commit"""
+
+    def __init__(self, board):
+        self.board = board
+        self.staged = []
+
+    def _on_board(self, item):
+        return any(item is other for other in self.board._list(item))
+
+    def Add(self, item):
+        if self._on_board(item):
+            raise ValueError("BOARD_COMMIT.Add() of an item already on the board")
+        self.staged.append(("add", item))
+
+    def Remove(self, item):
+        if not self._on_board(item):
+            raise ValueError("BOARD_COMMIT.Remove() of an item not on the board")
+        self.staged.append(("remove", item))
+
+    def Modify(self, item):
+        if not self._on_board(item):
+            raise ValueError("BOARD_COMMIT.Modify() of an item not on the board")
+        self.staged.append(("modify", item))
+
+    def Push(self, message):
+        global _pushing
+        LOG.append(("Push", message, len(self.staged)))
+        _pushing = True
+        try:
+            for action, item in self.staged:
+                if action == "add":
+                    self.board.Add(item)
+                elif action == "remove":
+                    self.board.Remove(item)
+            self.board.BuildConnectivity()
+        finally:
+            _pushing = False
+        self.staged = []
+
+
+class PCB_IO_KICAD_SEXPR:
+    def FootprintLoad(self, library, name):
+        path = footprint_path(library, name)
+        if not os.path.isfile(path):
+            return None
+        LOG.append(("FootprintLoad", name))
+        return FOOTPRINT(sx.load(path))
+
+
+_board = BOARD()
+
+
+def GetBoard():
+    return _board
+
+
+def Refresh():
+    LOG.append(("Refresh",))
+
+
+def reset(board=None):
+    """Clear LOG and make board (a new empty one by default) the one GetBoard() returns"""
+    global _board
+    _board = board if board is not None else BOARD()
+    LOG.clear()
+    return _board
+
+
+def calls(name):
+    """LOG entries of one call"""
+    return [entry for entry in LOG if entry[0] == name]
+
+
+# =============================================================================
+# LOADING
+# =============================================================================
+
+
+def _point(node, name):
+    return VECTOR2I(*sx.xy(node, name))
+
+
+def load_board(path):
+    """BOARD holding the footprints, Edge.Cuts drawings, tracks and groups of a .kicad_pcb"""
+    board = BOARD()
+    by_uuid = {}
+    for _, item in sx.iter_items(path, {("footprint",), ("gr_line",), ("gr_rect",), ("segment",), ("via",),
+                                        ("group",)}):
+        head = item.head
+        if head == "footprint":
+            at = item.find("at")
+            angle = float(at[3]) if len(at) > 3 else 0.0
+            footprint = FOOTPRINT(item, item.get("uuid"))
+            # Pad angles in board files already include the footprint rotation
+            footprint.pads = pad_bbox(item, angle)
+            footprint.position = _point(item, "at")
+            footprint.orientation = angle
+            footprint.locked = "locked" in item.atoms() or item.get("locked") == "yes"
+            board.footprints.append(footprint)
+            by_uuid[footprint.m_Uuid.AsString()] = footprint
+        elif head == "group":
+            group = PCB_GROUP(board, item.get("uuid"))
+            group.name = sx.unquote(item.atoms()[0]) if item.atoms() else ""
+            members = item.find("members")
+            group.members = [sx.unquote(uuid) for uuid in members.atoms()] if members is not None else []
+            board.groups.append(group)
+        elif head in ("segment", "via"):
+            track = PCB_TRACK(board, item.get("uuid"), via=head == "via")
+            if head == "via":
+                track.start = track.end = _point(item, "at")
+                track.width = sx.mm_to_nm(item.get("size", default=0))
+            else:
+                track.start, track.end = _point(item, "start"), _point(item, "end")
+                track.width = sx.mm_to_nm(item.get("width", default=0))
+            board.tracks.append(track)
+            by_uuid[track.m_Uuid.AsString()] = track
+        elif item.get("layer") == "Edge.Cuts":
+            shape = PCB_SHAPE(board, item.get("uuid"))
+            shape.shape = SHAPE_T_RECT if head == "gr_rect" else SHAPE_T_SEGMENT
+            shape.start, shape.end = _point(item, "start"), _point(item, "end")
+            shape.layer = board.GetLayerID("Edge.Cuts")
+            board.drawings.append(shape)
+            by_uuid[shape.m_Uuid.AsString()] = shape
+    for group in board.groups:
+        for uuid in group.__dict__.pop("members"):
+            if uuid in by_uuid:
+                group.AddItem(by_uuid[uuid])
+    return board
@@ -0,0 +1,245 @@
+"""
+Bill of materials from a KiCad schematic hierarchy, without eeschema
+- Symbols come from the streaming reader (kicad_schematic.py)
+- Rows are grouped like KiCad's BOM export (Value + Footprint) with the same columns
+- --diff compares against an exported BOM (.xlsx or .csv) reference by reference;
+  .xlsx files are read with the standard library, no spreadsheet package needed
+
+    python schematic_bom.py STAR.kicad_sch -o STAR_BOM.csv --diff STAR_BOM_Digikey.xlsx
+"""
+
+import csv
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+
+import kicad_schematic
+from kicad_schematic import natural_key
+
+
+BOM_COLUMNS = ("Reference", "Qty", "Value", "DNP", "Exclude from BOM", "Exclude from Board", "Footprint")
+GROUP_BY = ("Value", "Footprint")
+DIFF_FIELDS = ("Value", "Footprint")
+
+XLSX_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+XLSX_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+
+class BomError(ValueError):
+    """Raised for a BOM file that can't be read"""
+
+
+# =============================================================================
+# SCHEMATIC BOM
+# =============================================================================
+
+
+def bom_parts(symbols):
+    """One entry per reference (units of a multi-unit part merged), power symbols dropped"""
+    parts = {}
+    for symbol in symbols:
+        if symbol["power"]:
+            continue
+        part = parts.get(symbol["reference"])
+        if part is None:
+            parts[symbol["reference"]] = symbol
+        else:
+            # Fields may only be filled in on one unit
+            for key, value in symbol["fields"].items():
+                if value and not part["fields"].get(key):
+                    part["fields"][key] = value
+    return sorted(parts.values(), key=lambda part: natural_key(part["reference"]))
+
+
+def bom_rows(parts, group_by=GROUP_BY, extra_fields=()):
+    """Grouped BOM rows (dicts keyed by BOM_COLUMNS + extra_fields)"""
+    groups = {}
+    for part in parts:
+        key = (tuple(part["fields"].get(name, "") for name in group_by),
+               part["dnp"], part["in_bom"], part["on_board"])
+        groups.setdefault(key, []).append(part)
+
+    rows = []
+    for members in groups.values():
+        first = members[0]
+        row = {
+            "Reference": ",".join(part["reference"] for part in members),
+            "Qty": len(members),
+            "Value": first["value"],
+            "DNP": "DNP" if first["dnp"] else "",
+            "Exclude from BOM": "" if first["in_bom"] else "Excluded from BOM",
+            "Exclude from Board": "" if first["on_board"] else "Excluded from board",
+            "Footprint": first["footprint"],
+        }
+        for name in extra_fields:
+            row[name] = next((part["fields"][name] for part in members if part["fields"].get(name)), "")
+        rows.append(row)
+    rows.sort(key=lambda row: (-row["Qty"], natural_key(row["Reference"])))
+    return rows
+
+
+def schematic_bom(root_path, group_by=GROUP_BY, extra_fields=()):
+    return bom_rows(bom_parts(kicad_schematic.iter_symbols(root_path)), group_by, extra_fields)
+
+
+def write_bom(rows, path, extra_fields=()):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=BOM_COLUMNS + tuple(extra_fields), extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# =============================================================================
+# EXPORTED BOM FILES
+# =============================================================================
+
+
+def _xlsx_text(element):
+    return "".join(t.text or "" for t in element.iter(f"{{{XLSX_NS['m']}}}t"))
+
+
+def _column_index(cell_ref):
+    """'C12' -> 2"""
+    index = 0
+    for ch in re.match(r"[A-Z]+", cell_ref).group():
+        index = index * 26 + ord(ch) - ord("A") + 1
+    return index - 1
+
+
+def read_xlsx(path):
+    """Rows of the first worksheet as lists of cell text, streamed with the standard library"""
+    with zipfile.ZipFile(path) as book:
+        names = set(book.namelist())
+        shared = []
+        if "xl/sharedStrings.xml" in names:
+            with book.open("xl/sharedStrings.xml") as f:
+                for _, element in ElementTree.iterparse(f):
+                    if element.tag == f"{{{XLSX_NS['m']}}}si":
+                        shared.append(_xlsx_text(element))
+                        element.clear()
+
+        # First sheet of the workbook, through its relationship id
+        workbook = ElementTree.fromstring(book.read("xl/workbook.xml"))
+        sheet = workbook.find("m:sheets/m:sheet", XLSX_NS)
+        rels = ElementTree.fromstring(book.read("xl/_rels/workbook.xml.rels"))
+        target = next(rel.get("Target") for rel in rels if rel.get("Id") == sheet.get(XLSX_REL_NS))
+        sheet_path = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+        rows = []
+        with book.open(sheet_path) as f:
+            for _, element in ElementTree.iterparse(f):
+                if element.tag != f"{{{XLSX_NS['m']}}}row":
+                    continue
+                row = []
+                for cell in element.findall("m:c", XLSX_NS):
+                    kind = cell.get("t")
+                    value = cell.find("m:v", XLSX_NS)
+                    if kind == "s":
+                        text = shared[int(value.text)]
+                    elif kind == "inlineStr":
+                        text = _xlsx_text(cell)
+                    else:
+                        text = value.text if value is not None else ""
+                    column = _column_index(cell.get("r")) if cell.get("r") else len(row)
+                    row.extend([""] * (column - len(row)))
+                    row.append(text or "")
+                rows.append(row)
+                element.clear()
+    return rows
+
+
+def read_bom(path):
+    """Exported BOM rows as dicts keyed by the header row (.xlsx or .csv)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xlsx":
+        try:
+            table = read_xlsx(path)
+        except (zipfile.BadZipFile, KeyError, StopIteration) as e:
+            raise BomError(f"{path} is not a readable .xlsx workbook ({e})") from None
+    elif ext == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            table = list(csv.reader(f))
+    else:
+        raise BomError(f"Unsupported BOM file type: {path}")
+    if not table:
+        raise BomError(f"{path} is empty")
+    header = [name.strip() for name in table[0]]
+    if "Reference" not in header:
+        raise BomError(f"{path} has no 'Reference' column")
+    return [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in table[1:] if any(row)]
+
+
+def expand_references(text):
+    """'R1,R3-R5' -> ['R1', 'R3', 'R4', 'R5']"""
+    references = []
+    for item in re.split(r"[,\s]+", text.strip()):
+        match = re.fullmatch(r"([A-Za-z_#]+)(\d+)-\1?(\d+)", item)
+        if match:
+            prefix, first, last = match.groups()
+            references.extend(f"{prefix}{n}" for n in range(int(first), int(last) + 1))
+        elif item:
+            references.append(item)
+    return references
+
+
+def by_reference(rows, fields=DIFF_FIELDS):
+    """Reference -> {field: value} from grouped BOM rows"""
+    parts = {}
+    for row in rows:
+        for reference in expand_references(str(row.get("Reference", ""))):
+            parts[reference] = {name: str(row.get(name, "")).strip() for name in fields}
+    return parts
+
+
+def diff_bom(schematic_rows, reference_rows, fields=DIFF_FIELDS):
+    """
+    Compare two BOMs reference by reference:
+    {"added": [refs only in the schematic], "removed": [refs only in the reference BOM],
+     "changed": [(ref, field, reference value, schematic value)]}
+    """
+    current = by_reference(schematic_rows, fields)
+    previous = by_reference(reference_rows, fields)
+    changed = []
+    for reference in sorted(current.keys() & previous.keys(), key=natural_key):
+        for name in fields:
+            if current[reference][name] != previous[reference][name]:
+                changed.append((reference, name, previous[reference][name], current[reference][name]))
+    return {
+        "added": sorted(current.keys() - previous.keys(), key=natural_key),
+        "removed": sorted(previous.keys() - current.keys(), key=natural_key),
+        "changed": changed,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a BOM from a KiCad schematic and diff it")
+    parser.add_argument("schematic", help="Root .kicad_sch")
+    parser.add_argument("-o", "--output", help="Write the BOM as CSV")
+    parser.add_argument("--diff", help="Exported BOM (.xlsx or .csv) to compare against")
+    parser.add_argument("--field", action="append", default=[], help="Extra symbol field column (repeatable)")
+    args = parser.parse_args()
+
+    rows = schematic_bom(args.schematic, extra_fields=args.field)
+    print(f"✓ {sum(row['Qty'] for row in rows)} parts in {len(rows)} BOM lines")
+    if args.output:
+        write_bom(rows, args.output, args.field)
+        print(f"💾 Saved {args.output}")
+
+    if args.diff:
+        try:
+            diff = diff_bom(rows, read_bom(args.diff))
+        except (OSError, BomError) as e:
+            parser.error(str(e))
+        for reference in diff["added"]:
+            print(f"+ {reference} (not in {os.path.basename(args.diff)})")
+        for reference in diff["removed"]:
+            print(f"- {reference} (not in the schematic)")
+        for reference, name, old, new in diff["changed"]:
+            print(f"~ {reference} {name}: {old!r} -> {new!r}")
+        if any(diff.values()):
+            print(f"✗ {len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['changed'])} changed")
+            raise SystemExit(1)
+        print(f"✓ BOM matches {args.diff}")
@@ -0,0 +1,144 @@
+"""
+Watch mode for the board setup
+- Polls the CONFIGURATION script, the placed footprint libraries and the target .kicad_pcb
+- Keeps the parsed board and footprints in memory between updates; a configuration
+  edit only re-runs the incremental setup (board_setup.setup_board), which moves or
+  replaces just the holes whose placement changed
+- The board is only re-read when it changed on disk (e.g. saved from KiCad), never
+  after the watcher's own writes
+- Library edits re-centre the footprints on their new extents; footprints already on the
+  board keep their pads, like in KiCad until "Update Footprints from Library"
+
+Stop with Ctrl+C. If the board is open in KiCad, pcbnew offers to reload it after each update.
+
+    python watch_board_setup.py "STAR Camera Daughter Board.kicad_pcb" [-o out.kicad_pcb]
+"""
+
+import os
+import time
+
+import board_drc
+import board_index
+import board_setup
+import kicad_sexpr as sx
+from board_trace import Trace
+
+
+POLL_INTERVAL_S = 0.25
+
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file or folder, None when it's missing"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class BoardWatcher:
+    """Warm board + footprint state and the file stamps it was built from"""
+
+    def __init__(self, pcb_path, script_path=board_setup.SETUP_SCRIPT, output_path=None, footprints=None):
+        self.pcb_path = pcb_path
+        self.script_path = script_path
+        self.output_path = output_path or pcb_path
+        self.footprints = footprints or board_setup.default_cache()
+        self.config = None
+        self.board = None
+        self.stamps = {}
+
+    def watched_paths(self):
+        """Script, board and the library files the current configuration places"""
+        paths = [self.script_path, self.pcb_path]
+        if self.config is not None:
+            files = board_setup.placement_footprint_files(self.config, self.pcb_path)
+            # The folder stamp changes when footprints are added, removed or renamed
+            for lib_path in dict.fromkeys(os.path.dirname(path) for path in files):
+                paths.append(lib_path)
+            paths += files
+        return paths
+
+    def changed_paths(self):
+        """Watched paths whose stamp differs from the last update"""
+        return [path for path in self.watched_paths() if file_stamp(path) != self.stamps.get(path)]
+
+    def update(self, changed, trace=None):
+        """Bring the board up to date after changes to the given paths; returns the setup report"""
+        trace = trace or Trace()
+        try:
+            if self.config is None or self.script_path in changed:
+                with trace.stage("load configuration"):
+                    self.config = board_setup.load_script_config(self.script_path)
+            if self.board is None or self.pcb_path in changed:
+                with trace.stage("load board"):
+                    board = sx.load(self.pcb_path)
+                if board.head != "kicad_pcb":
+                    raise sx.SExprError(f"{self.pcb_path} is not a KiCad board file")
+                self.board = board
+            try:
+                report = board_setup.setup_board(self.board, self.config, self.pcb_path, self.footprints,
+                                                 trace=trace)
+            except Exception:
+                # The tree may be half-updated; start from the file again next time
+                self.board = None
+                raise
+            with trace.stage("save"):
+                write = report["changed"] or file_stamp(self.output_path) is None
+                report["written"] = sx.save(self.output_path, self.board) if write else False
+                self.footprints.save()
+        finally:
+            # Stamps after our own write, so it doesn't look like an outside change
+            self.stamps = {path: file_stamp(path) for path in self.watched_paths()}
+        return report
+
+    def run(self, interval=POLL_INTERVAL_S, verbose=False):
+        """Update now, then every time a watched file changes (until interrupted)"""
+        changed = self.watched_paths()
+        while True:
+            if changed:
+                start = time.perf_counter()
+                names = ", ".join(sorted({os.path.basename(path) for path in changed}))
+                trace = Trace(verbose=verbose)
+                try:
+                    report = self.update(changed, trace)
+                except Exception as e:  # Keep watching through half-typed edits
+                    print(f"✗ {names}: {e}")
+                else:
+                    print_update(report, names, time.perf_counter() - start)
+                    if verbose:
+                        print(trace.summary())
+            time.sleep(interval)
+            changed = self.changed_paths()
+
+
+def print_update(report, names, seconds):
+    """One line per update, plus clearance warnings"""
+    counts = [f"{report[key]} {key}" for key in ("added", "moved", "replaced", "adopted", "removed") if report[key]]
+    if report["outline"]:
+        counts.append("outline")
+    summary = ", ".join(counts) or "no changes"
+    saved = " 💾" if report["written"] else ""
+    print(f"✓ {names}: {summary} in {seconds * 1000:.0f}ms{saved}")
+    for v in report["violations"]:
+        print(f"  ⚠ {board_index.describe_gap(v)}")
+    for v in report["drc"]:
+        print(f"  {board_drc.format_violation(v)}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-run the board setup whenever its inputs change")
+    parser.add_argument("board", help=".kicad_pcb file to keep up to date")
+    parser.add_argument("-o", "--output", help="Write the result here instead of editing the board in place")
+    parser.add_argument("--script", default=board_setup.SETUP_SCRIPT, help="Script holding the CONFIGURATION")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL_S, help="Seconds between checks")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print the stage timings of every update")
+    args = parser.parse_args()
+
+    print(f"Watching {args.script}, {args.board} and the footprint libraries (Ctrl+C to stop)")
+    try:
+        BoardWatcher(args.board, args.script, args.output).run(args.interval, args.verbose)
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")